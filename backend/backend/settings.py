@@ -66,6 +66,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'salesperson.db_router.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -108,6 +109,55 @@ else:
         }
     }
 
+# Optional read replica (see salesperson/db_router.py). Reports, list views
+# and background jobs read from it; writes always go to 'default'. For local
+# testing point it at a second SQLite file, e.g. sqlite:////tmp/replica.sqlite3
+REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+
+if REPLICA_DATABASE_URL:
+    import dj_database_url
+    DATABASES['replica'] = dj_database_url.parse(REPLICA_DATABASE_URL)
+    # Tests run against the primary only
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['salesperson.db_router.ReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write something,
+# so they see their own changes while the replica catches up
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+# Report results read from the replica may predate the latest sales change, so
+# they are cached apart from the sales version and for at most this long
+REPLICA_RESULT_SECONDS = int(os.environ.get('REPLICA_RESULT_SECONDS', 5))
+
+
+# Cache
+# Set REDIS_URL (e.g. redis://localhost:6379/0, needs the redis package) so that
+# every worker process shares cached reports, single-flight locks and
+# read-replica stickiness; without it each process has its own memory cache
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Single-flight coalescing of identical dashboard/report requests (see salesperson/singleflight.py)
+# How long a computed result is shared with requests that arrive after it
+SINGLEFLIGHT_RESULT_SECONDS = int(os.environ.get('SINGLEFLIGHT_RESULT_SECONDS', 5))
+# How long duplicates wait for the first request before computing it themselves
+SINGLEFLIGHT_WAIT_SECONDS = float(os.environ.get('SINGLEFLIGHT_WAIT_SECONDS', 15))
+# Lock expiry, in case the computing process dies
+SINGLEFLIGHT_LOCK_SECONDS = int(os.environ.get('SINGLEFLIGHT_LOCK_SECONDS', 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -182,6 +232,82 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Data exports
+# Rows fetched per database round trip when streaming CSV/XLSX exports
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# Background jobs (see `manage.py run_workers`)
+JOB_RESULTS_ROOT = Path(os.environ.get('JOB_RESULTS_ROOT', BASE_DIR / 'job_results'))
+JOB_RESULT_TTL = timedelta(hours=int(os.environ.get('JOB_RESULT_TTL_HOURS', 24)))
+JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 2))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+# Workers mark their running job alive this often (seconds)
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get('JOB_HEARTBEAT_INTERVAL', 30))
+# Running jobs without a heartbeat for this long are assumed to belong to a dead worker and are requeued
+JOB_STALE_AFTER = timedelta(minutes=int(os.environ.get('JOB_STALE_AFTER_MINUTES', 5)))
+
+# Report query budgets (see salesperson/query_budget.py); background jobs are not limited
+# Report queries running longer than this are cancelled with a 503
+REPORT_STATEMENT_TIMEOUT_MS = int(os.environ.get('REPORT_STATEMENT_TIMEOUT_MS', 10000))
+REPORT_RETRY_AFTER_SECONDS = int(os.environ.get('REPORT_RETRY_AFTER_SECONDS', 30))
+# Longest date range, in days, a report may cover at each granularity
+REPORT_MAX_RANGE_DAYS = {
+    'day': 366,
+    'week': 3 * 366,
+    'month': 5 * 366,
+    'total': 5 * 366,
+}
+# Maximum ?limit= for lists embedded in reports (top debtors, unpaid sales, ...)
+REPORT_MAX_LIST_ROWS = int(os.environ.get('REPORT_MAX_LIST_ROWS', 100))
+
+# Pivot reports (see salesperson/pivot.py)
+# Most rows a pivot returns; larger results are truncated
+PIVOT_MAX_ROWS = int(os.environ.get('PIVOT_MAX_ROWS', 1000))
+# Cached pivots are also invalidated whenever a sale changes
+PIVOT_CACHE_SECONDS = int(os.environ.get('PIVOT_CACHE_SECONDS', 600))
+
+# Reorder forecasting (see salesperson/forecasting.py)
+# Days of sales history used for velocity and smoothing
+FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS', 56))
+# Exponential smoothing factor; higher values weight recent days more
+FORECAST_SMOOTHING = float(os.environ.get('FORECAST_SMOOTHING', 0.3))
+# Supplier lead time and the stock cover a reorder should buy, in days
+FORECAST_LEAD_TIME_DAYS = int(os.environ.get('FORECAST_LEAD_TIME_DAYS', 7))
+FORECAST_COVER_DAYS = int(os.environ.get('FORECAST_COVER_DAYS', 30))
+
+# In-memory sales cube for the analytics endpoint (see salesperson/cube.py)
+# Maximum age of a process's cube before it picks up new and edited sales
+SALES_CUBE_REFRESH_SECONDS = float(os.environ.get('SALES_CUBE_REFRESH_SECONDS', 5))
+# Build the cube when a web worker starts instead of on the first analytics request
+SALES_CUBE_PRELOAD = os.environ.get('SALES_CUBE_PRELOAD', 'False').lower() == 'true'
+
+# Parquet analytics export (see `manage.py export_parquet`; requires pyarrow)
+PARQUET_EXPORT_ROOT = Path(os.environ.get('PARQUET_EXPORT_ROOT', BASE_DIR / 'analytics_exports'))
+
+# On-disk cache of rendered receipt PDFs (see salesperson/receipt_cache.py)
+# Least recently used files are removed once the cache grows past the limit.
+RECEIPT_CACHE_ROOT = Path(os.environ.get('RECEIPT_CACHE_ROOT', BASE_DIR / 'receipt_cache'))
+RECEIPT_CACHE_MAX_BYTES = int(os.environ.get('RECEIPT_CACHE_MAX_MB', '256')) * 1024 * 1024
+# Lifetime of signed receipt sharing links (see salesperson/pdf_tokens.py)
+PDF_TOKEN_LIFETIME = timedelta(hours=int(os.environ.get('PDF_TOKEN_LIFETIME_HOURS', 24)))
+# Render receipts in the background after a sale is created or its payment status changes
+RECEIPT_PRERENDER = os.environ.get('RECEIPT_PRERENDER', 'True').lower() == 'true'
+# Background rendering threads per process; 0 renders in the commit callback instead
+RECEIPT_PRERENDER_THREADS = int(os.environ.get('RECEIPT_PRERENDER_THREADS', 2))
+# Receipt rendering process pool per web process (see salesperson/render_pool.py)
+# 0 workers renders in the request instead
+RECEIPT_RENDER_WORKERS = int(os.environ.get('RECEIPT_RENDER_WORKERS', 2))
+# Renders that may wait for a busy pool before requests get a 503
+RECEIPT_RENDER_MAX_QUEUE = int(os.environ.get('RECEIPT_RENDER_MAX_QUEUE', 8))
+RECEIPT_RENDER_TIMEOUT_SECONDS = float(os.environ.get('RECEIPT_RENDER_TIMEOUT_SECONDS', 30))
+RECEIPT_RENDER_RETRY_AFTER_SECONDS = int(os.environ.get('RECEIPT_RENDER_RETRY_AFTER_SECONDS', 5))
+
+# Bulk receipt export (see salesperson/bulk_receipts.py)
+# Rendering processes; 0 uses one per CPU core
+BULK_RECEIPT_WORKERS = int(os.environ.get('BULK_RECEIPT_WORKERS', 0))
+# Sales loaded per query and handed to the workers at once
+BULK_RECEIPT_BATCH_SIZE = int(os.environ.get('BULK_RECEIPT_BATCH_SIZE', 200))
+
 # JWT Configuration
 
 SIMPLE_JWT = {
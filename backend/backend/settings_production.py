@@ -22,6 +22,9 @@ if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.parse(DATABASE_URL)
     }
+    if REPLICA_DATABASE_URL:
+        DATABASES['replica'] = dj_database_url.parse(REPLICA_DATABASE_URL)
+        DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
 
 # Static files configuration for production
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -42,7 +42,11 @@ def api_root(request):
             },
             "sales": {
                 "list_create": "/api/sales/",
-                "detail": "/api/sales/{id}/"
+                "detail": "/api/sales/{id}/",
+                "receipt_render_pool": "/api/receipts/render-pool/"
+            },
+            "customers": {
+                "statement": "/api/customers/statement/?customer_phone=&date_from=&date_to="
             },
             "payments": {
                 "list_create": "/api/payments/",
@@ -51,7 +55,20 @@ def api_root(request):
             "reports": {
                 "dashboard": "/api/dashboard/",
                 "sales": "/api/reports/sales/",
-                "inventory": "/api/reports/inventory/"
+                "inventory": "/api/reports/inventory/",
+                "inventory_trends": "/api/reports/inventory/trends/",
+                "leaderboard": "/api/reports/leaderboard/",
+                "receivables_aging": "/api/reports/receivables-aging/?format=json|csv|xlsx",
+                "reorder_suggestions": "/api/reports/reorder-suggestions/",
+                "analytics": "/api/reports/analytics/",
+                "pivot": "/api/reports/pivot/?dimensions=month,category&measures=revenue,quantity"
+            },
+            "exports": {
+                "sales": "/api/exports/sales/?format=csv|xlsx",
+                "payments": "/api/exports/payments/?format=csv|xlsx",
+                "inventory": "/api/exports/inventory/?format=csv|xlsx",
+                "parquet": "/api/exports/parquet/",
+                "receipts": "/api/exports/receipts/?date_from=&date_to=&output=zip|pdf"
             },
             "admin": "/admin/"
         }
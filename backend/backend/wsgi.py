@@ -17,3 +17,9 @@ else:
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.SALES_CUBE_PRELOAD:
+    from salesperson.cube import preload_sales_cube  # noqa: E402
+    preload_sales_cube()
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import User, Product, Sale, Payment, SaleItem
+from .models import User, Product, Sale, Payment, SaleItem, Job, InventorySnapshot
 
 
 @admin.register(User)
@@ -132,3 +132,27 @@ class SaleItemAdmin(admin.ModelAdmin):
     search_fields = ('product_name', 'product_sku', 'sale__salesperson_name')
     ordering = ('-sale__created_at',)
     readonly_fields = ('subtotal',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Background Job Admin"""
+    list_display = ('id', 'job_type', 'status', 'progress', 'created_by', 'worker', 'created_at', 'finished_at')
+    list_filter = ('job_type', 'status', 'created_at')
+    search_fields = ('created_by__email', 'worker', 'error')
+    ordering = ('-created_at',)
+    readonly_fields = (
+        'status', 'progress', 'worker', 'error', 'result_file', 'result_content_type',
+        'created_at', 'started_at', 'heartbeat_at', 'finished_at', 'expires_at'
+    )
+
+
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    """Inventory Snapshot Admin"""
+    list_display = ('date', 'product', 'stock_quantity', 'price', 'stock_value')
+    list_filter = ('date',)
+    search_fields = ('product__name', 'product__sku')
+    ordering = ('-date', 'product__name')
+    date_hierarchy = 'date'
+    list_select_related = ('product',)
@@ -2,26 +2,61 @@
 API Views for the Stock Management System
 """
 import logging
+import uuid
+from django.conf import settings
 from django.db import transaction
-from django.http import HttpResponse
-from django.db.models import Q, Sum, Count
+from django.http import FileResponse, StreamingHttpResponse
+from django.db.models import Sum, Count
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from datetime import datetime, timedelta
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .models import User, Product, Sale, Payment, SaleItem, PDFAccessToken
+from .models import User, Product, Sale, Payment, PDFAccessToken, Job
 from .serializers import (
     UserSerializer, LoginSerializer, ProductSerializer, 
     SaleSerializer, PaymentSerializer, SalesReportSerializer,
-    InventoryReportSerializer
+    InventoryReportSerializer, JobSerializer
 )
 from .permissions import IsAdminUser, IsAdminOrReadOnly, IsOwnerOrAdmin, CanCreateProductButNotDelete
-from .pdf_utils import generate_sale_receipt_pdf
+from .filters import filter_products, filter_sales, filter_payments, parse_date
+from .renderers import (
+    CSVRenderer, XLSXRenderer, PDFRenderer, RECEIPT_RENDERERS, ReceiptContentNegotiation, receipt_negotiation
+)
+from .exports import (
+    SALE_EXPORT_COLUMNS, PAYMENT_EXPORT_COLUMNS, INVENTORY_EXPORT_COLUMNS,
+    RECEIVABLES_AGING_EXPORT_COLUMNS, sale_export_rows, payment_export_rows,
+    inventory_export_rows, receivables_aging_rows, export_response
+)
+from .receipts import TEMPLATE_NAME, TEMPLATE_VERSION, load_sale
+from .receipt_cache import receipt_response
+from .receipt_formats import TEMPLATE_VERSION as COMPACT_TEMPLATE_VERSION, compact_receipt
+from .statements import build_statement, statement_customer, statement_period, stream_statement
+from . import render_pool
+from .render_pool import RenderPoolUnavailable
+from .pdf_tokens import ExpiredPDFToken, InvalidPDFToken, create_token, read_token, revoke_token, verify_token
+from .bulk_receipts import FORMATS as RECEIPT_FORMATS, receipt_sale_ids, stream_receipts
+from .reports import (
+    build_dashboard_stats, build_sales_report, build_inventory_report, build_inventory_trends,
+    build_comprehensive_report, build_salesperson_leaderboard, build_receivables_aging,
+    COMPARE_MODES, compare_periods
+)
+from .jobs import result_path
+from .forecasting import build_reorder_suggestions
+from .cube import sales_cube
+from .parquet_export import EXPORT_TABLES, load_manifest, parquet_available
+from .rollups import record_sale_items
+from .db_router import ReplicaReadMixin, replica_reads
+from .query_budget import ReportRangeTooLarge, budgeted, embedded_list_limit, query_budget
+from .pivot import build_pivot
+from .singleflight import coalesce, request_key
 
 logger = logging.getLogger(__name__)
 
@@ -118,7 +153,7 @@ def health_check(request):
     return Response({"status": "ok", "message": "API is running."})
 
 
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(ReplicaReadMixin, generics.ListCreateAPIView):
     """List all products or create a new product"""
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
@@ -126,33 +161,7 @@ class ProductListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Filter products based on query parameters"""
-        queryset = Product.objects.all()
-        
-        # Filter by active status
-        active_only = self.request.query_params.get('active_only', 'true').lower() == 'true'
-        if active_only:
-            queryset = queryset.filter(is_active=True)
-        
-        # Filter by category
-        category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category__icontains=category)
-        
-        # Filter by stock status
-        stock_status = self.request.query_params.get('stock_status', None)
-        if stock_status == 'out_of_stock':
-            queryset = queryset.filter(stock_quantity=0)
-        elif stock_status == 'low_stock':
-            queryset = queryset.filter(stock_quantity__gt=0, stock_quantity__lte=10)
-        elif stock_status == 'in_stock':
-            queryset = queryset.filter(stock_quantity__gt=10)
-        
-        # Search by name or SKU
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | Q(sku__icontains=search)
-            )
+        queryset = filter_products(Product.objects.all(), self.request.query_params)
         
         return queryset.order_by('name')
 
@@ -171,7 +180,7 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class SaleListCreateView(generics.ListCreateAPIView):
+class SaleListCreateView(ReplicaReadMixin, generics.ListCreateAPIView):
     """List all sales or create a new sale"""
     queryset = Sale.objects.all()
     serializer_class = SaleSerializer
@@ -179,41 +188,7 @@ class SaleListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Filter sales based on user role and query parameters"""
-        user = self.request.user
-        queryset = Sale.objects.all()
-        
-        # Salespersons can only see their own sales
-        if user.role == 'Salesperson':
-            queryset = queryset.filter(salesperson=user)
-        
-        # Filter by date range
-        date_from = self.request.query_params.get('date_from', None)
-        date_to = self.request.query_params.get('date_to', None)
-        
-        if date_from:
-            try:
-                date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__gte=date_from)
-            except ValueError:
-                pass
-        
-        if date_to:
-            try:
-                date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__lte=date_to)
-            except ValueError:
-                pass
-        
-        # Filter by payment status
-        payment_status = self.request.query_params.get('payment_status', None)
-        if payment_status:
-            queryset = queryset.filter(payment_status=payment_status)
-        
-        # Filter by salesperson (Admin only)
-        if user.role == 'Admin':
-            salesperson_id = self.request.query_params.get('salesperson', None)
-            if salesperson_id:
-                queryset = queryset.filter(salesperson_id=salesperson_id)
+        queryset = filter_sales(Sale.objects.all(), self.request.query_params, self.request.user)
         
         return queryset.select_related('salesperson').prefetch_related('items__product').order_by('-created_at')
     
@@ -252,12 +227,16 @@ class SaleDetailView(generics.RetrieveUpdateDestroyAPIView):
         
         # Restore stock quantities when deleting a sale
         with transaction.atomic():
-            for item in sale.items.all():
+            items = list(sale.items.all())
+            for item in items:
                 product = item.product
                 product.stock_quantity += item.quantity
                 product.save()
                 logger.info(f"Restored {item.quantity} units to product {product.name}")
             
+            # Take the sale out of the per-product daily sales counters
+            record_sale_items(sale, items, sign=-1)
+            
             # Delete the sale
             sale.delete()
             logger.info(f"Sale {sale.id} deleted by admin {request.user.email}")
@@ -277,53 +256,18 @@ class SaleDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class SaleReceiptView(APIView):
-    """Generate and download PDF receipt for a sale"""
+    """Generate and download the receipt for a sale (PDF, text, ESC/POS or HTML)"""
     permission_classes = [IsOwnerOrAdmin]
+    renderer_classes = RECEIPT_RENDERERS
+    content_negotiation_class = ReceiptContentNegotiation
     
     def get(self, request, pk):
         """Generate and return PDF receipt for a sale"""
         try:
-            # Get the sale
+            # Get the sale, scoped to the salesperson's own sales
             user = request.user
-            if user.role == 'Salesperson':
-                sale = Sale.objects.select_related('salesperson').prefetch_related('items__product').get(
-                    pk=pk, salesperson=user
-                )
-            else:
-                sale = Sale.objects.select_related('salesperson').prefetch_related('items__product').get(pk=pk)
-            
-            # Prepare sale data for PDF generation
-            sale_data = {
-                'id': sale.id,
-                'created_at': sale.created_at.isoformat(),
-                'salesperson_name': sale.salesperson.full_name,
-                'payment_method': sale.payment_method,
-                'payment_status': sale.payment_status,
-                'total_amount': float(sale.total_amount),
-                'amount_paid': float(sale.amount_paid),
-                'balance': float(sale.balance),
-                'products_sold': []
-            }
-            
-            # Add products to sale data
-            for item in sale.items.all():
-                sale_data['products_sold'].append({
-                    'name': item.product.name,
-                    'quantity': item.quantity,
-                    'price_at_sale': float(item.price_at_sale)
-                })
-            
-            # Generate PDF receipt
-            from .pdf_generator import generate_sale_receipt
-            pdf_data = generate_sale_receipt(sale_data)
-            
-            # Create HTTP response with PDF
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="receipt_{sale.id}.pdf"'
-            response['Content-Length'] = len(pdf_data)
-            
-            logger.info(f"PDF receipt generated for sale {sale.id} by user {request.user.email}")
-            return response
+            sale = load_sale(pk, salesperson=user if user.role == 'Salesperson' else None)
+            return _sale_receipt_response(request, sale, f'receipt_{sale.id}', as_attachment=True)
             
         except Sale.DoesNotExist:
             return Response(
@@ -338,7 +282,7 @@ class SaleReceiptView(APIView):
             )
 
 
-class PaymentListCreateView(generics.ListCreateAPIView):
+class PaymentListCreateView(ReplicaReadMixin, generics.ListCreateAPIView):
     """List all payments or create a new payment"""
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
@@ -346,78 +290,11 @@ class PaymentListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Filter payments based on query parameters and user role"""
-        user = self.request.user
-        queryset = Payment.objects.select_related('sale', 'recorded_by', 'sale__salesperson')
-        
-        # Role-based filtering: Salespersons can only see payments for their own sales
-        if user.role == 'Salesperson':
-            queryset = queryset.filter(sale__salesperson=user)
-        
-        # Filter by sale
-        sale_id = self.request.query_params.get('sale', None)
-        if sale_id:
-            queryset = queryset.filter(sale_id=sale_id)
-        
-        # Filter by customer name
-        customer_name = self.request.query_params.get('customer_name', None)
-        if customer_name:
-            queryset = queryset.filter(sale__customer_name__icontains=customer_name)
-        
-        # Filter by customer phone
-        customer_phone = self.request.query_params.get('customer_phone', None)
-        if customer_phone:
-            queryset = queryset.filter(sale__customer_phone__icontains=customer_phone)
-        
-        # Filter by payment status
-        status_filter = self.request.query_params.get('status', None)
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        
-        # Filter by payment method
-        payment_method = self.request.query_params.get('payment_method', None)
-        if payment_method:
-            queryset = queryset.filter(payment_method=payment_method)
-        
-        # Filter by sale payment status (debt/credit status)
-        sale_payment_status = self.request.query_params.get('sale_payment_status', None)
-        if sale_payment_status:
-            queryset = queryset.filter(sale__payment_status=sale_payment_status)
-        
-        # Filter by date range
-        date_from = self.request.query_params.get('date_from', None)
-        date_to = self.request.query_params.get('date_to', None)
-        
-        if date_from:
-            try:
-                date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__gte=date_from)
-            except ValueError:
-                pass
-        
-        if date_to:
-            try:
-                date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-                queryset = queryset.filter(created_at__date__lte=date_to)
-            except ValueError:
-                pass
-        
-        # Filter by time range (for more specific filtering)
-        time_from = self.request.query_params.get('time_from', None)
-        time_to = self.request.query_params.get('time_to', None)
-        
-        if time_from:
-            try:
-                time_from = datetime.strptime(time_from, '%H:%M').time()
-                queryset = queryset.filter(created_at__time__gte=time_from)
-            except ValueError:
-                pass
-        
-        if time_to:
-            try:
-                time_to = datetime.strptime(time_to, '%H:%M').time()
-                queryset = queryset.filter(created_at__time__lte=time_to)
-            except ValueError:
-                pass
+        queryset = filter_payments(
+            Payment.objects.select_related('sale', 'recorded_by', 'sale__salesperson'),
+            self.request.query_params,
+            self.request.user
+        )
         
         return queryset.order_by('-created_at')
     
@@ -454,9 +331,17 @@ class PaymentDetailView(generics.RetrieveUpdateAPIView):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@replica_reads
+@query_budget()
 def payment_summary(request):
-    """Get payment summary statistics"""
+    """Get payment summary statistics (?compare=previous|yoy adds period-over-period changes)"""
     user = request.user
+    compare = request.GET.get('compare') or None
+    if compare is not None and compare not in COMPARE_MODES:
+        return Response(
+            {'error': f"Invalid compare option. Use one of: {', '.join(COMPARE_MODES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     # Base queryset based on user role
     if user.role == 'Admin':
@@ -470,6 +355,15 @@ def payment_summary(request):
     date_from = request.GET.get('date_from', None)
     date_to = request.GET.get('date_to', None)
     
+    # Comparisons need a closed period; default to the last 30 days like the other reports
+    comparison = None
+    if compare:
+        today = timezone.now().date()
+        period_from = parse_date(date_from) or today - timedelta(days=30)
+        period_to = parse_date(date_to) or today
+        date_from, date_to = period_from.strftime('%Y-%m-%d'), period_to.strftime('%Y-%m-%d')
+        comparison = compare_periods(sales_queryset, period_from, period_to, compare)
+    
     if date_from:
         try:
             date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
@@ -541,7 +435,7 @@ def payment_summary(request):
     ).annotate(
         total_debt=Sum('balance'),
         sales_count=Count('id')
-    ).order_by('-total_debt')[:10]
+    ).order_by('-total_debt')[:embedded_list_limit(request.GET)]
     
     # Recent payments
     recent_payments = payments_queryset.select_related(
@@ -559,7 +453,7 @@ def payment_summary(request):
         } for payment in recent_payments
     ]
     
-    return Response({
+    data = {
         'total_payments': total_payments,
         'total_credits': total_credits,
         'total_partial_debts': total_partial_debts,
@@ -570,238 +464,242 @@ def payment_summary(request):
         'partial_payments_count': partial_payments_count,
         'customers_with_debt': list(customers_with_debt),
         'recent_payments': recent_payments_data
-    })
+    }
+    if comparison:
+        data['comparison'] = comparison
+    
+    return Response(data)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@replica_reads
+@query_budget(granularities=('total',), default_days=None, job_type=Job.TYPE_SALES_REPORT)
 def sales_report(request):
-    """Generate sales report"""
+    """Generate sales report (?compare=previous|yoy adds period-over-period changes)"""
+    try:
+        return Response(build_sales_report(request.user, request.GET))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@replica_reads
+@query_budget(job_type=Job.TYPE_INVENTORY_REPORT)
+def inventory_report(request):
+    """Generate inventory report (Admin only)"""
+    return Response(build_inventory_report(request.GET))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@replica_reads
+@query_budget(granularities=('day',))
+def inventory_trends(request):
+    """Daily stock levels from inventory snapshots (Admin only)"""
+    return Response(build_inventory_trends(request.GET))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@replica_reads
+@query_budget(granularities=('total',))
+def salesperson_leaderboard(request):
+    """Rank salespeople for a period against the previous period (Admin only)"""
+    return Response(build_salesperson_leaderboard(request.GET))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def reorder_suggestions(request):
+    """Days of stock cover and suggested reorder quantities per product (Admin only)"""
+    return Response(build_reorder_suggestions(request.GET))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def sales_analytics(request):
+    """
+    Sales summary, breakdowns, daily series and top products answered from
+    the in-memory sales cube. Admins can add ?verify=true to compare the
+    cube's totals with SQL.
+    """
     user = request.user
-    
-    # Get query parameters
-    date_from = request.GET.get('date_from', None)
-    date_to = request.GET.get('date_to', None)
-    salesperson_id = request.GET.get('salesperson', None)
-    payment_status = request.GET.get('payment_status', None)
-    
-    # Base queryset
-    queryset = Sale.objects.all()
-    
+    filters = {
+        'date_from': parse_date(request.GET.get('date_from')),
+        'date_to': parse_date(request.GET.get('date_to')),
+        'payment_status': request.GET.get('payment_status') or None,
+        'salesperson_id': None,
+    }
+
     # Role-based filtering
     if user.role == 'Salesperson':
-        queryset = queryset.filter(salesperson=user)
-    elif salesperson_id and user.role == 'Admin':
-        queryset = queryset.filter(salesperson_id=salesperson_id)
-    
-    # Date filtering
-    if date_from:
-        try:
-            date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-            queryset = queryset.filter(created_at__date__gte=date_from)
-        except ValueError:
-            pass
-    
-    if date_to:
+        filters['salesperson_id'] = user.id
+    elif request.GET.get('salesperson'):
         try:
-            date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-            queryset = queryset.filter(created_at__date__lte=date_to)
+            filters['salesperson_id'] = int(request.GET['salesperson'])
         except ValueError:
-            pass
-    
-    # Payment status filtering
-    if payment_status:
-        queryset = queryset.filter(payment_status=payment_status)
-    
-    # Calculate summary statistics
-    summary = queryset.aggregate(
-        total_sales=Count('id'),
-        total_revenue=Sum('total_amount'),
-        total_paid=Sum('amount_paid'),
-        total_balance=Sum('balance')
-    )
-    
-    # Payment method breakdown
-    payment_methods = queryset.values('payment_method').annotate(
-        count=Count('id'),
-        total=Sum('total_amount')
-    ).order_by('payment_method')
-    
-    # Payment status breakdown
-    payment_status_breakdown = queryset.values('payment_status').annotate(
-        count=Count('id'),
-        total=Sum('total_amount')
-    ).order_by('payment_status')
-    
-    # Top products (if Admin or specific date range)
-    top_products = []
-    if user.role == 'Admin' or (date_from and date_to):
-        sale_items = SaleItem.objects.filter(sale__in=queryset).values(
-            'product__name', 'product__sku'
-        ).annotate(
-            total_quantity=Sum('quantity'),
-            total_revenue=Sum('subtotal')
-        ).order_by('-total_quantity')[:10]
-        top_products = list(sale_items)
-    
-    return Response({
-        'summary': summary,
-        'payment_methods': list(payment_methods),
-        'payment_status': list(payment_status_breakdown),
-        'top_products': top_products,
-        'period': {
-            'from': date_from,
-            'to': date_to
-        }
-    })
+            return Response({'error': 'Invalid salesperson ID'}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = sales_cube.query(**filters)
+    data['period'] = {'from': filters['date_from'], 'to': filters['date_to']}
+    if user.role == 'Admin' and request.GET.get('verify', 'false').lower() == 'true':
+        data['consistency'] = sales_cube.check_consistency(**filters)
+    data['cube'] = sales_cube.stats()
+    return Response(data)
 
 
 @api_view(['GET'])
-@permission_classes([IsAdminUser])
-def inventory_report(request):
-    """Generate inventory report (Admin only)"""
-    # Get query parameters
-    category = request.GET.get('category', None)
-    stock_status = request.GET.get('stock_status', None)
-    active_only = request.GET.get('active_only', 'true').lower() == 'true'
-    
-    # Base queryset
-    queryset = Product.objects.all()
-    
-    # Apply filters
-    if active_only:
-        queryset = queryset.filter(is_active=True)
-    
-    if category:
-        queryset = queryset.filter(category__icontains=category)
-    
-    if stock_status == 'out_of_stock':
-        queryset = queryset.filter(stock_quantity=0)
-    elif stock_status == 'low_stock':
-        queryset = queryset.filter(stock_quantity__gt=0, stock_quantity__lte=10)
-    elif stock_status == 'in_stock':
-        queryset = queryset.filter(stock_quantity__gt=10)
-    
-    # Calculate summary statistics
-    summary = queryset.aggregate(
-        total_products=Count('id'),
-        total_stock_value=Sum('stock_quantity') * Sum('price') / Count('id') if queryset.exists() else 0,
-        out_of_stock=Count('id', filter=Q(stock_quantity=0)),
-        low_stock=Count('id', filter=Q(stock_quantity__gt=0, stock_quantity__lte=10)),
-        in_stock=Count('id', filter=Q(stock_quantity__gt=10))
-    )
-    
-    # Category breakdown
-    categories = queryset.values('category').annotate(
-        count=Count('id'),
-        total_stock=Sum('stock_quantity')
-    ).order_by('category')
-    
-    # Low stock items
-    low_stock_items = queryset.filter(
-        stock_quantity__gt=0, 
-        stock_quantity__lte=10
-    ).values('id', 'name', 'sku', 'stock_quantity', 'price')
-    
-    # Out of stock items
-    out_of_stock_items = queryset.filter(
-        stock_quantity=0
-    ).values('id', 'name', 'sku', 'price')
-    
+@permission_classes([permissions.IsAuthenticated])
+@replica_reads
+@query_budget()
+def sales_pivot(request):
+    """
+    Sales grouped by any of day/week/month, salesperson, category, product,
+    payment method and payment status, with count, revenue, paid, balance
+    and quantity totals (?dimensions=...&measures=...)
+    """
+    try:
+        return Response(build_pivot(request.user, request.GET))
+    except ReportRangeTooLarge as e:
+        return Response({'error': str(e), 'max_days': e.max_days}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ReceivablesAgingPagination(PageNumberPagination):
+    """Page through aging groups; clients may ask for up to 100 per page"""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes([JSONRenderer, CSVRenderer, XLSXRenderer])
+@replica_reads
+@query_budget()
+def receivables_aging(request):
+    """
+    Outstanding balances aged 0-30, 31-60, 61-90 and 90+ days,
+    grouped by customer or salesperson (?group_by=customer|salesperson).
+    Returns every group as CSV or XLSX with ?format=csv|xlsx.
+    """
+    report = build_receivables_aging(request.user, request.query_params)
+    export_format = request.accepted_renderer.format
+
+    if export_format in (CSVRenderer.format, XLSXRenderer.format):
+        columns = RECEIVABLES_AGING_EXPORT_COLUMNS[report['group_by']]
+        return export_response(
+            export_format, f"receivables_aging_by_{report['group_by']}",
+            columns, receivables_aging_rows(report['rows'], columns)
+        )
+
+    paginator = ReceivablesAgingPagination()
+    page = paginator.paginate_queryset(report['rows'], request)
     return Response({
-        'summary': summary,
-        'categories': list(categories),
-        'low_stock_items': list(low_stock_items),
-        'out_of_stock_items': list(out_of_stock_items),
-        'filters_applied': {
-            'category': category,
-            'stock_status': stock_status,
-            'active_only': active_only
-        }
+        'group_by': report['group_by'],
+        'as_of': report['as_of'],
+        'totals': report['totals'],
+        'count': paginator.page.paginator.count,
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': page
     })
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@replica_reads
+@query_budget(timeout=False)
 def dashboard_stats(request):
     """Get dashboard statistics for the user"""
-    user = request.user
-    today = timezone.now().date()
-    this_month_start = today.replace(day=1)
-    
-    if user.role == 'Admin':
-        # Admin can see all stats
-        sales_queryset = Sale.objects.all()
-        products_queryset = Product.objects.filter(is_active=True)
-        users_queryset = User.objects.filter(role='Salesperson', is_active=True)
-        
-        stats = {
-            'total_sales_today': sales_queryset.filter(created_at__date=today).count(),
-            'total_revenue_today': sales_queryset.filter(
-                created_at__date=today
-            ).aggregate(total=Sum('total_amount'))['total'] or 0,
-            'total_sales_this_month': sales_queryset.filter(
-                created_at__date__gte=this_month_start
-            ).count(),
-            'total_revenue_this_month': sales_queryset.filter(
-                created_at__date__gte=this_month_start
-            ).aggregate(total=Sum('total_amount'))['total'] or 0,
-            'total_products': products_queryset.count(),
-            'low_stock_products': products_queryset.filter(
-                stock_quantity__gt=0, stock_quantity__lte=10
-            ).count(),
-            'out_of_stock_products': products_queryset.filter(stock_quantity=0).count(),
-            'total_salespersons': users_queryset.count(),
-            'pending_payments': Sale.objects.filter(
-                payment_status__in=['partial', 'unpaid']
-            ).aggregate(total=Sum('balance'))['total'] or 0
-        }
+    # Only the request that computes the result runs under the statement timeout
+    return Response(coalesce(
+        request_key('dashboard', request.user, request.GET),
+        budgeted(lambda: build_dashboard_stats(request.user))
+    ))
+
+
+def _sale_pdf_response(request, sale, filename, as_attachment=False):
+    """
+    A sale's receipt served from the receipt cache, rendering it in the
+    render pool on a miss. Answers 503 with Retry-After when the pool is busy.
+    """
+    def render():
+        pdf = render_pool.render(sale)
+        logger.info(f"PDF receipt generated for sale {sale.id}")
+        return pdf
+
+    try:
+        return receipt_response(
+            request, sale, TEMPLATE_NAME, TEMPLATE_VERSION, render,
+            filename=filename, as_attachment=as_attachment
+        )
+    except RenderPoolUnavailable as e:
+        logger.warning(f"Receipt for sale {sale.id} not rendered: {e}")
+        response = Response(
+            {'error': 'Receipts are busy right now. Please try again shortly.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        response['Retry-After'] = str(settings.RECEIPT_RENDER_RETRY_AFTER_SECONDS)
+        return response
+
+
+def _sale_receipt_response(request, sale, name, as_attachment=False):
+    """
+    A sale's receipt in the negotiated format (?format=pdf|txt|escpos|html),
+    saved as `name` plus the format's extension. Thermal formats take
+    ?paper=58|80 (mm).
+    """
+    receipt_format = request.accepted_renderer.format
+    if receipt_format == PDFRenderer.format:
+        response = _sale_pdf_response(request, sale, f'{name}.pdf', as_attachment=as_attachment)
     else:
-        # Salesperson can only see their own stats
-        sales_queryset = Sale.objects.filter(salesperson=user)
-        
-        stats = {
-            'my_sales_today': sales_queryset.filter(created_at__date=today).count(),
-            'my_revenue_today': sales_queryset.filter(
-                created_at__date=today
-            ).aggregate(total=Sum('total_amount'))['total'] or 0,
-            'my_sales_this_month': sales_queryset.filter(
-                created_at__date__gte=this_month_start
-            ).count(),
-            'my_revenue_this_month': sales_queryset.filter(
-                created_at__date__gte=this_month_start
-            ).aggregate(total=Sum('total_amount'))['total'] or 0,
-            'my_pending_sales': sales_queryset.filter(
-                payment_status__in=['partial', 'unpaid']
-            ).count(),
-            'my_pending_amount': sales_queryset.filter(
-                payment_status__in=['partial', 'unpaid']
-            ).aggregate(total=Sum('balance'))['total'] or 0
-        }
-    
-    return Response(stats)
+        try:
+            template, render = compact_receipt(sale, receipt_format, request.query_params.get('paper'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        renderer = request.accepted_renderer
+        content_type = f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type
+        response = receipt_response(
+            request, sale, template, COMPACT_TEMPLATE_VERSION, render,
+            filename=f'{name}.{receipt_format}', as_attachment=as_attachment,
+            content_type=content_type, store=False
+        )
+    # The same URL serves several formats depending on Accept
+    patch_vary_headers(response, ['Accept'])
+    return response
 
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def render_pool_metrics(request):
+    """Depth and counters of the receipt render pool of the process serving the request (Admin only)"""
+    return Response(render_pool.metrics())
+
+
+@receipt_negotiation
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def generate_receipt_pdf(request, sale_id):
     """
-    Generate PDF receipt for a sale
+    Generate the receipt for a sale, a PDF unless another format is requested
     Only allows users to generate receipts for sales they can view
     """
     try:
         # Check if sale exists and user has permission to view it
-        sale = Sale.objects.get(id=sale_id)
+        sale = load_sale(sale_id)
         
         # Permission check: Admin can view all, Salesperson can view only their own
-        if request.user.role != 'Admin' and sale.salesperson != request.user:
+        if request.user.role != 'Admin' and sale.salesperson_id != request.user.id:
             return Response(
                 {'error': 'You do not have permission to generate receipt for this sale'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Generate and return PDF
-        pdf_response = generate_sale_receipt_pdf(sale_id)
-        return pdf_response
+        # Serve the cached PDF, rendering it on first request
+        return _sale_receipt_response(request, sale, f'receipt_sale_{sale.id}')
         
     except Sale.DoesNotExist:
         return Response(
@@ -816,31 +714,43 @@ def generate_receipt_pdf(request, sale_id):
         )
 
 
-@api_view(['POST'])
+@api_view(['POST', 'DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def create_pdf_token(request, sale_id):
     """
-    Create a secure token for unauthenticated PDF access
+    POST: create a signed token for unauthenticated PDF access
     Returns a token that can be used to download the PDF without authentication
+    DELETE: revoke a token ({"token": ...}) before it expires
     """
     try:
         # Check if sale exists and user has permission to view it
-        sale = Sale.objects.get(id=sale_id)
+        salesperson_id = Sale.objects.values_list('salesperson_id', flat=True).get(id=sale_id)
         
         # Permission check: Admin can view all, Salesperson can view only their own
-        if request.user.role != 'Admin' and sale.salesperson != request.user:
+        if request.user.role != 'Admin' and salesperson_id != request.user.id:
             return Response(
                 {'error': 'You do not have permission to generate receipt for this sale'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Create a new PDF access token
-        pdf_token = PDFAccessToken.objects.create(sale=sale)
+        if request.method == 'DELETE':
+            token = str(request.data.get('token', ''))
+            try:
+                if read_token(token).get('sale') != sale_id:
+                    raise InvalidPDFToken('Invalid token')
+                revoke_token(token)
+            except InvalidPDFToken as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            logger.info(f"PDF token for sale {sale_id} revoked by {request.user.email}")
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        
+        # Signed tokens are checked without a database lookup, so nothing is stored
+        token, expires_at = create_token(sale_id)
         
         return Response({
-            'token': str(pdf_token.token),
-            'expires_at': pdf_token.expires_at.isoformat(),
-            'download_url': f'/api/sales/{sale_id}/pdf/{pdf_token.token}/'
+            'token': token,
+            'expires_at': expires_at.isoformat(),
+            'download_url': f'/api/sales/{sale_id}/pdf/{token}/'
         }, status=status.HTTP_201_CREATED)
         
     except Sale.DoesNotExist:
@@ -856,32 +766,37 @@ def create_pdf_token(request, sale_id):
         )
 
 
+def _legacy_token_is_valid(sale_id, token):
+    """Check an unsigned UUID token issued before tokens were signed"""
+    try:
+        return PDFAccessToken.objects.get(token=uuid.UUID(token), sale_id=sale_id).is_valid()
+    except (ValueError, PDFAccessToken.DoesNotExist):
+        raise InvalidPDFToken('Invalid token')
+
+
+@receipt_negotiation
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])  # No authentication required
 def download_pdf_with_token(request, sale_id, token):
     """
-    Download PDF using a secure token (no authentication required)
+    Download the receipt using a secure token (no authentication required)
     """
     try:
-        # Find the token
-        pdf_token = PDFAccessToken.objects.get(token=token, sale_id=sale_id)
+        # Check the token's signature, sale and expiry
+        if ':' in token:
+            verify_token(token, sale_id)
+        elif not _legacy_token_is_valid(sale_id, token):
+            raise ExpiredPDFToken('Token has expired or is invalid')
         
-        # Check if token is valid
-        if not pdf_token.is_valid():
-            return Response(
-                {'error': 'Token has expired or is invalid'}, 
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-        
-        # Mark token as used (optional - you might want to allow multiple downloads)
-        # pdf_token.is_used = True
-        # pdf_token.save()
-        
-        # Generate and return PDF
-        pdf_response = generate_sale_receipt_pdf(sale_id)
-        return pdf_response
+        # Serve the cached PDF, rendering it on first request
+        return _sale_receipt_response(request, load_sale(sale_id), f'receipt_sale_{sale_id}')
         
-    except PDFAccessToken.DoesNotExist:
+    except ExpiredPDFToken as e:
+        return Response(
+            {'error': str(e)}, 
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    except (InvalidPDFToken, Sale.DoesNotExist):
         return Response(
             {'error': 'Invalid token'}, 
             status=status.HTTP_404_NOT_FOUND
@@ -896,146 +811,44 @@ def download_pdf_with_token(request, sale_id, token):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
-def comprehensive_reports(request):
-    """Generate comprehensive reports with chart data"""
-    user = request.user
-    today = timezone.now().date()
-    
-    # Get query parameters
-    date_from = request.GET.get('date_from', None)
-    date_to = request.GET.get('date_to', None)
-    
-    # Default to last 30 days if no dates provided
-    if not date_from:
-        date_from = today - timedelta(days=30)
-    else:
-        try:
-            date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-        except ValueError:
-            date_from = today - timedelta(days=30)
-    
-    if not date_to:
-        date_to = today
-    else:
-        try:
-            date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-        except ValueError:
-            date_to = today
-    
-    # Base querysets
-    sales_queryset = Sale.objects.filter(created_at__date__gte=date_from, created_at__date__lte=date_to)
-    products_queryset = Product.objects.filter(is_active=True)
-    payments_queryset = Payment.objects.filter(created_at__date__gte=date_from, created_at__date__lte=date_to)
-    
-    # Role-based filtering
-    if user.role == 'Salesperson':
-        sales_queryset = sales_queryset.filter(salesperson=user)
-        payments_queryset = payments_queryset.filter(sale__salesperson=user)
-    
-    # Chart Data - Daily Sales for the period
-    chart_data = []
-    current_date = date_from
-    while current_date <= date_to:
-        daily_sales = sales_queryset.filter(created_at__date=current_date).aggregate(
-            total_amount=Sum('total_amount'),
-            count=Count('id')
-        )
-        chart_data.append({
-            'date': current_date.strftime('%Y-%m-%d'),
-            'sales_amount': float(daily_sales['total_amount'] or 0),
-            'sales_count': daily_sales['count']
-        })
-        current_date += timedelta(days=1)
-    
-    # Sales Summary
-    sales_summary = sales_queryset.aggregate(
-        total_sales=Count('id'),
-        total_revenue=Sum('total_amount'),
-        total_paid=Sum('amount_paid'),
-        total_balance=Sum('balance')
+@replica_reads
+@query_budget()
+def customer_statement(request):
+    """
+    Stream a customer's statement as a PDF: every sale and payment in the
+    period with the running balance (?customer_phone= or ?customer_name=,
+    ?date_from=, ?date_to=). Salespeople only see their own sales.
+    """
+    try:
+        customer = statement_customer(request.query_params)
+        date_from, date_to = statement_period(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    salesperson = request.user if request.user.role == 'Salesperson' else None
+    statement = build_statement(customer, date_from, date_to, salesperson=salesperson)
+    logger.info(
+        f"Statement with {len(statement['entries'])} entries for {customer[0]}={customer[1]} "
+        f"requested by {request.user.email}"
     )
-    
-    # Payment Status Breakdown
-    payment_status_breakdown = sales_queryset.values('payment_status').annotate(
-        count=Count('id'),
-        total=Sum('total_amount')
-    ).order_by('payment_status')
-    
-    # Top Products
-    top_products = SaleItem.objects.filter(sale__in=sales_queryset).values(
-        'product__name', 'product__sku', 'product__price'
-    ).annotate(
-        total_quantity=Sum('quantity'),
-        total_revenue=Sum('subtotal')
-    ).order_by('-total_quantity')[:10]
-    
-    # Inventory Status (Admin only)
-    inventory_status = {}
-    if user.role == 'Admin':
-        inventory_status = {
-            'total_products': products_queryset.count(),
-            'out_of_stock': products_queryset.filter(stock_quantity=0).count(),
-            'low_stock': products_queryset.filter(stock_quantity__gt=0, stock_quantity__lte=10).count(),
-            'in_stock': products_queryset.filter(stock_quantity__gt=10).count(),
-            'low_stock_items': list(products_queryset.filter(
-                stock_quantity__gt=0, stock_quantity__lte=10
-            ).values('id', 'name', 'sku', 'stock_quantity', 'price')[:10]),
-            'out_of_stock_items': list(products_queryset.filter(
-                stock_quantity=0
-            ).values('id', 'name', 'sku', 'price')[:10])
-        }
-    
-    # Credit/Debt Summary
-    credit_summary = {
-        'total_unpaid_sales': sales_queryset.filter(payment_status='unpaid').count(),
-        'total_partial_sales': sales_queryset.filter(payment_status='partial').count(),
-        'total_outstanding_balance': sales_queryset.filter(
-            payment_status__in=['unpaid', 'partial']
-        ).aggregate(total=Sum('balance'))['total'] or 0,
-        'unpaid_sales': list(sales_queryset.filter(
-            payment_status='unpaid'
-        ).values(
-            'id', 'customer_name', 'customer_phone', 'total_amount', 'balance', 'created_at'
-        )[:10]),
-        'partial_sales': list(sales_queryset.filter(
-            payment_status='partial'
-        ).values(
-            'id', 'customer_name', 'customer_phone', 'total_amount', 'amount_paid', 'balance', 'created_at'
-        )[:10])
-    }
-    
-    # Payment Summary
-    payment_summary = payments_queryset.aggregate(
-        total_payments=Count('id'),
-        total_amount=Sum('amount')
+    response = StreamingHttpResponse(stream_statement(statement), content_type='application/pdf')
+    response['Content-Disposition'] = (
+        f'attachment; filename="statement_{date_from:%Y%m%d}_{date_to:%Y%m%d}.pdf"'
     )
-    
-    # Recent Activity
-    recent_sales = list(sales_queryset.order_by('-created_at')[:5].values(
-        'id', 'customer_name', 'total_amount', 'payment_status', 'created_at'
-    ))
-    
-    recent_payments = list(payments_queryset.order_by('-created_at')[:5].values(
-        'id', 'sale__customer_name', 'amount', 'payment_method', 'created_at'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@replica_reads
+@query_budget(granularities=('day', 'week', 'month'), job_type=Job.TYPE_COMPREHENSIVE_REPORT, timeout=False)
+def comprehensive_reports(request):
+    """Generate comprehensive reports with chart data"""
+    return Response(coalesce(
+        request_key('comprehensive', request.user, request.GET),
+        budgeted(lambda: build_comprehensive_report(request.user, request.GET))
     ))
-    
-    return Response({
-        'chart_data': chart_data,
-        'sales_summary': sales_summary,
-        'payment_status_breakdown': list(payment_status_breakdown),
-        'top_products': list(top_products),
-        'inventory_status': inventory_status,
-        'credit_summary': credit_summary,
-        'payment_summary': payment_summary,
-        'recent_activity': {
-            'sales': recent_sales,
-            'payments': recent_payments
-        },
-        'period': {
-            'from': date_from.strftime('%Y-%m-%d'),
-            'to': date_to.strftime('%Y-%m-%d')
-        }
-    })
 
 
 @api_view(['PATCH'])
@@ -1097,3 +910,228 @@ def update_sale_payment_status(request, pk):
             {'error': 'An error occurred while updating the payment status'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes([CSVRenderer, XLSXRenderer])
+def export_sales(request):
+    """
+    Stream sales with their line items as CSV or XLSX (?format=csv|xlsx)
+    Accepts the same filters as the sales list endpoint
+    """
+    queryset = filter_sales(Sale.objects.all(), request.query_params, request.user).order_by('-created_at')
+    logger.info(f"Sales export ({request.accepted_renderer.format}) requested by {request.user.email}")
+    return export_response(
+        request.accepted_renderer.format, 'sales', SALE_EXPORT_COLUMNS, sale_export_rows(queryset)
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes([CSVRenderer, XLSXRenderer])
+def export_payments(request):
+    """
+    Stream payments as CSV or XLSX (?format=csv|xlsx)
+    Accepts the same filters as the payments list endpoint
+    """
+    queryset = filter_payments(Payment.objects.all(), request.query_params, request.user).order_by('-created_at')
+    logger.info(f"Payments export ({request.accepted_renderer.format}) requested by {request.user.email}")
+    return export_response(
+        request.accepted_renderer.format, 'payments', PAYMENT_EXPORT_COLUMNS, payment_export_rows(queryset)
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@renderer_classes([CSVRenderer, XLSXRenderer])
+def export_inventory(request):
+    """
+    Stream the product inventory as CSV or XLSX (?format=csv|xlsx, Admin only)
+    Accepts the same filters as the products list endpoint
+    """
+    queryset = filter_products(Product.objects.all(), request.query_params).order_by('name')
+    logger.info(f"Inventory export ({request.accepted_renderer.format}) requested by {request.user.email}")
+    return export_response(
+        request.accepted_renderer.format, 'inventory', INVENTORY_EXPORT_COLUMNS, inventory_export_rows(queryset)
+    )
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAdminUser])
+def parquet_export(request):
+    """
+    GET: partitions exported so far (Admin only)
+    POST: queue a Parquet export of the sales fact tables as a background job
+    """
+    if request.method == 'GET':
+        return Response(load_manifest())
+
+    if not parquet_available():
+        return Response(
+            {'error': 'Parquet export is not available on this server (pyarrow is not installed)'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    tables = request.data.get('tables', list(EXPORT_TABLES))
+    if isinstance(tables, str):
+        tables = tables.split(',')
+    unknown = set(tables) - set(EXPORT_TABLES)
+    if unknown:
+        return Response(
+            {'error': f"Unknown table(s): {', '.join(sorted(unknown))}. Choose from {', '.join(EXPORT_TABLES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    job = Job.objects.create(
+        job_type=Job.TYPE_PARQUET_EXPORT,
+        params={
+            'tables': ','.join(tables),
+            'full': 'true' if str(request.data.get('full', False)).lower() == 'true' else 'false'
+        },
+        created_by=request.user
+    )
+    logger.info(f"Parquet export job {job.id} queued by {request.user.email}")
+    return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAdminUser])
+def bulk_receipts(request):
+    """
+    Receipts of every sale in a date range (Admin only)
+    GET: stream them as a ZIP of PDFs or one combined PDF (?output=zip|pdf)
+    POST: render them in a background job with progress reporting
+    Accepts date_from, date_to (both required), salesperson and payment_status
+    """
+    params = request.query_params if request.method == 'GET' else request.data
+    output = params.get('output', 'zip')
+    if output not in RECEIPT_FORMATS:
+        return Response(
+            {'error': f"Invalid output. Use one of: {', '.join(RECEIPT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    date_from = parse_date(params.get('date_from'))
+    date_to = parse_date(params.get('date_to'))
+    if not date_from or not date_to:
+        return Response(
+            {'error': 'date_from and date_to are required (YYYY-MM-DD)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    filters = {
+        key: str(params[key]) for key in ('date_from', 'date_to', 'salesperson', 'payment_status')
+        if params.get(key)
+    }
+    if request.method == 'POST':
+        job = Job.objects.create(
+            job_type=Job.TYPE_RECEIPTS_EXPORT,
+            params={**filters, 'output': output},
+            created_by=request.user
+        )
+        logger.info(f"Bulk receipts job {job.id} queued by {request.user.email}")
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    sale_ids = receipt_sale_ids(request.user, filters)
+    logger.info(f"Bulk receipts ({output}, {len(sale_ids)} sales) requested by {request.user.email}")
+    response = StreamingHttpResponse(stream_receipts(sale_ids, output), content_type=RECEIPT_FORMATS[output])
+    response['Content-Disposition'] = (
+        f'attachment; filename="receipts_{date_from:%Y%m%d}_{date_to:%Y%m%d}.{output}"'
+    )
+    # Lets clients show progress while the archive streams
+    response['X-Receipt-Count'] = len(sale_ids)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class JobListCreateView(generics.ListCreateAPIView):
+    """List background jobs or submit a new report/export job"""
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        """Admins see all jobs, salespersons only their own"""
+        user = self.request.user
+        queryset = Job.objects.select_related('created_by')
+        
+        if user.role == 'Salesperson':
+            queryset = queryset.filter(created_by=user)
+        
+        status_filter = self.request.query_params.get('status', None)
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        
+        return queryset.order_by('-created_at')
+    
+    def create(self, request, *args, **kwargs):
+        """Queue the job and return 202 Accepted"""
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+    
+    def perform_create(self, serializer):
+        """Ensure only admins can queue inventory and analytics jobs"""
+        if serializer.validated_data['job_type'] in Job.ADMIN_ONLY_TYPES and self.request.user.role != 'Admin':
+            raise PermissionDenied("Only administrators can run this type of job.")
+        job = serializer.save()
+        logger.info(f"Job {job.id} ({job.job_type}) queued by {self.request.user.email}")
+
+
+class JobDetailView(generics.RetrieveAPIView):
+    """Get the status and progress of a background job"""
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        """Admins see all jobs, salespersons only their own"""
+        user = self.request.user
+        queryset = Job.objects.select_related('created_by')
+        
+        if user.role == 'Salesperson':
+            queryset = queryset.filter(created_by=user)
+        
+        return queryset
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def download_job_result(request, pk):
+    """
+    Download the result file of a completed job
+    Returns 409 while the job is still running and 410 once the result has expired
+    """
+    try:
+        job = Job.objects.get(pk=pk)
+        
+        # Permission check: Admin can download all, Salesperson only their own jobs
+        if request.user.role != 'Admin' and job.created_by_id != request.user.id:
+            return Response(
+                {'error': 'Job not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        if job.status != Job.STATUS_COMPLETED:
+            return Response(
+                {'error': f'Job is {job.status.lower()}; no result is available'}, 
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        path = result_path(job.result_file) if job.result_file else None
+        if job.is_expired or path is None or not path.exists():
+            return Response(
+                {'error': 'Job result has expired'}, 
+                status=status.HTTP_410_GONE
+            )
+        
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=f'job_{job.id}_{job.job_type}{path.suffix}',
+            content_type=job.result_content_type
+        )
+        
+    except Job.DoesNotExist:
+        return Response(
+            {'error': 'Job not found'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
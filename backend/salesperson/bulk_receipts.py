@@ -0,0 +1,111 @@
+"""
+Bulk receipt export for a date range
+
+Receipts are rendered in a process pool, one process per core by
+default (settings.BULK_RECEIPT_WORKERS). The parent process loads sales
+in batches of settings.BULK_RECEIPT_BATCH_SIZE, each batch in one query
+(see receipts.load_sales). Workers only render, so they never touch the
+database. Two batches are in flight at a time, so workers keep rendering
+while the parent writes out the previous batch.
+
+The result streams as it is produced, in sale order, in one of two forms:
+
+- ``zip``: one PDF per sale, stored uncompressed because PDF pages are
+  already compressed
+- ``pdf``: a single document with every receipt, joined as it streams
+  (see pdf_stream.py)
+"""
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from .exports import _ZipStream
+from .filters import filter_by_date_range, filter_sales
+from .models import Sale
+from .pdf_stream import concatenate_pdfs
+from .receipts import load_sales, render_receipt, setup_worker_process
+
+FORMATS = {
+    'zip': 'application/zip',
+    'pdf': 'application/pdf',
+}
+
+
+def receipt_sale_ids(user, params):
+    """
+    IDs of the sales matching the export filters, oldest first.
+    Without a user (management commands) every salesperson's sales match.
+    """
+    if user is None:
+        queryset = filter_by_date_range(Sale.objects.all(), params)
+        if params.get('salesperson'):
+            queryset = queryset.filter(salesperson_id=params['salesperson'])
+        if params.get('payment_status'):
+            queryset = queryset.filter(payment_status=params['payment_status'])
+    else:
+        queryset = filter_sales(Sale.objects.all(), params, user)
+    return list(queryset.order_by('created_at', 'id').values_list('id', flat=True))
+
+
+def iter_sales(sale_ids, batch_size=None):
+    """Yield batches of sales loaded for their receipts"""
+    batch_size = batch_size or settings.BULK_RECEIPT_BATCH_SIZE
+    for start in range(0, len(sale_ids), batch_size):
+        yield load_sales(sale_ids[start:start + batch_size])
+
+
+def render_receipts(batches, workers=None):
+    """
+    Yield (sale, pdf bytes) for every sale in `batches`, in order.
+    With a single worker receipts are rendered in this process.
+    """
+    workers = workers or settings.BULK_RECEIPT_WORKERS or os.cpu_count() or 1
+    if workers <= 1:
+        for batch in batches:
+            for sale in batch:
+                yield sale, render_receipt(sale)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=setup_worker_process) as pool:
+        pending = deque()
+        for batch in batches:
+            chunksize = max(1, len(batch) // (workers * 4))
+            pending.append((batch, pool.map(render_receipt, batch, chunksize=chunksize)))
+            if len(pending) > 1:
+                yield from zip(*pending.popleft())
+        while pending:
+            yield from zip(*pending.popleft())
+
+
+def stream_zip(rendered):
+    """Yield a ZIP archive with one receipt_<id>.pdf per rendered receipt"""
+    buffer = _ZipStream()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for sale, pdf in rendered:
+            archive.writestr(f'receipt_{sale.id}.pdf', pdf)
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def stream_pdf(rendered):
+    """Yield one PDF document containing every rendered receipt's pages"""
+    return concatenate_pdfs(pdf for _, pdf in rendered)
+
+
+def stream_receipts(sale_ids, export_format, workers=None, progress=None):
+    """
+    Yield the bytes of the bulk export of `sale_ids` in `export_format`.
+    progress(done, total) is called after each receipt is written.
+    """
+    rendered = render_receipts(iter_sales(sale_ids), workers)
+    if progress is not None:
+        rendered = _with_progress(rendered, len(sale_ids), progress)
+    writer = stream_pdf if export_format == 'pdf' else stream_zip
+    return writer(rendered)
+
+
+def _with_progress(rendered, total, progress):
+    for done, receipt in enumerate(rendered, start=1):
+        yield receipt
+        progress(done, total)
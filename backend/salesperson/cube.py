@@ -0,0 +1,382 @@
+"""
+In-memory columnar sales cube
+
+Each process keeps sales and sale items as parallel NumPy arrays (one per
+column) so the analytics endpoint can filter and group with vectorized
+masks and np.bincount instead of a database round trip.
+
+The cube is built on first use (or at process start, see
+SALES_CUBE_PRELOAD) and then kept current incrementally:
+
+- new sales and their items are appended by id high-water mark
+- sales edited since the last refresh (payments, status changes) are
+  patched in place by their updated_at
+- product names and prices are refreshed by updated_at
+
+A refresh runs at most every SALES_CUBE_REFRESH_SECONDS, or immediately
+when the sales version changes. If sales were deleted the cube is rebuilt
+from scratch. check_consistency() compares the cube with SQL aggregates.
+"""
+import logging
+import threading
+import time
+from datetime import date
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from .models import Product, Sale, SaleItem
+from .rollups import sales_version
+
+logger = logging.getLogger(__name__)
+
+SALE_COLUMNS = ('id', 'day', 'salesperson_id', 'status', 'method', 'amount', 'paid', 'balance')
+ITEM_COLUMNS = ('sale', 'product_id', 'quantity', 'subtotal')
+
+
+def _day_number(value):
+    """Dates are stored as proleptic Gregorian ordinals (int32)."""
+    return value.toordinal()
+
+
+def _money(value):
+    return round(float(value), 2)
+
+
+class _Labels:
+    """Map strings to small integer codes, growing as new values appear."""
+
+    def __init__(self, labels=()):
+        self.labels = list(labels)
+        self.codes = {label: code for code, label in enumerate(self.labels)}
+
+    def code(self, label):
+        if label not in self.codes:
+            self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return self.codes[label]
+
+
+class _Snapshot:
+    """Immutable set of column arrays; refreshes build a new snapshot."""
+
+    def __init__(self, sales, items, statuses, methods, products, synced_until, version):
+        self.sales = sales
+        self.items = items
+        self.statuses = statuses
+        self.methods = methods
+        self.products = products
+        self.synced_until = synced_until
+        self.version = version
+        self.refreshed_at = time.monotonic()
+
+    @property
+    def high_water(self):
+        return int(self.sales['id'][-1]) if len(self.sales['id']) else 0
+
+
+def _sale_rows(queryset, statuses, methods):
+    """Read sales into column lists, ordered by id."""
+    columns = {name: [] for name in SALE_COLUMNS}
+    latest = None
+    rows = queryset.annotate(day=TruncDate('created_at')).order_by('id').values_list(
+        'id', 'day', 'salesperson_id', 'payment_status', 'payment_method',
+        'total_amount', 'amount_paid', 'balance', 'updated_at'
+    )
+    for sale_id, day, salesperson_id, status, method, amount, paid, balance, updated_at in rows.iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    ):
+        columns['id'].append(sale_id)
+        columns['day'].append(_day_number(day))
+        columns['salesperson_id'].append(salesperson_id)
+        columns['status'].append(statuses.code(status))
+        columns['method'].append(methods.code(method))
+        columns['amount'].append(float(amount or 0))
+        columns['paid'].append(float(paid or 0))
+        columns['balance'].append(float(balance or 0))
+        if latest is None or updated_at > latest:
+            latest = updated_at
+    return columns, latest
+
+
+def _sale_arrays(columns):
+    return {
+        'id': np.array(columns['id'], dtype=np.int64),
+        'day': np.array(columns['day'], dtype=np.int32),
+        'salesperson_id': np.array(columns['salesperson_id'], dtype=np.int64),
+        'status': np.array(columns['status'], dtype=np.int16),
+        'method': np.array(columns['method'], dtype=np.int16),
+        'amount': np.array(columns['amount'], dtype=np.float64),
+        'paid': np.array(columns['paid'], dtype=np.float64),
+        'balance': np.array(columns['balance'], dtype=np.float64),
+    }
+
+
+def _item_arrays(queryset, sale_ids):
+    """
+    Read sale items into arrays; `sale` holds the row of the item's sale in the sales arrays.
+    Items of sales missing from `sale_ids` (committed after the sales were read) are left
+    out; they are picked up with their sale on a later refresh.
+    """
+    item_sale_ids, product_ids, quantities, subtotals = [], [], [], []
+    rows = queryset.order_by('sale_id', 'id').values_list('sale_id', 'product_id', 'quantity', 'subtotal')
+    for sale_id, product_id, quantity, subtotal in rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        item_sale_ids.append(sale_id)
+        product_ids.append(product_id)
+        quantities.append(quantity)
+        subtotals.append(float(subtotal or 0))
+    item_sale_ids = np.array(item_sale_ids, dtype=np.int64)
+    sale_rows = np.searchsorted(sale_ids, item_sale_ids).astype(np.int64)
+    known = sale_rows < len(sale_ids)
+    known[known] = sale_ids[sale_rows[known]] == item_sale_ids[known]
+    return {
+        'sale': sale_rows[known],
+        'product_id': np.array(product_ids, dtype=np.int64)[known],
+        'quantity': np.array(quantities, dtype=np.int64)[known],
+        'subtotal': np.array(subtotals, dtype=np.float64)[known],
+    }
+
+
+def _product_rows(queryset):
+    products = {}
+    latest = None
+    for product_id, name, sku, price, updated_at in queryset.values_list('id', 'name', 'sku', 'price', 'updated_at'):
+        products[product_id] = {'name': name, 'sku': sku, 'price': price}
+        if latest is None or updated_at > latest:
+            latest = updated_at
+    return products, latest
+
+
+class SalesCube:
+    """Process-wide columnar copy of sales and sale items."""
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        """Load every sale and sale item from the database."""
+        statuses = _Labels(code for code, _ in Sale.PAYMENT_STATUS_CHOICES)
+        methods = _Labels(code for code, _ in Sale.PAYMENT_METHOD_CHOICES)
+        version = sales_version()
+        columns, sales_synced = _sale_rows(Sale.objects.all(), statuses, methods)
+        sales = _sale_arrays(columns)
+        # Bounded by the sales read above; later sales come with the next refresh
+        high_water = int(sales['id'][-1]) if len(sales['id']) else 0
+        items = _item_arrays(SaleItem.objects.filter(sale_id__lte=high_water), sales['id'])
+        products, products_synced = _product_rows(Product.objects.all())
+        snapshot = _Snapshot(
+            sales, items, statuses, methods, products,
+            {'sales': sales_synced, 'products': products_synced}, version
+        )
+        logger.info(f"Sales cube built with {len(sales['id'])} sales and {len(items['sale'])} items")
+        return snapshot
+
+    def _refresh(self, snapshot):
+        """Apply changes made since `snapshot` was taken, returning a new snapshot."""
+        version = sales_version()
+        high_water = snapshot.high_water
+
+        # Deleted sales cannot be found incrementally; rebuild when rows went missing
+        if Sale.objects.filter(id__lte=high_water).count() != len(snapshot.sales['id']):
+            return self.build()
+
+        statuses, methods = snapshot.statuses, snapshot.methods
+        sales = snapshot.sales
+        synced = dict(snapshot.synced_until)
+
+        # Patch sales edited since the last refresh (payments update amount_paid/balance)
+        if synced['sales'] is not None:
+            changed, latest = _sale_rows(
+                Sale.objects.filter(id__lte=high_water, updated_at__gte=synced['sales']), statuses, methods
+            )
+            if changed['id']:
+                sales = {name: column.copy() for name, column in sales.items()}
+                rows = np.searchsorted(sales['id'], np.array(changed['id'], dtype=np.int64))
+                for name, column in _sale_arrays(changed).items():
+                    sales[name][rows] = column
+                synced['sales'] = max(synced['sales'], latest)
+
+        # Append new sales and their items
+        new_columns, latest = _sale_rows(Sale.objects.filter(id__gt=high_water), statuses, methods)
+        items = snapshot.items
+        if new_columns['id']:
+            new_sales = _sale_arrays(new_columns)
+            new_items = _item_arrays(
+                SaleItem.objects.filter(sale_id__gt=high_water, sale_id__lte=int(new_sales['id'][-1])),
+                new_sales['id']
+            )
+            new_items['sale'] += len(sales['id'])
+            sales = {name: np.concatenate([sales[name], new_sales[name]]) for name in SALE_COLUMNS}
+            items = {name: np.concatenate([items[name], new_items[name]]) for name in ITEM_COLUMNS}
+            synced['sales'] = latest if synced['sales'] is None else max(synced['sales'], latest)
+
+        # Product names and prices
+        products = snapshot.products
+        product_changes = Product.objects.all()
+        if synced['products'] is not None:
+            product_changes = product_changes.filter(updated_at__gte=synced['products'])
+        changed_products, latest = _product_rows(product_changes)
+        if changed_products:
+            products = {**products, **changed_products}
+            synced['products'] = latest if synced['products'] is None else max(synced['products'], latest)
+
+        return _Snapshot(sales, items, statuses, methods, products, synced, version)
+
+    def snapshot(self, force_refresh=False):
+        """Current snapshot, building or refreshing it first if it is stale."""
+        snapshot = self._snapshot
+        if snapshot is not None and not force_refresh:
+            fresh = time.monotonic() - snapshot.refreshed_at < settings.SALES_CUBE_REFRESH_SECONDS
+            if fresh and snapshot.version == sales_version():
+                return snapshot
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._snapshot is not snapshot and not force_refresh:
+                return self._snapshot
+            if self._snapshot is None:
+                self._snapshot = self.build()
+            else:
+                self._snapshot = self._refresh(self._snapshot)
+            return self._snapshot
+
+    def reset(self):
+        """Drop the cube; the next query rebuilds it."""
+        with self._lock:
+            self._snapshot = None
+
+    def query(self, date_from=None, date_to=None, salesperson_id=None, payment_status=None, top=10):
+        """Sales summary, breakdowns, daily series and top products for the filters."""
+        cube = self.snapshot()
+        sales, items = cube.sales, cube.items
+
+        mask = np.ones(len(sales['id']), dtype=bool)
+        if date_from:
+            mask &= sales['day'] >= _day_number(date_from)
+        if date_to:
+            mask &= sales['day'] <= _day_number(date_to)
+        if salesperson_id is not None:
+            mask &= sales['salesperson_id'] == int(salesperson_id)
+        if payment_status:
+            status_code = cube.statuses.codes.get(payment_status)
+            mask &= (sales['status'] == status_code) if status_code is not None else False
+
+        summary = {
+            'total_sales': int(mask.sum()),
+            'total_revenue': _money(sales['amount'][mask].sum()),
+            'total_paid': _money(sales['paid'][mask].sum()),
+            'total_balance': _money(sales['balance'][mask].sum()),
+        }
+
+        def breakdown(codes, labels, field):
+            counts = np.bincount(codes[mask], minlength=len(labels.labels))
+            totals = np.bincount(codes[mask], weights=sales['amount'][mask], minlength=len(labels.labels))
+            return [
+                {field: label, 'count': int(counts[code]), 'total': _money(totals[code])}
+                for code, label in enumerate(labels.labels) if counts[code]
+            ]
+
+        # Daily series over the selected days
+        daily = []
+        days = sales['day'][mask]
+        if len(days):
+            first = _day_number(date_from) if date_from else int(days.min())
+            last = _day_number(date_to) if date_to else int(days.max())
+            offsets = days - first
+            span = last - first + 1
+            counts = np.bincount(offsets, minlength=span)[:span]
+            amounts = np.bincount(offsets, weights=sales['amount'][mask], minlength=span)[:span]
+            daily = [
+                {
+                    'date': date.fromordinal(first + offset).strftime('%Y-%m-%d'),
+                    'sales_amount': _money(amounts[offset]),
+                    'sales_count': int(counts[offset])
+                }
+                for offset in range(span)
+            ]
+
+        # Top products by units sold among the selected sales' items
+        item_mask = mask[items['sale']] if len(items['sale']) else np.zeros(0, dtype=bool)
+        top_products = []
+        if item_mask.any():
+            product_ids, inverse = np.unique(items['product_id'][item_mask], return_inverse=True)
+            quantities = np.bincount(inverse, weights=items['quantity'][item_mask])
+            revenue = np.bincount(inverse, weights=items['subtotal'][item_mask])
+            # Sort by quantity descending, then product id for a stable order
+            order = np.lexsort((product_ids, -quantities))[:top]
+            for index in order:
+                product = cube.products.get(int(product_ids[index]), {})
+                top_products.append({
+                    'product__name': product.get('name'),
+                    'product__sku': product.get('sku'),
+                    'total_quantity': int(quantities[index]),
+                    'total_revenue': _money(revenue[index]),
+                })
+
+        return {
+            'summary': summary,
+            'payment_methods': breakdown(sales['method'], cube.methods, 'payment_method'),
+            'payment_status': breakdown(sales['status'], cube.statuses, 'payment_status'),
+            'daily': daily,
+            'top_products': top_products,
+        }
+
+    def check_consistency(self, **filters):
+        """
+        Compare cube totals with the same aggregates computed in SQL.
+        Returns a dict with both results and whether they match.
+        """
+        result = self.query(**filters)['summary']
+
+        queryset = Sale.objects.all()
+        if filters.get('date_from'):
+            queryset = queryset.filter(created_at__date__gte=filters['date_from'])
+        if filters.get('date_to'):
+            queryset = queryset.filter(created_at__date__lte=filters['date_to'])
+        if filters.get('salesperson_id') is not None:
+            queryset = queryset.filter(salesperson_id=filters['salesperson_id'])
+        if filters.get('payment_status'):
+            queryset = queryset.filter(payment_status=filters['payment_status'])
+        database = queryset.aggregate(
+            total_sales=Count('id'),
+            total_revenue=Sum('total_amount'),
+            total_paid=Sum('amount_paid'),
+            total_balance=Sum('balance')
+        )
+        database = {
+            key: value if key == 'total_sales' else _money(value or 0)
+            for key, value in database.items()
+        }
+        return {'consistent': database == result, 'cube': result, 'database': database}
+
+    def stats(self):
+        """Size and age of the current snapshot, without refreshing it."""
+        cube = self._snapshot
+        if cube is None:
+            return {'built': False}
+        return {
+            'built': True,
+            'sales': len(cube.sales['id']),
+            'items': len(cube.items['sale']),
+            'high_water': cube.high_water,
+            'seconds_since_refresh': round(time.monotonic() - cube.refreshed_at, 1),
+        }
+
+
+# Shared by every thread in the process
+sales_cube = SalesCube()
+
+
+def preload_sales_cube():
+    """Build the cube in a background thread so a starting worker is not blocked."""
+    def build():
+        try:
+            sales_cube.snapshot()
+        except Exception:
+            logger.exception("Sales cube preload failed; it will be built on first use")
+        finally:
+            connection.close()
+
+    threading.Thread(target=build, name='sales-cube-preload', daemon=True).start()
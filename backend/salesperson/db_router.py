@@ -0,0 +1,149 @@
+"""
+Read-replica routing
+
+When a ``replica`` database is configured (REPLICA_DATABASE_URL), report
+endpoints, safe list views and background report jobs read from it;
+everything else, and every write, uses ``default``.
+
+Replica reads are opt-in per view (``@replica_reads`` for function views,
+``ReplicaReadMixin`` for generic list views) and scoped with a context
+variable, so code outside those views is unaffected.
+
+Replicas lag behind the primary. After a user writes something
+(any successful unsafe request), ReplicaStickinessMiddleware marks the
+user as sticky for REPLICA_STICKY_SECONDS, and their reads stay on the
+primary during that window so they always see their own changes.
+"""
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_ALIAS = 'replica'
+PRIMARY_ALIAS = 'default'
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def reading_from_replica():
+    """Whether ORM reads made here go to the replica."""
+    return replica_configured() and _replica_reads.get()
+
+
+@contextmanager
+def use_replica():
+    """Send ORM reads made inside the block to the replica (if one is configured)."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _sticky_key(user_id):
+    return f'db:sticky:{user_id}'
+
+
+def mark_sticky(user):
+    """Keep this user's reads on the primary until the replica has caught up."""
+    cache.set(_sticky_key(user.pk), True, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user):
+    return bool(user and user.is_authenticated and cache.get(_sticky_key(user.pk)))
+
+
+def should_use_replica(request):
+    """Safe requests from users without a recent write may read from the replica."""
+    return (
+        replica_configured()
+        and request.method in SAFE_METHODS
+        and not is_sticky(request.user)
+    )
+
+
+@contextmanager
+def replica_for(request):
+    """use_replica() if this request may read from the replica, otherwise a no-op."""
+    if should_use_replica(request):
+        with use_replica():
+            yield
+    else:
+        yield
+
+
+def replica_reads(view):
+    """
+    Decorator for function-based API views; apply it below @api_view so
+    request.user is already authenticated.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_for(request):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Serve the list action of a generic view from the replica."""
+
+    def list(self, request, *args, **kwargs):
+        with replica_for(request):
+            return super().list(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """Route reads to the replica inside use_replica(); everything else to the primary."""
+
+    def __init__(self, replica_alias=None):
+        self.replica_alias = replica_alias
+
+    def _replica(self):
+        if self.replica_alias:
+            return self.replica_alias
+        return REPLICA_ALIAS if replica_configured() else None
+
+    def db_for_read(self, model, **hints):
+        replica = self._replica()
+        if replica and _replica_reads.get():
+            return replica
+        return PRIMARY_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica's schema comes from replication, never from migrate
+        return db != REPLICA_ALIAS
+
+
+class ReplicaStickinessMiddleware:
+    """Mark users sticky to the primary after a successful write."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF authenticates inside the view and copies the user back onto
+        # the Django request, so JWT users are visible here
+        user = getattr(request, 'user', None)
+        if (
+            replica_configured()
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            mark_sticky(user)
+        return response
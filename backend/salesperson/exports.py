@@ -0,0 +1,284 @@
+"""
+Streaming CSV/XLSX exports for sales, payments and inventory
+
+Rows are read with ``queryset.iterator(chunk_size=...)`` and written to the
+response as they are produced, so memory use stays constant no matter how
+many rows are exported. The XLSX writer is a minimal, dependency-free
+SpreadsheetML writer that streams its zip archive the same way.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.conf import settings
+from django.db.models import F, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .models import SaleItem
+from .renderers import CSVRenderer, XLSXRenderer
+
+
+SALE_EXPORT_COLUMNS = [
+    'sale_id', 'created_at', 'salesperson', 'customer_name', 'customer_phone',
+    'payment_method', 'payment_status', 'total_amount', 'amount_paid', 'balance',
+    'product_sku', 'product_name', 'quantity', 'price_at_sale', 'subtotal',
+]
+
+PAYMENT_EXPORT_COLUMNS = [
+    'payment_id', 'created_at', 'sale_id', 'customer_name', 'customer_phone',
+    'amount', 'payment_method', 'status', 'reference_number', 'recorded_by',
+    'salesperson', 'notes',
+]
+
+INVENTORY_EXPORT_COLUMNS = [
+    'product_id', 'sku', 'name', 'category', 'price', 'stock_quantity',
+    'stock_value', 'is_active', 'updated_at',
+]
+
+
+RECEIVABLES_AGING_BUCKET_COLUMNS = [
+    'open_sales', 'total_outstanding', 'days_0_30', 'days_31_60', 'days_61_90',
+    'days_over_90', 'oldest_sale',
+]
+
+RECEIVABLES_AGING_EXPORT_COLUMNS = {
+    'customer': ['customer_name', 'customer_phone'] + RECEIVABLES_AGING_BUCKET_COLUMNS,
+    'salesperson': ['salesperson_id', 'salesperson_name'] + RECEIVABLES_AGING_BUCKET_COLUMNS,
+}
+
+
+def sale_export_rows(queryset, chunk_size=None):
+    """Yield one row per sale item; sales without items produce a single row."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.prefetch_related(
+        Prefetch('items', queryset=SaleItem.objects.order_by('id'))
+    )
+
+    for sale in queryset.iterator(chunk_size=chunk_size):
+        sale_columns = [
+            sale.id,
+            sale.created_at,
+            sale.salesperson_name,
+            sale.customer_name,
+            sale.customer_phone,
+            sale.payment_method,
+            sale.payment_status,
+            sale.total_amount,
+            sale.amount_paid,
+            sale.balance,
+        ]
+        items = sale.items.all()
+        if not items:
+            yield sale_columns + [None] * 5
+            continue
+        for item in items:
+            yield sale_columns + [
+                item.product_sku,
+                item.product_name,
+                item.quantity,
+                item.price_at_sale,
+                item.subtotal,
+            ]
+
+
+def payment_export_rows(queryset, chunk_size=None):
+    """Yield one row per payment."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.select_related('sale', 'recorded_by')
+
+    for payment in queryset.iterator(chunk_size=chunk_size):
+        yield [
+            payment.id,
+            payment.created_at,
+            payment.sale_id,
+            payment.sale.customer_name,
+            payment.sale.customer_phone,
+            payment.amount,
+            payment.payment_method,
+            payment.status,
+            payment.reference_number,
+            payment.recorded_by.full_name,
+            payment.sale.salesperson_name,
+            payment.notes,
+        ]
+
+
+def inventory_export_rows(queryset, chunk_size=None):
+    """Yield one row per product, with its stock value computed in SQL."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.annotate(stock_value=F('stock_quantity') * F('price'))
+
+    for product in queryset.iterator(chunk_size=chunk_size):
+        yield [
+            product.id,
+            product.sku,
+            product.name,
+            product.category,
+            product.price,
+            product.stock_quantity,
+            product.stock_value,
+            product.is_active,
+            product.updated_at,
+        ]
+
+
+def receivables_aging_rows(rows, columns, chunk_size=None):
+    """Yield one row per aging group from a grouped values() queryset."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    for group in rows.iterator(chunk_size=chunk_size):
+        yield [group[column] for column in columns]
+
+
+def _format_value(value):
+    """Convert a cell value to the text written to CSV files."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object whose write() returns the value instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows):
+    """Yield CSV text, one line at a time."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_format_value(value) for value in row])
+
+
+class _ZipStream:
+    """Unseekable write-only buffer drained by the XLSX generator after each write."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+_XML_ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_cell(value):
+    """Render a single SpreadsheetML cell."""
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    text = _XML_ILLEGAL_CHARS.sub('', str(_format_value(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(columns, rows, sheet_name='Export'):
+    """Yield the bytes of a single-sheet XLSX workbook as rows are written."""
+    buffer = _ZipStream()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        parts = dict(_XLSX_STATIC_PARTS)
+        parts['xl/workbook.xml'] = (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        )
+        for name, content in parts.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            sheet.write(_xlsx_row(columns).encode('utf-8'))
+            for row in rows:
+                sheet.write(_xlsx_row(row).encode('utf-8'))
+                chunk = buffer.drain()
+                if chunk:
+                    yield chunk
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+def write_export(fileobj, export_format, columns, rows, sheet_name='Export'):
+    """Write an export to an open binary file instead of a response."""
+    if export_format == XLSXRenderer.format:
+        chunks = stream_xlsx(columns, rows, sheet_name)
+    else:
+        chunks = (line.encode('utf-8') for line in stream_csv(columns, rows))
+    for chunk in chunks:
+        fileobj.write(chunk)
+
+
+def export_response(export_format, name, columns, rows):
+    """Build a streaming download response in the requested format."""
+    if export_format == XLSXRenderer.format:
+        stream = stream_xlsx(columns, rows, sheet_name=name.replace('_', ' ').title())
+        content_type = XLSXRenderer.media_type
+    else:
+        export_format = CSVRenderer.format
+        stream = stream_csv(columns, rows)
+        content_type = f'{CSVRenderer.media_type}; charset=utf-8'
+
+    filename = f"{name}_{timezone.localdate().strftime('%Y%m%d')}.{export_format}"
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,147 @@
+"""
+Shared queryset filters for the Stock Management System API
+
+The list views and the export endpoints accept the same query parameters,
+so the filtering logic lives here and is applied by both.
+"""
+from datetime import datetime
+from django.db.models import Q
+from .models import Product
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD string, returning None if it is missing or invalid."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def parse_time(value):
+    """Parse a HH:MM string, returning None if it is missing or invalid."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%H:%M').time()
+    except ValueError:
+        return None
+
+
+def filter_by_date_range(queryset, params, field='created_at'):
+    """Apply the date_from/date_to query parameters to a date-time field."""
+    date_from = parse_date(params.get('date_from', None))
+    date_to = parse_date(params.get('date_to', None))
+
+    if date_from:
+        queryset = queryset.filter(**{f'{field}__date__gte': date_from})
+    if date_to:
+        queryset = queryset.filter(**{f'{field}__date__lte': date_to})
+
+    return queryset
+
+
+def filter_products(queryset, params):
+    """Filter products by active status, category, stock status and search term"""
+    # Filter by active status
+    active_only = params.get('active_only', 'true').lower() == 'true'
+    if active_only:
+        queryset = queryset.filter(is_active=True)
+
+    # Filter by category
+    category = params.get('category', None)
+    if category:
+        queryset = queryset.filter(category__icontains=category)
+
+    # Filter by stock status
+    stock_status = params.get('stock_status', None)
+    if stock_status == 'out_of_stock':
+        queryset = queryset.filter(stock_quantity=0)
+    elif stock_status == 'low_stock':
+        queryset = queryset.filter(stock_quantity__gt=0, stock_quantity__lte=Product.LOW_STOCK_THRESHOLD)
+    elif stock_status == 'in_stock':
+        queryset = queryset.filter(stock_quantity__gt=Product.LOW_STOCK_THRESHOLD)
+
+    # Search by name or SKU
+    search = params.get('search', None)
+    if search:
+        queryset = queryset.filter(
+            Q(name__icontains=search) | Q(sku__icontains=search)
+        )
+
+    return queryset
+
+
+def filter_sales(queryset, params, user):
+    """Filter sales by user role, date range, payment status and salesperson"""
+    # Salespersons can only see their own sales
+    if user.role == 'Salesperson':
+        queryset = queryset.filter(salesperson=user)
+
+    # Filter by date range
+    queryset = filter_by_date_range(queryset, params)
+
+    # Filter by payment status
+    payment_status = params.get('payment_status', None)
+    if payment_status:
+        queryset = queryset.filter(payment_status=payment_status)
+
+    # Filter by salesperson (Admin only)
+    if user.role == 'Admin':
+        salesperson_id = params.get('salesperson', None)
+        if salesperson_id:
+            queryset = queryset.filter(salesperson_id=salesperson_id)
+
+    return queryset
+
+
+def filter_payments(queryset, params, user):
+    """Filter payments by user role, sale, customer, status, method and date/time range"""
+    # Role-based filtering: Salespersons can only see payments for their own sales
+    if user.role == 'Salesperson':
+        queryset = queryset.filter(sale__salesperson=user)
+
+    # Filter by sale
+    sale_id = params.get('sale', None)
+    if sale_id:
+        queryset = queryset.filter(sale_id=sale_id)
+
+    # Filter by customer name
+    customer_name = params.get('customer_name', None)
+    if customer_name:
+        queryset = queryset.filter(sale__customer_name__icontains=customer_name)
+
+    # Filter by customer phone
+    customer_phone = params.get('customer_phone', None)
+    if customer_phone:
+        queryset = queryset.filter(sale__customer_phone__icontains=customer_phone)
+
+    # Filter by payment status
+    status_filter = params.get('status', None)
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    # Filter by payment method
+    payment_method = params.get('payment_method', None)
+    if payment_method:
+        queryset = queryset.filter(payment_method=payment_method)
+
+    # Filter by sale payment status (debt/credit status)
+    sale_payment_status = params.get('sale_payment_status', None)
+    if sale_payment_status:
+        queryset = queryset.filter(sale__payment_status=sale_payment_status)
+
+    # Filter by date range
+    queryset = filter_by_date_range(queryset, params)
+
+    # Filter by time range (for more specific filtering)
+    time_from = parse_time(params.get('time_from', None))
+    time_to = parse_time(params.get('time_to', None))
+
+    if time_from:
+        queryset = queryset.filter(created_at__time__gte=time_from)
+    if time_to:
+        queryset = queryset.filter(created_at__time__lte=time_to)
+
+    return queryset
@@ -0,0 +1,196 @@
+"""
+Sales velocity and reorder forecasting
+
+Daily units sold per product are read from the ProductSalesDaily counters
+into a (products x days) NumPy matrix. Average velocity, recent velocity
+and an exponentially smoothed daily forecast are then computed for every
+product at once with matrix operations.
+
+Forecasts depend only on sales history, so they are cached under the
+current sales version (bumped whenever a sale is recorded or deleted).
+Days of cover and reorder quantities depend on current stock as well and
+are recomputed from the cached forecasts on every request.
+"""
+import math
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+from .models import Product, ProductSalesDaily
+from .rollups import sales_version
+
+# Days used for the "recent" velocity shown next to the long-run average
+RECENT_DAYS = 7
+
+
+def load_daily_quantities(product_ids, start, days):
+    """
+    Units sold per product per day as a float matrix.
+
+    Row i is product_ids[i]; column j is the day `start + j`. Days without
+    sales are zero.
+    """
+    matrix = np.zeros((len(product_ids), days))
+    if not product_ids:
+        return matrix
+
+    row_of = {product_id: row for row, product_id in enumerate(product_ids)}
+    counters = ProductSalesDaily.objects.filter(
+        date__gte=start,
+        date__lt=start + timedelta(days=days),
+        product__is_active=True
+    ).values('product_id', 'date').annotate(quantity=Sum('quantity')).values_list(
+        'product_id', 'date', 'quantity'
+    ).order_by()
+
+    rows, columns, quantities = [], [], []
+    for product_id, day, quantity in counters.iterator():
+        row = row_of.get(product_id)
+        if row is not None:
+            rows.append(row)
+            columns.append((day - start).days)
+            quantities.append(quantity)
+    if rows:
+        np.add.at(matrix, (np.array(rows), np.array(columns)), np.array(quantities, dtype=float))
+    return matrix
+
+
+def smoothing_weights(days, alpha):
+    """
+    Weights that apply simple exponential smoothing as one dot product.
+
+    Smoothing x_0..x_{n-1} with level s_t = alpha * x_t + (1 - alpha) * s_{t-1}
+    gives s_{n-1} = sum(alpha * (1 - alpha)^(n-1-t) * x_t) + (1 - alpha)^n * s_0.
+    """
+    return alpha * (1 - alpha) ** np.arange(days - 1, -1, -1)
+
+
+def compute_velocities(matrix, alpha):
+    """Average, recent and smoothed units sold per day for every row of `matrix`."""
+    days = matrix.shape[1]
+    average = matrix.mean(axis=1) if days else np.zeros(matrix.shape[0])
+    recent = matrix[:, -RECENT_DAYS:].mean(axis=1) if days else average
+    # Seed the smoothed level with the long-run average rather than zero
+    smoothed = matrix @ smoothing_weights(days, alpha) + (1 - alpha) ** days * average
+    return average, recent, smoothed
+
+
+def _forecast_params(params):
+    """History length and smoothing factor from query parameters, falling back to settings"""
+    try:
+        history_days = min(365, max(RECENT_DAYS, int(params.get('history_days', settings.FORECAST_HISTORY_DAYS))))
+    except (TypeError, ValueError):
+        history_days = settings.FORECAST_HISTORY_DAYS
+    try:
+        alpha = float(params.get('alpha', settings.FORECAST_SMOOTHING))
+        if not 0 < alpha <= 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        alpha = settings.FORECAST_SMOOTHING
+    return history_days, alpha
+
+
+def product_forecasts(history_days, alpha):
+    """
+    Per-product velocities for active products, cached until the next sale.
+
+    Returns a dict of product_ids plus average, recent and forecast arrays
+    in the same order.
+    """
+    today = timezone.localdate()
+    cache_key = f'forecast:{sales_version()}:{today.isoformat()}:{history_days}:{alpha}'
+    forecasts = cache.get(cache_key)
+    if forecasts is not None:
+        return forecasts
+
+    product_ids = list(Product.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+    # History ends yesterday so a partly recorded day does not drag the forecast down
+    start = today - timedelta(days=history_days)
+    matrix = load_daily_quantities(product_ids, start, history_days)
+    average, recent, smoothed = compute_velocities(matrix, alpha)
+
+    forecasts = {
+        'product_ids': np.array(product_ids, dtype=np.int64),
+        'average': average,
+        'recent': recent,
+        'forecast': smoothed,
+    }
+    cache.set(cache_key, forecasts, timeout=24 * 60 * 60)
+    return forecasts
+
+
+def _int_param(params, name, default):
+    try:
+        return max(0, int(params.get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def build_reorder_suggestions(params):
+    """Days of cover and reorder quantities for active products (Admin only)"""
+    history_days, alpha = _forecast_params(params)
+    lead_time = _int_param(params, 'lead_time', settings.FORECAST_LEAD_TIME_DAYS)
+    cover_days = _int_param(params, 'cover_days', settings.FORECAST_COVER_DAYS)
+    include_all = params.get('all', 'false').lower() == 'true'
+
+    forecasts = product_forecasts(history_days, alpha)
+    product_ids = forecasts['product_ids']
+    forecast = forecasts['forecast']
+
+    products = {
+        product['id']: product for product in Product.objects.filter(
+            is_active=True, id__in=product_ids.tolist()
+        ).values('id', 'name', 'sku', 'category', 'stock_quantity')
+    }
+    # Products deactivated since the forecasts were cached are dropped here
+    present = np.array([product_id in products for product_id in product_ids.tolist()], dtype=bool)
+    stock = np.array(
+        [products[product_id]['stock_quantity'] if product_id in products else 0
+         for product_id in product_ids.tolist()],
+        dtype=float
+    )
+
+    days_of_cover = np.divide(stock, forecast, out=np.full(stock.shape, np.inf), where=forecast > 0)
+    reorder_point = forecast * lead_time
+    suggested = np.ceil(np.maximum(forecast * (lead_time + cover_days) - stock, 0))
+    needs_reorder = present & (
+        (days_of_cover <= lead_time) | (stock <= Product.LOW_STOCK_THRESHOLD)
+    )
+
+    selected = present if include_all else needs_reorder
+    # Soonest stockout first
+    order = np.lexsort((product_ids, days_of_cover))
+    today = timezone.localdate()
+
+    suggestions = []
+    for index in order[selected[order]]:
+        product = products[int(product_ids[index])]
+        cover = days_of_cover[index]
+        suggestions.append({
+            'product_id': product['id'],
+            'name': product['name'],
+            'sku': product['sku'],
+            'category': product['category'],
+            'stock_quantity': product['stock_quantity'],
+            'average_daily_sales': round(float(forecasts['average'][index]), 2),
+            'recent_daily_sales': round(float(forecasts['recent'][index]), 2),
+            'forecast_daily_sales': round(float(forecast[index]), 2),
+            'days_of_cover': None if math.isinf(cover) else round(float(cover), 1),
+            'stockout_date': None if math.isinf(cover) else (today + timedelta(days=int(cover))).strftime('%Y-%m-%d'),
+            'reorder_point': math.ceil(reorder_point[index]),
+            'suggested_order_quantity': int(suggested[index]),
+            'needs_reorder': bool(needs_reorder[index]),
+        })
+
+    return {
+        'suggestions': suggestions,
+        'parameters': {
+            'history_days': history_days,
+            'alpha': alpha,
+            'lead_time': lead_time,
+            'cover_days': cover_days,
+            'low_stock_threshold': Product.LOW_STOCK_THRESHOLD,
+        }
+    }
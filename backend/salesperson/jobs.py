@@ -0,0 +1,318 @@
+"""
+Background job runner for heavy reports and exports
+
+Jobs are rows in the Job table. `manage.py run_workers` processes claim
+pending jobs one at a time (SELECT ... FOR UPDATE SKIP LOCKED where the
+database supports it, plus a conditional status update so two workers can
+never claim the same job), run the registered handler and write the result
+to a file under settings.JOB_RESULTS_ROOT until it expires.
+"""
+import json
+import logging
+import signal
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Job, Product, Sale, Payment, SaleItem
+from .filters import filter_products, filter_sales, filter_payments
+from .reports import build_sales_report, build_inventory_report, build_comprehensive_report
+from .renderers import CSVRenderer, XLSXRenderer
+from .parquet_export import EXPORT_TABLES, export_parquet
+from .bulk_receipts import FORMATS as RECEIPT_FORMATS, receipt_sale_ids, stream_receipts
+from .db_router import use_replica
+from .exports import (
+    SALE_EXPORT_COLUMNS, PAYMENT_EXPORT_COLUMNS, INVENTORY_EXPORT_COLUMNS,
+    sale_export_rows, payment_export_rows, inventory_export_rows, write_export
+)
+
+logger = logging.getLogger(__name__)
+
+# Registry of job type -> handler(job) returning (result_file, content_type)
+JOB_HANDLERS = {}
+
+
+def job_handler(job_type):
+    """Register a function as the handler for a job type."""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def result_path(name):
+    """Absolute path of a result file, creating the results directory if needed."""
+    root = Path(settings.JOB_RESULTS_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    return root / name
+
+
+def result_name(job, extension):
+    """
+    Result file name for this run of a job. Each claim gets its own file, so a
+    worker that lost its job to requeue_stale_jobs() cannot overwrite the result
+    of the worker that claimed it next.
+    """
+    return f'job_{job.id}_{job.job_type}_{job.started_at:%Y%m%d%H%M%S%f}.{extension}'
+
+
+def _owned(job):
+    """The job's row, as long as it is still running under the worker that claimed it."""
+    return Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, worker=job.worker)
+
+
+def set_progress(job, progress):
+    """Persist a job's completion percentage, which also marks it alive."""
+    progress = max(0, min(100, int(progress)))
+    if progress != job.progress:
+        job.progress = progress
+        _owned(job).update(progress=progress, heartbeat_at=timezone.now())
+
+
+def _send_heartbeats(job, stop_event):
+    """
+    Mark a running job alive every JOB_HEARTBEAT_INTERVAL seconds until
+    `stop_event` is set, so requeue_stale_jobs() can tell a long job from
+    one whose worker died. Runs in its own thread, with its own connection.
+    """
+    try:
+        while not stop_event.wait(settings.JOB_HEARTBEAT_INTERVAL):
+            try:
+                _owned(job).update(heartbeat_at=timezone.now())
+            except DatabaseError as e:
+                logger.warning(f"Heartbeat for job {job.id} failed: {e}")
+    finally:
+        connection.close()
+
+
+def _with_progress(job, rows, total):
+    """Yield rows unchanged while recording progress against an expected total."""
+    step = max(1, total // 100)
+    for index, row in enumerate(rows, start=1):
+        if index % step == 0 and total:
+            # Leave the last percent for writing out the file
+            set_progress(job, min(99, index * 100 // total))
+        yield row
+
+
+def _write_report(job, report):
+    name = result_name(job, 'json')
+    with open(result_path(name), 'w', encoding='utf-8') as result:
+        json.dump(report, result, cls=DjangoJSONEncoder)
+    return name, 'application/json'
+
+
+def _write_export(job, columns, rows, total):
+    export_format = XLSXRenderer.format if job.params.get('format') == XLSXRenderer.format else CSVRenderer.format
+    content_type = XLSXRenderer.media_type if export_format == XLSXRenderer.format else CSVRenderer.media_type
+    name = result_name(job, export_format)
+    with open(result_path(name), 'wb') as result:
+        write_export(
+            result, export_format, columns, _with_progress(job, rows, total),
+            sheet_name=job.get_job_type_display()
+        )
+    return name, content_type
+
+
+@job_handler(Job.TYPE_SALES_REPORT)
+def run_sales_report(job):
+    return _write_report(job, build_sales_report(job.created_by, job.params))
+
+
+@job_handler(Job.TYPE_INVENTORY_REPORT)
+def run_inventory_report(job):
+    return _write_report(job, build_inventory_report(job.params))
+
+
+@job_handler(Job.TYPE_COMPREHENSIVE_REPORT)
+def run_comprehensive_report(job):
+    return _write_report(job, build_comprehensive_report(job.created_by, job.params))
+
+
+@job_handler(Job.TYPE_SALES_EXPORT)
+def run_sales_export(job):
+    queryset = filter_sales(Sale.objects.all(), job.params, job.created_by).order_by('-created_at')
+    # One row per line item, plus one row for each sale without items
+    total = (
+        SaleItem.objects.filter(sale__in=queryset).count() +
+        queryset.filter(items__isnull=True).count()
+    )
+    return _write_export(job, SALE_EXPORT_COLUMNS, sale_export_rows(queryset), total)
+
+
+@job_handler(Job.TYPE_PAYMENTS_EXPORT)
+def run_payments_export(job):
+    queryset = filter_payments(Payment.objects.all(), job.params, job.created_by).order_by('-created_at')
+    return _write_export(job, PAYMENT_EXPORT_COLUMNS, payment_export_rows(queryset), queryset.count())
+
+
+@job_handler(Job.TYPE_INVENTORY_EXPORT)
+def run_inventory_export(job):
+    queryset = filter_products(Product.objects.all(), job.params).order_by('name')
+    return _write_export(job, INVENTORY_EXPORT_COLUMNS, inventory_export_rows(queryset), queryset.count())
+
+
+@job_handler(Job.TYPE_PARQUET_EXPORT)
+def run_parquet_export(job):
+    tables = [name for name in job.params.get('tables', '').split(',') if name in EXPORT_TABLES]
+    summary = export_parquet(
+        tables=tables or EXPORT_TABLES,
+        full=job.params.get('full') == 'true'
+    )
+    return _write_report(job, summary)
+
+
+@job_handler(Job.TYPE_RECEIPTS_EXPORT)
+def run_receipts_export(job):
+    export_format = job.params.get('output') if job.params.get('output') in RECEIPT_FORMATS else 'zip'
+    sale_ids = receipt_sale_ids(job.created_by, job.params)
+    name = result_name(job, export_format)
+    with open(result_path(name), 'wb') as result:
+        # Leave the last percent for writing out the file
+        chunks = stream_receipts(
+            sale_ids, export_format,
+            progress=lambda done, total: set_progress(job, min(99, done * 100 // total))
+        )
+        for chunk in chunks:
+            result.write(chunk)
+    return name, RECEIPT_FORMATS[export_format]
+
+
+def claim_next_job(worker_name):
+    """Claim the oldest pending job for this worker, or return None."""
+    # Without row locks (SQLite) a read-then-write transaction only adds lock
+    # contention; the conditional update below is what makes the claim safe
+    atomic = transaction.atomic() if connection.features.has_select_for_update else nullcontext()
+    with atomic:
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.STATUS_PENDING)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker_name,
+            started_at=timezone.now(),
+            heartbeat_at=timezone.now(),
+            progress=0
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    """Run a claimed job and record its result or failure."""
+    handler = JOB_HANDLERS.get(job.job_type)
+    stop_heartbeats = threading.Event()
+    heartbeats = threading.Thread(
+        target=_send_heartbeats, args=(job, stop_heartbeats), name=f'job-{job.pk}-heartbeat', daemon=True
+    )
+    heartbeats.start()
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job type: {job.job_type}")
+        # Handlers only read, so they can run against the replica
+        with use_replica():
+            result_file, content_type = handler(job)
+    except Exception as e:
+        logger.exception(f"Job {job.id} ({job.job_type}) failed")
+        failed = _owned(job).update(
+            status=Job.STATUS_FAILED,
+            error=str(e),
+            finished_at=timezone.now()
+        )
+        if not failed:
+            logger.warning(f"Job {job.id} was requeued while {job.worker} ran it; not marking it failed")
+        return False
+    finally:
+        stop_heartbeats.set()
+        heartbeats.join()
+
+    now = timezone.now()
+    completed = _owned(job).update(
+        status=Job.STATUS_COMPLETED,
+        progress=100,
+        result_file=result_file,
+        result_content_type=content_type,
+        finished_at=now,
+        expires_at=now + settings.JOB_RESULT_TTL
+    )
+    if not completed:
+        # Another worker owns the job now; its run produces the result
+        logger.warning(f"Job {job.id} was requeued while {job.worker} ran it; dropping its result")
+        result_path(result_file).unlink(missing_ok=True)
+        return False
+    logger.info(f"Job {job.id} ({job.job_type}) completed by {job.worker}")
+    return True
+
+
+def run_worker(worker_name, poll_interval, stop_event=None, once=False):
+    """
+    Claim and run jobs until stopped.
+
+    With once=True the worker exits as soon as the queue is empty.
+    Returns the number of jobs processed.
+    """
+    processed = 0
+    while stop_event is None or not stop_event.is_set():
+        if not once:
+            # Long-running workers drop connections the database has timed out
+            close_old_connections()
+        try:
+            job = claim_next_job(worker_name)
+        except DatabaseError as e:
+            # Lock contention or a dropped connection; retry on the next poll
+            logger.warning(f"Worker {worker_name} could not claim a job: {e}")
+            job = None
+        if job is None:
+            if once:
+                break
+            if stop_event is not None:
+                stop_event.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def worker_process(worker_name, poll_interval, stop_event):
+    """Entry point for forked worker processes; the parent handles shutdown signals."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    run_worker(worker_name, poll_interval, stop_event)
+
+
+def purge_expired_results():
+    """Delete result files past their expiry. Returns the number of jobs purged."""
+    expired = Job.objects.filter(expires_at__lte=timezone.now()).exclude(result_file='')
+    for job in expired.iterator():
+        result_path(job.result_file).unlink(missing_ok=True)
+    return expired.update(result_file='')
+
+
+def requeue_stale_jobs():
+    """
+    Return jobs whose worker died mid-run to the queue: running jobs without
+    a heartbeat for JOB_STALE_AFTER. Returns the number requeued.
+    """
+    cutoff = timezone.now() - settings.JOB_STALE_AFTER
+    stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    return Job.objects.filter(stale, status=Job.STATUS_RUNNING).update(
+        status=Job.STATUS_PENDING,
+        worker='',
+        started_at=None,
+        heartbeat_at=None,
+        progress=0
+    )
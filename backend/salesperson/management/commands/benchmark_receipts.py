@@ -0,0 +1,83 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from salesperson.receipt_benchmark import (
+    DEFAULT_ITEM_COUNTS, DEFAULT_TOLERANCES, compare, regressions, report
+)
+from salesperson.receipts import OVERLAY_MAX_ROWS
+
+
+def tolerance(value):
+    """A `metric=fraction` command line argument, e.g. `ms=0.25`"""
+    metric, _, fraction = value.partition('=')
+    if metric not in DEFAULT_TOLERANCES:
+        raise ValueError(f'unknown metric {metric}')
+    return metric, float(fraction)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare receipt rendering time, peak memory and size of the overlay renderer and the '
+        'flowable layout, optionally failing on regressions against a saved baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items',
+            type=int,
+            nargs='+',
+            default=list(DEFAULT_ITEM_COUNTS),
+            help='Line item counts to render (default: %(default)s)',
+        )
+        parser.add_argument('--runs', type=int, default=20, help='Renders per measurement (default: 20)')
+        parser.add_argument('--json', metavar='PATH', help='Write the results as JSON to PATH')
+        parser.add_argument(
+            '--baseline',
+            metavar='PATH',
+            help='JSON results of an earlier run; exit with an error if any measurement regressed',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=tolerance,
+            action='append',
+            default=[],
+            metavar='METRIC=FRACTION',
+            help=(
+                'Allowed regression for ms, peak_kb or bytes against the baseline '
+                f"(default: {', '.join(f'{k}={v}' for k, v in DEFAULT_TOLERANCES.items())})"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read the baseline: {e}')
+
+        results = compare(options['items'], options['runs'])
+        self.stdout.write(
+            f"{'items':>6} {'flowable ms':>12} {'overlay ms':>11} {'speedup':>8} "
+            f"{'flowable KiB':>13} {'overlay KiB':>12} {'flowable B':>11} {'overlay B':>10}"
+        )
+        for result in results:
+            note = '' if result['items'] <= OVERLAY_MAX_ROWS else '  (falls back to flowable)'
+            self.stdout.write(
+                f"{result['items']:>6} {result['flowable_ms']:>12.2f} {result['overlay_ms']:>11.2f} "
+                f"{result['speedup']:>7.1f}x {result['flowable_peak_kb']:>13.1f} {result['overlay_peak_kb']:>12.1f} "
+                f"{result['flowable_bytes']:>11} {result['overlay_bytes']:>10}{note}"
+            )
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report(results, options['runs']), f, indent=2)
+            self.stdout.write(f"Results written to {options['json']}")
+
+        if baseline is not None:
+            problems = regressions(results, baseline, dict(options['tolerance']))
+            if problems:
+                for problem in problems:
+                    self.stderr.write(problem)
+                raise CommandError(f'{len(problems)} receipt benchmark regression(s)')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
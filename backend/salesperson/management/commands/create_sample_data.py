@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from salesperson.models import Product, Sale, Payment, SaleItem
+from salesperson.rollups import record_sale_items
 from decimal import Decimal
 import random
 
@@ -176,19 +177,23 @@ class Command(BaseCommand):
             )
             
             # Create SaleItem records (if using normalized approach)
+            sale_items = []
             for product_data in products_sold_data:
                 product = Product.objects.get(id=product_data['product_id'])
-                SaleItem.objects.create(
+                sale_item = SaleItem.objects.create(
                     sale=sale,
                     product=product,
                     quantity=product_data['quantity'],
                     price_at_sale=Decimal(str(product_data['price_at_sale']))
                 )
+                sale_items.append(sale_item)
                 
                 # Reduce product stock
                 product.stock_quantity -= product_data['quantity']
                 product.save()
             
+            record_sale_items(sale, sale_items)
+            
             # Create payment record for partial payments
             if payment_status == Sale.PAYMENT_STATUS_PARTIAL and amount_paid > 0:
                 Payment.objects.create(
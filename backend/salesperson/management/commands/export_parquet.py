@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from salesperson.parquet_export import EXPORT_TABLES, ParquetExportUnavailable, export_parquet
+
+
+class Command(BaseCommand):
+    help = 'Export sales, sale items, payments and products to month-partitioned Parquet files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help=f'Directory to write to (default: PARQUET_EXPORT_ROOT, {settings.PARQUET_EXPORT_ROOT})',
+        )
+        parser.add_argument(
+            '--tables',
+            type=str,
+            default=','.join(EXPORT_TABLES),
+            help=f'Comma separated tables to export (default: {",".join(EXPORT_TABLES)})',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rewrite every month instead of only new or changed ones',
+        )
+
+    def handle(self, *args, **options):
+        tables = [name.strip() for name in options['tables'].split(',') if name.strip()]
+        unknown = set(tables) - set(EXPORT_TABLES)
+        if unknown:
+            raise CommandError(f'Unknown table(s): {", ".join(sorted(unknown))}')
+
+        try:
+            summary = export_parquet(
+                tables=tables,
+                full=options['full'],
+                root=options['output'],
+                log=self.stdout.write
+            )
+        except ParquetExportUnavailable as e:
+            raise CommandError(str(e))
+
+        written = sum(len(months) for months in summary['partitions_written'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Parquet export finished in {summary['root']}: {written} partition(s) written"
+        ))
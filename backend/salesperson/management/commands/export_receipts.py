@@ -0,0 +1,58 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from salesperson.bulk_receipts import FORMATS, receipt_sale_ids, stream_receipts
+from salesperson.filters import parse_date
+
+
+class Command(BaseCommand):
+    help = 'Render the receipts of every sale in a date range into a ZIP of PDFs or one combined PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', required=True, help='First sale date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', required=True, help='Last sale date (YYYY-MM-DD)')
+        parser.add_argument('--salesperson', type=int, default=None, help='Only this salesperson\'s sales')
+        parser.add_argument(
+            '--output',
+            choices=list(FORMATS),
+            default='zip',
+            help='zip: one PDF per sale; pdf: a single document (default: zip)',
+        )
+        parser.add_argument(
+            '--file',
+            type=str,
+            default=None,
+            help='File to write (default: receipts_<from>_<to>.<output> in the current directory)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Rendering processes (default: BULK_RECEIPT_WORKERS, or one per CPU core)',
+        )
+
+    def handle(self, *args, **options):
+        date_from = parse_date(options['date_from'])
+        date_to = parse_date(options['date_to'])
+        if not date_from or not date_to:
+            raise CommandError('--date-from and --date-to must be dates (YYYY-MM-DD)')
+
+        params = {'date_from': options['date_from'], 'date_to': options['date_to']}
+        if options['salesperson']:
+            params['salesperson'] = options['salesperson']
+        sale_ids = receipt_sale_ids(None, params)
+        if not sale_ids:
+            self.stdout.write('No sales in this range')
+            return
+
+        path = Path(options['file'] or f"receipts_{date_from:%Y%m%d}_{date_to:%Y%m%d}.{options['output']}")
+        step = max(1, len(sale_ids) // 20)
+
+        def progress(done, total):
+            if done % step == 0 or done == total:
+                self.stdout.write(f'Rendered {done}/{total} receipts')
+
+        with open(path, 'wb') as output:
+            for chunk in stream_receipts(sale_ids, options['output'], options['workers'], progress):
+                output.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(sale_ids)} receipt(s) to {path}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from salesperson.models import PDFAccessToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and used rows from the legacy PDF access token table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Delete every legacy token, including ones that are still valid',
+        )
+
+    def handle(self, *args, **options):
+        tokens = PDFAccessToken.objects.all()
+        if not options['all']:
+            tokens = tokens.filter(Q(expires_at__lte=timezone.now()) | Q(is_used=True))
+        deleted, _ = tokens.delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} legacy PDF token(s)'))
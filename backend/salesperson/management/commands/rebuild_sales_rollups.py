@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from salesperson.rollups import rebuild_product_sales_daily
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-product daily sales counters from sale items'
+
+    def handle(self, *args, **options):
+        written = rebuild_product_sales_daily()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} product sales counter(s)'))
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from salesperson.jobs import (
+    run_worker, worker_process, purge_expired_results, requeue_stale_jobs
+)
+
+
+class Command(BaseCommand):
+    help = 'Run background workers that process queued report and export jobs'
+
+    # Seconds between expired-result purges and stale-job checks
+    maintenance_interval = 300
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.JOB_WORKER_PROCESSES,
+            help='Number of worker processes to start',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process pending jobs in this process and exit when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        base_name = f'{socket.gethostname()}:{os.getpid()}'
+
+        self.run_maintenance()
+
+        if options['once']:
+            processed = run_worker(base_name, options['poll_interval'], once=True)
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} job(s)'))
+            return
+
+        # Child processes must not share the parent's database connections
+        connections.close_all()
+
+        context = multiprocessing.get_context('fork')
+        stop_event = context.Event()
+        workers = [
+            context.Process(
+                target=worker_process,
+                args=(f'{base_name}-{number}', options['poll_interval'], stop_event),
+                name=f'job-worker-{number}',
+            )
+            for number in range(1, options['processes'] + 1)
+        ]
+
+        # The handler only flips a flag: setting the multiprocessing Event from
+        # inside a signal handler can deadlock with a wait() in progress
+        self.stopping = False
+
+        def request_stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+        for worker in workers:
+            worker.start()
+        self.stdout.write(
+            self.style.SUCCESS(f'Started {len(workers)} job worker(s); press Ctrl+C to stop')
+        )
+
+        last_maintenance = time.monotonic()
+        while not self.stopping and any(worker.is_alive() for worker in workers):
+            time.sleep(1)
+            if time.monotonic() - last_maintenance >= self.maintenance_interval:
+                self.run_maintenance()
+                last_maintenance = time.monotonic()
+
+        self.stdout.write('Stopping workers after their current job...')
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS('All job workers stopped'))
+
+    def run_maintenance(self):
+        """Requeue jobs left running by dead workers and purge expired results"""
+        requeued = requeue_stale_jobs()
+        purged = purge_expired_results()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+        if purged:
+            self.stdout.write(f'Purged {purged} expired job result(s)')
@@ -0,0 +1,67 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from salesperson.models import InventorySnapshot, Product
+
+
+class Command(BaseCommand):
+    help = 'Record the stock level and value of every active product for a business day'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Day to record (YYYY-MM-DD, default: today)',
+        )
+        parser.add_argument(
+            '--include-weekends',
+            action='store_true',
+            help='Record a snapshot even if the day is a Saturday or Sunday',
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid date format. Use YYYY-MM-DD')
+        else:
+            day = timezone.localdate()
+
+        if day.weekday() >= 5 and not options['include_weekends']:
+            self.stdout.write(f'{day} is not a business day; no snapshot taken')
+            return
+
+        count = self.take_snapshot(day)
+        self.stdout.write(self.style.SUCCESS(f'Recorded {count} product snapshot(s) for {day}'))
+
+    def take_snapshot(self, day):
+        """
+        Copy current stock into the snapshot table with one INSERT ... SELECT.
+        Running the command again for the same day overwrites that day's rows.
+        """
+        qn = connection.ops.quote_name
+        snapshot_table = qn(InventorySnapshot._meta.db_table)
+        product_table = qn(Product._meta.db_table)
+
+        sql = f"""
+            INSERT INTO {snapshot_table}
+                (product_id, date, stock_quantity, price, stock_value, created_at)
+            SELECT id, %s, stock_quantity, price, stock_quantity * price, %s
+            FROM {product_table}
+            WHERE is_active = %s
+            ON CONFLICT (product_id, date) DO UPDATE SET
+                stock_quantity = excluded.stock_quantity,
+                price = excluded.price,
+                stock_value = excluded.stock_value,
+                created_at = excluded.created_at
+        """
+        params = [
+            connection.ops.adapt_datefield_value(day),
+            connection.ops.adapt_datetimefield_value(timezone.now()),
+            True,
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
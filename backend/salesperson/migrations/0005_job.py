@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salesperson', '0004_pdfaccesstoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(choices=[('sales_report', 'Sales Report'), ('inventory_report', 'Inventory Report'), ('comprehensive_report', 'Comprehensive Report'), ('sales_export', 'Sales Export'), ('payments_export', 'Payments Export'), ('inventory_export', 'Inventory Export')], help_text='Kind of report or export to produce', max_length=50)),
+                ('params', models.JSONField(blank=True, default=dict, help_text='Query parameters passed to the report or export')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Completed', 'Completed'), ('Failed', 'Failed')], default='Pending', help_text='Current job status', max_length=20)),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Completion percentage (0-100)')),
+                ('worker', models.CharField(blank=True, default='', help_text='Worker that claimed the job', max_length=100)),
+                ('error', models.TextField(blank=True, help_text='Error message if the job failed', null=True)),
+                ('result_file', models.CharField(blank=True, default='', max_length=255)),
+                ('result_content_type', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='When the result file is deleted', null=True)),
+                ('created_by', models.ForeignKey(help_text='User who submitted the job; results are scoped to their role', on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='salesperson_status_d2946e_idx'), models.Index(fields=['created_by', '-created_at'], name='salesperson_created_eff7f3_idx'), models.Index(fields=['expires_at'], name='salesperson_expires_6ffefd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.2 on 2026-10-19 08:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salesperson', '0005_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Business day the snapshot was taken for')),
+                ('stock_quantity', models.IntegerField(help_text='Stock quantity on that day')),
+                ('price', models.DecimalField(decimal_places=2, help_text='Product price on that day', max_digits=10)),
+                ('stock_value', models.DecimalField(decimal_places=2, help_text='Stock quantity multiplied by price', max_digits=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='salesperson.product')),
+            ],
+            options={
+                'ordering': ['-date', 'product'],
+                'indexes': [models.Index(fields=['date'], name='salesperson_date_800417_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'date'), name='unique_product_snapshot_per_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.2 on 2026-10-19 08:04
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_product_sales_daily(apps, schema_editor):
+    """Build counters for sales recorded before the table existed"""
+    SaleItem = apps.get_model('salesperson', 'SaleItem')
+    ProductSalesDaily = apps.get_model('salesperson', 'ProductSalesDaily')
+    grouped = SaleItem.objects.annotate(
+        day=TruncDate('sale__created_at')
+    ).values('product_id', 'sale__salesperson_id', 'day').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum('subtotal')
+    ).order_by()
+    ProductSalesDaily.objects.bulk_create(
+        (
+            ProductSalesDaily(
+                product_id=row['product_id'],
+                salesperson_id=row['sale__salesperson_id'],
+                date=row['day'],
+                quantity=row['total_quantity'],
+                revenue=row['total_revenue'] or Decimal('0.00')
+            )
+            for row in grouped.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salesperson', '0006_inventorysnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Local date of the sales')),
+                ('quantity', models.IntegerField(default=0, help_text='Units sold')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of item subtotals', max_digits=15)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='salesperson.product')),
+                ('salesperson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_product_sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'product'], name='salesperson_date_3184bc_idx'), models.Index(fields=['salesperson', 'date'], name='salesperson_salespe_75558b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'salesperson', 'date'), name='unique_product_sales_per_day')],
+            },
+        ),
+        migrations.RunPython(backfill_product_sales_daily, migrations.RunPython.noop),
+    ]
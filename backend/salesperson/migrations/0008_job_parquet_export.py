@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-19 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salesperson', '0007_productsalesdaily'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='job_type',
+            field=models.CharField(choices=[('sales_report', 'Sales Report'), ('inventory_report', 'Inventory Report'), ('comprehensive_report', 'Comprehensive Report'), ('sales_export', 'Sales Export'), ('payments_export', 'Payments Export'), ('inventory_export', 'Inventory Export'), ('parquet_export', 'Parquet Analytics Export')], help_text='Kind of report or export to produce', max_length=50),
+        ),
+    ]
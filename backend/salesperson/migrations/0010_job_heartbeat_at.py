@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-19 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salesperson', '0009_job_receipts_export'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last time the worker running the job reported it alive', null=True),
+        ),
+    ]
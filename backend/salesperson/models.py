@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
@@ -98,6 +98,9 @@ class Product(models.Model):
     Product model representing items in the inventory.
     Tracks stock levels, pricing, and categorization.
     """
+    # Products at or below this stock quantity (but not out of stock) are "low stock"
+    LOW_STOCK_THRESHOLD = 10
+
     name = models.CharField(max_length=255, help_text=_("Product name"))
     description = models.TextField(blank=True, null=True, help_text=_("Product description"))
     sku = models.CharField(
@@ -143,9 +146,9 @@ class Product(models.Model):
         return self.stock_quantity > 0
     
     @property
-    def is_low_stock(self, threshold=10):
-        """Check if product stock is below threshold."""
-        return self.stock_quantity <= threshold
+    def is_low_stock(self):
+        """Check if product stock is at or below the low stock threshold."""
+        return self.stock_quantity <= self.LOW_STOCK_THRESHOLD
     
     def reduce_stock(self, quantity):
         """Reduce stock quantity by specified amount."""
@@ -308,6 +311,16 @@ class Sale(models.Model):
             self.payment_status = self.PAYMENT_STATUS_UNPAID
             self.balance = remaining
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Payment state as loaded, to tell when a save changes it
+        instance._saved_payment_state = instance._payment_state()
+        return instance
+    
+    def _payment_state(self):
+        return (self.__dict__.get('payment_status'), self.__dict__.get('amount_paid'))
+    
     def save(self, *args, **kwargs):
         """Override save to auto-calculate balance and update payment status."""
         # Set salesperson name if not provided
@@ -317,7 +330,19 @@ class Sale(models.Model):
         # Update payment status and balance
         self.update_payment_status()
         
+        is_new = self._state.adding
+        payment_changed = self._payment_state() != getattr(self, '_saved_payment_state', None)
         super().save(*args, **kwargs)
+        self._saved_payment_state = self._payment_state()
+        
+        # Invalidate cached reports once the change is committed
+        from .rollups import bump_sales_version
+        transaction.on_commit(bump_sales_version)
+        
+        # Render the new receipt in the background so the first view is a cache hit
+        if is_new or payment_changed:
+            from .receipt_prerender import schedule_prerender
+            schedule_prerender(self.pk)
     
     def __str__(self):
         return f"Sale #{self.id} - {self.salesperson_name} - ₦{self.total_amount} ({self.created_at.strftime('%Y-%m-%d')})"
@@ -505,3 +530,185 @@ class PDFAccessToken(models.Model):
     
     def __str__(self):
         return f"PDF Token for Sale {self.sale.id} - {'Valid' if self.is_valid() else 'Invalid'}"
+
+
+class Job(models.Model):
+    """
+    Background job for long-running reports and exports.
+    Jobs are claimed and executed by `manage.py run_workers` processes, and
+    their result files are kept until `expires_at`.
+    """
+    TYPE_SALES_REPORT = 'sales_report'
+    TYPE_INVENTORY_REPORT = 'inventory_report'
+    TYPE_COMPREHENSIVE_REPORT = 'comprehensive_report'
+    TYPE_SALES_EXPORT = 'sales_export'
+    TYPE_PAYMENTS_EXPORT = 'payments_export'
+    TYPE_INVENTORY_EXPORT = 'inventory_export'
+    TYPE_PARQUET_EXPORT = 'parquet_export'
+    TYPE_RECEIPTS_EXPORT = 'receipts_export'
+    JOB_TYPE_CHOICES = [
+        (TYPE_SALES_REPORT, 'Sales Report'),
+        (TYPE_INVENTORY_REPORT, 'Inventory Report'),
+        (TYPE_COMPREHENSIVE_REPORT, 'Comprehensive Report'),
+        (TYPE_SALES_EXPORT, 'Sales Export'),
+        (TYPE_PAYMENTS_EXPORT, 'Payments Export'),
+        (TYPE_INVENTORY_EXPORT, 'Inventory Export'),
+        (TYPE_PARQUET_EXPORT, 'Parquet Analytics Export'),
+        (TYPE_RECEIPTS_EXPORT, 'Bulk Receipts Export'),
+    ]
+    ADMIN_ONLY_TYPES = [TYPE_INVENTORY_REPORT, TYPE_INVENTORY_EXPORT, TYPE_PARQUET_EXPORT, TYPE_RECEIPTS_EXPORT]
+
+    STATUS_PENDING = 'Pending'
+    STATUS_RUNNING = 'Running'
+    STATUS_COMPLETED = 'Completed'
+    STATUS_FAILED = 'Failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job_type = models.CharField(
+        max_length=50,
+        choices=JOB_TYPE_CHOICES,
+        help_text=_("Kind of report or export to produce")
+    )
+    params = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text=_("Query parameters passed to the report or export")
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        help_text=_("User who submitted the job; results are scoped to their role")
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        help_text=_("Current job status")
+    )
+    progress = models.PositiveSmallIntegerField(
+        default=0,
+        help_text=_("Completion percentage (0-100)")
+    )
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        help_text=_("Worker that claimed the job")
+    )
+    error = models.TextField(blank=True, null=True, help_text=_("Error message if the job failed"))
+
+    # Result file, relative to settings.JOB_RESULTS_ROOT
+    result_file = models.CharField(max_length=255, blank=True, default='')
+    result_content_type = models.CharField(max_length=100, blank=True, default='')
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text=_("Last time the worker running the job reported it alive")
+    )
+    finished_at = models.DateTimeField(blank=True, null=True)
+    expires_at = models.DateTimeField(blank=True, null=True, help_text=_("When the result file is deleted"))
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['created_by', '-created_at']),
+            models.Index(fields=['expires_at']),
+        ]
+
+    @property
+    def is_expired(self):
+        """Check if the job's result has expired."""
+        return self.expires_at is not None and timezone.now() >= self.expires_at
+
+    def __str__(self):
+        return f"Job #{self.id} - {self.job_type} ({self.status})"
+
+
+class InventorySnapshot(models.Model):
+    """
+    Stock level and value of a product at the end of a business day.
+    Rows are written in bulk by `manage.py snapshot_inventory` and read by
+    the inventory trends report.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='snapshots'
+    )
+    date = models.DateField(help_text=_("Business day the snapshot was taken for"))
+    stock_quantity = models.IntegerField(help_text=_("Stock quantity on that day"))
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text=_("Product price on that day")
+    )
+    stock_value = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        help_text=_("Stock quantity multiplied by price")
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date', 'product']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_product_snapshot_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.product} on {self.date}: {self.stock_quantity}"
+
+
+class ProductSalesDaily(models.Model):
+    """
+    Units sold and revenue per product, salesperson and day.
+    Kept up to date when sales are created or deleted so product rankings
+    read this small table instead of every sale item in the period.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+    salesperson = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_product_sales'
+    )
+    date = models.DateField(help_text=_("Local date of the sales"))
+    quantity = models.IntegerField(default=0, help_text=_("Units sold"))
+    revenue = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text=_("Sum of item subtotals")
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'salesperson', 'date'],
+                name='unique_product_sales_per_day'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'product']),
+            models.Index(fields=['salesperson', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.product} on {self.date}: {self.quantity} sold"
@@ -0,0 +1,279 @@
+"""
+Parquet export of the sales fact tables for offline analytics
+
+Writes sales, sale items and payments as Parquet files partitioned by
+month (Hive layout, e.g. ``sales/month=2025-01/data.parquet``) plus a
+products snapshot, under settings.PARQUET_EXPORT_ROOT. DuckDB, pandas and
+Spark can read the directory tree directly, for example::
+
+    SELECT * FROM read_parquet('sales/*/*.parquet', hive_partitioning = true)
+
+Rows are read with ``iterator(chunk_size=...)`` and written one Arrow
+record batch per chunk, so memory use does not grow with the table size.
+
+Exports are incremental: ``manifest.json`` records the row count and
+latest ``updated_at`` of every partition written. Later runs only rewrite
+months that are new or whose count or latest change differs, which is
+one grouped query per table instead of a re-read of history.
+
+pyarrow is an optional dependency; it is only needed to run an export.
+"""
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import Product, Sale, SaleItem, Payment
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - exercised only without pyarrow
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class ParquetExportUnavailable(RuntimeError):
+    """Raised when pyarrow is not installed."""
+
+
+def parquet_available():
+    return pa is not None
+
+
+def _money():
+    return pa.decimal128(15, 2)
+
+
+def _timestamp():
+    return pa.timestamp('us', tz='UTC')
+
+
+# Table name -> definition. `month_field` is the timestamp that decides the
+# partition; `updated_field` detects changed rows in already exported months.
+def _tables():
+    return {
+        'sales': {
+            'queryset': Sale.objects.all(),
+            'month_field': 'created_at',
+            'updated_field': 'updated_at',
+            'columns': [
+                ('id', 'id', pa.int64()),
+                ('created_at', 'created_at', _timestamp()),
+                ('updated_at', 'updated_at', _timestamp()),
+                ('salesperson_id', 'salesperson_id', pa.int64()),
+                ('salesperson_name', 'salesperson_name', pa.string()),
+                ('customer_name', 'customer_name', pa.string()),
+                ('customer_phone', 'customer_phone', pa.string()),
+                ('payment_method', 'payment_method', pa.string()),
+                ('payment_status', 'payment_status', pa.string()),
+                ('total_amount', 'total_amount', _money()),
+                ('amount_paid', 'amount_paid', _money()),
+                ('balance', 'balance', _money()),
+            ],
+        },
+        'sale_items': {
+            'queryset': SaleItem.objects.all(),
+            'month_field': 'sale__created_at',
+            'updated_field': 'sale__updated_at',
+            'columns': [
+                ('id', 'id', pa.int64()),
+                ('sale_id', 'sale_id', pa.int64()),
+                ('sale_created_at', 'sale__created_at', _timestamp()),
+                ('salesperson_id', 'sale__salesperson_id', pa.int64()),
+                ('product_id', 'product_id', pa.int64()),
+                ('product_sku', 'product_sku', pa.string()),
+                ('product_name', 'product_name', pa.string()),
+                ('quantity', 'quantity', pa.int64()),
+                ('price_at_sale', 'price_at_sale', _money()),
+                ('subtotal', 'subtotal', _money()),
+            ],
+        },
+        'payments': {
+            'queryset': Payment.objects.all(),
+            'month_field': 'created_at',
+            'updated_field': 'updated_at',
+            'columns': [
+                ('id', 'id', pa.int64()),
+                ('created_at', 'created_at', _timestamp()),
+                ('updated_at', 'updated_at', _timestamp()),
+                ('sale_id', 'sale_id', pa.int64()),
+                ('recorded_by_id', 'recorded_by_id', pa.int64()),
+                ('amount', 'amount', _money()),
+                ('payment_method', 'payment_method', pa.string()),
+                ('status', 'status', pa.string()),
+                ('reference_number', 'reference_number', pa.string()),
+            ],
+        },
+    }
+
+
+PARTITIONED_TABLES = ('sales', 'sale_items', 'payments')
+EXPORT_TABLES = PARTITIONED_TABLES + ('products',)
+
+
+def _product_columns():
+    return [
+        ('id', pa.int64()),
+        ('sku', pa.string()),
+        ('name', pa.string()),
+        ('category', pa.string()),
+        ('price', _money()),
+        ('stock_quantity', pa.int64()),
+        ('is_active', pa.bool_()),
+        ('created_at', _timestamp()),
+        ('updated_at', _timestamp()),
+    ]
+
+
+def export_root():
+    return Path(settings.PARQUET_EXPORT_ROOT)
+
+
+def load_manifest(root=None):
+    """Partitions written so far: {table: {month: {'rows': int, 'updated': iso}}}."""
+    path = (root or export_root()) / MANIFEST_NAME
+    if not path.exists():
+        return {'tables': {}, 'exported_at': None}
+    with open(path, encoding='utf-8') as manifest:
+        return json.load(manifest)
+
+
+def _save_manifest(root, manifest):
+    path = root / MANIFEST_NAME
+    temporary = path.with_suffix('.tmp')
+    with open(temporary, 'w', encoding='utf-8') as output:
+        json.dump(manifest, output, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def _write_batches(path, schema, rows, chunk_size):
+    """Write rows (tuples in schema order) to a Parquet file one record batch per chunk."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix('.tmp')
+    written = 0
+    with pq.ParquetWriter(temporary, schema, compression='zstd') as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                writer.write_batch(_record_batch(schema, chunk))
+                written += len(chunk)
+                chunk = []
+        if chunk or not written:
+            # An empty batch still records the schema for empty partitions
+            writer.write_batch(_record_batch(schema, chunk))
+            written += len(chunk)
+    os.replace(temporary, path)
+    return written
+
+
+def _record_batch(schema, rows):
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+def _month_key(value):
+    return value.strftime('%Y-%m')
+
+
+def _month_bounds(month):
+    """Start and end of a month in the current time zone, matching TruncMonth."""
+    start = datetime.strptime(month, '%Y-%m')
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def _export_table(root, name, table, manifest, full, chunk_size, log):
+    """Export the changed months of one partitioned table; returns months written."""
+    month_field = table['month_field']
+    partitions = table['queryset'].annotate(month=TruncMonth(month_field)).values('month').annotate(
+        rows=Count('id'),
+        updated=Max(table['updated_field'])
+    ).order_by('month')
+
+    previous = manifest['tables'].get(name, {})
+    current = {}
+    written = []
+    schema = pa.schema([(column, arrow_type) for column, _, arrow_type in table['columns']])
+    fields = [field for _, field, _ in table['columns']]
+
+    for partition in partitions:
+        month = _month_key(partition['month'])
+        state = {
+            'rows': partition['rows'],
+            'updated': partition['updated'].isoformat() if partition['updated'] else None,
+        }
+        current[month] = state
+        path = root / name / f'month={month}' / 'data.parquet'
+        if not full and previous.get(month) == state and path.exists():
+            continue
+
+        start, end = _month_bounds(month)
+        queryset = table['queryset'].filter(**{
+            f'{month_field}__gte': start, f'{month_field}__lt': end
+        }).order_by('id').values_list(*fields)
+        rows = _write_batches(path, schema, queryset.iterator(chunk_size=chunk_size), chunk_size)
+        written.append(month)
+        log(f'{name}: wrote {rows} row(s) for {month}')
+
+    # Months with no rows left (all deleted) are removed from the export
+    for month in set(previous) - set(current):
+        path = root / name / f'month={month}' / 'data.parquet'
+        path.unlink(missing_ok=True)
+        log(f'{name}: removed empty month {month}')
+
+    manifest['tables'][name] = current
+    return written
+
+
+def _export_products(root, chunk_size, log):
+    columns = _product_columns()
+    schema = pa.schema(columns)
+    queryset = Product.objects.order_by('id').values_list(*[name for name, _ in columns])
+    rows = _write_batches(root / 'products' / 'data.parquet', schema, queryset.iterator(chunk_size=chunk_size), chunk_size)
+    log(f'products: wrote {rows} row(s)')
+    return rows
+
+
+def export_parquet(tables=EXPORT_TABLES, full=False, root=None, log=None, chunk_size=None):
+    """
+    Export the given tables, rewriting only changed months unless full=True.
+    Returns a summary of what was written.
+    """
+    if not parquet_available():
+        raise ParquetExportUnavailable('Parquet export requires pyarrow (pip install pyarrow)')
+
+    root = Path(root) if root else export_root()
+    root.mkdir(parents=True, exist_ok=True)
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    log = log or logger.info
+    manifest = load_manifest(root)
+    definitions = _tables()
+
+    summary = {'root': str(root), 'partitions_written': {}, 'products_rows': None}
+    for name in tables:
+        if name == 'products':
+            summary['products_rows'] = _export_products(root, chunk_size, log)
+        elif name in definitions:
+            summary['partitions_written'][name] = _export_table(
+                root, name, definitions[name], manifest, full, chunk_size, log
+            )
+
+    manifest['exported_at'] = timezone.now().isoformat()
+    _save_manifest(root, manifest)
+    return summary
@@ -0,0 +1,93 @@
+"""
+Streaming concatenation of ReportLab PDFs
+
+concatenate_pdfs() joins PDFs into one document as they are produced.
+Each input's objects are renumbered and written out straight away under
+a new page tree, so only the page list and the object offsets are held
+in memory, however many documents go in. Used by the bulk receipt
+export and by customer statements, which are rendered a page at a time.
+"""
+import re
+
+PDF_HEADER = b'%PDF-1.3\n%\x93\x8c\x8b\x9e\n'
+OBJECT_REFERENCE = re.compile(rb'(\d+) 0 R')
+PAGE_TYPE = re.compile(rb'/Type /Page\b')
+SKIPPED_TYPES = re.compile(rb'/Type /(Pages|Catalog)\b')
+
+
+def _pdf_objects(pdf):
+    """
+    (number, body) of each object of a ReportLab PDF, read through its xref
+    table so stream contents are never scanned for keywords
+    """
+    xref = int(pdf[pdf.rindex(b'startxref') + len(b'startxref'):].split()[0])
+    lines = pdf[xref:].split(b'\n')
+    count = int(lines[1].split()[1])
+    offsets = sorted(
+        (int(line[:10]), number)
+        for number, line in enumerate(lines[2:2 + count])
+        if line[17:18] == b'n'
+    )
+    for index, (offset, number) in enumerate(offsets):
+        end = offsets[index + 1][0] if index + 1 < len(offsets) else xref
+        chunk = pdf[offset:end]
+        yield number, chunk[chunk.index(b' obj') + len(b' obj'):chunk.rindex(b'endobj')]
+
+
+def _is_info(body):
+    return b'/Producer' in body and b'/Type' not in body
+
+
+def concatenate_pdfs(pdfs):
+    """Yield one PDF document containing the pages of each PDF in `pdfs`, in order"""
+    # Objects 1 and 2 are the new page tree and catalog, written last
+    pages_number, catalog_number = 1, 2
+    next_number = 3
+    offsets = {}
+    kids = []
+    position = len(PDF_HEADER)
+    yield PDF_HEADER
+
+    for pdf in pdfs:
+        objects = [
+            (number, body) for number, body in _pdf_objects(pdf)
+            if not SKIPPED_TYPES.search(body.split(b'stream', 1)[0]) and not _is_info(body)
+        ]
+        numbers = {}
+        for number, _ in objects:
+            numbers[number] = next_number
+            next_number += 1
+
+        def renumber(match):
+            return b'%d 0 R' % numbers.get(int(match.group(1)), pages_number)
+
+        for number, body in objects:
+            # Only dictionaries hold references; stream data is copied untouched
+            dictionary, separator, data = body.partition(b'stream\n')
+            if PAGE_TYPE.search(dictionary):
+                kids.append(numbers[number])
+            chunk = b'%d 0 obj%s%s%sendobj\n' % (
+                numbers[number], OBJECT_REFERENCE.sub(renumber, dictionary), separator, data
+            )
+            offsets[numbers[number]] = position
+            position += len(chunk)
+            yield chunk
+
+    tail = []
+    for number, body in (
+        (pages_number, b'\n<<\n/Count %d /Kids [ %s ] /Type /Pages\n>>\n' % (
+            len(kids), b' '.join(b'%d 0 R' % kid for kid in kids)
+        )),
+        (catalog_number, b'\n<<\n/Pages %d 0 R /Type /Catalog\n>>\n' % pages_number),
+    ):
+        chunk = b'%d 0 obj%sendobj\n' % (number, body)
+        offsets[number] = position
+        position += len(chunk)
+        tail.append(chunk)
+
+    tail.append(b'xref\n0 %d\n0000000000 65535 f \n' % next_number)
+    tail.extend(b'%010d 00000 n \n' % offsets[number] for number in range(1, next_number))
+    tail.append(b'trailer\n<<\n/Root %d 0 R\n/Size %d\n>>\nstartxref\n%d\n%%%%EOF\n' % (
+        catalog_number, next_number, position
+    ))
+    yield b''.join(tail)
@@ -0,0 +1,79 @@
+"""
+Signed, self-expiring tokens for sharing receipt PDFs
+
+A token is the sale id, an expiry time, a scope and a random id, signed
+with the SECRET_KEY (django.core.signing, HMAC-SHA256). Creating one
+writes nothing and checking one needs no database read: the signature
+proves the server issued it, and the payload says which sale it opens
+and until when. Tokens live for settings.PDF_TOKEN_LIFETIME.
+
+A token can be revoked before it expires. Its random id is added to a
+revocation list in the default cache until the token would have expired
+anyway. Revocation reaches every process only when that cache is shared
+(REDIS_URL); with the local-memory cache it applies to the process that
+revoked the token.
+
+Tokens from before signing (UUIDs stored in PDFAccessToken) are still
+accepted until they expire; `manage.py purge_pdf_tokens` deletes the
+expired rows.
+"""
+import time
+import uuid
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+
+SALT = 'salesperson.pdf_token'
+SCOPE_RECEIPT = 'receipt'
+
+
+class InvalidPDFToken(Exception):
+    """The token was not issued by this server, or is for another sale or scope."""
+
+
+class ExpiredPDFToken(InvalidPDFToken):
+    """The token is genuine but has expired or been revoked."""
+
+
+def _revoked_key(token_id):
+    return f'pdf-token:revoked:{token_id}'
+
+
+def create_token(sale_id, scope=SCOPE_RECEIPT, lifetime=None):
+    """Sign a token for `sale_id`. Returns (token, expires_at)."""
+    expires_at = timezone.now() + (lifetime or settings.PDF_TOKEN_LIFETIME)
+    payload = {
+        'sale': sale_id,
+        'exp': int(expires_at.timestamp()),
+        'scope': scope,
+        'id': uuid.uuid4().hex,
+    }
+    return signing.dumps(payload, salt=SALT), expires_at
+
+
+def read_token(token):
+    """The payload of a genuine token, expired or not. Raises InvalidPDFToken."""
+    try:
+        return signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise InvalidPDFToken('Invalid token')
+
+
+def verify_token(token, sale_id, scope=SCOPE_RECEIPT):
+    """Check a token opens `sale_id` in `scope` and is still valid. Returns its payload."""
+    payload = read_token(token)
+    if payload.get('sale') != sale_id or payload.get('scope') != scope:
+        raise InvalidPDFToken('Invalid token')
+    if payload['exp'] <= time.time() or cache.get(_revoked_key(payload['id'])):
+        raise ExpiredPDFToken('Token has expired or is invalid')
+    return payload
+
+
+def revoke_token(token):
+    """Reject a token from now on. Returns its payload."""
+    payload = read_token(token)
+    remaining = int(payload['exp'] - time.time())
+    if remaining > 0:
+        cache.set(_revoked_key(payload['id']), True, timeout=remaining)
+    return payload
@@ -0,0 +1,264 @@
+"""
+Declarative pivot over sales
+
+A pivot is a list of dimensions to group by and a list of measures to
+total, for example ``?dimensions=month,category&measures=revenue,quantity``.
+It compiles to one grouped query (plus one aggregate for the totals).
+
+The query runs against the cheapest source that can answer it:
+
+- ``rollup``: the ProductSalesDaily counters, for revenue and quantity by
+  date, salesperson, product or category
+- ``sales``: one row per sale, for counts, payments and balances
+- ``sale_items``: one row per sale item, when product or category
+  dimensions are combined with sale-level filters or with counts
+
+Paid amounts and balances belong to a whole sale, so they cannot be split
+by product or category. Salespersons only ever see their own sales.
+Results are cached under the sales version, so any change to a sale
+invalidates them. Results read from the replica are cached apart, for
+REPLICA_RESULT_SECONDS at most.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Concat, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+from .filters import parse_date
+from .models import ProductSalesDaily, Sale, SaleItem
+from .query_budget import check_range
+from .rollups import sales_cache_key, sales_cache_timeout
+
+# Source -> model plus the field paths dimensions and filters are built from.
+# A None path means the source cannot answer anything that needs it.
+SOURCES = {
+    'rollup': {
+        'model': ProductSalesDaily, 'date': 'date', 'timestamp': False,
+        'salesperson': 'salesperson', 'product': 'product', 'sale': None,
+    },
+    'sales': {
+        'model': Sale, 'date': 'created_at', 'timestamp': True,
+        'salesperson': 'salesperson', 'product': None, 'sale': '',
+    },
+    'sale_items': {
+        'model': SaleItem, 'date': 'sale__created_at', 'timestamp': True,
+        'salesperson': 'sale__salesperson', 'product': 'product', 'sale': 'sale__',
+    },
+}
+
+
+class Dimension(NamedTuple):
+    requires: str
+    value: Callable
+    labels: dict = {}
+
+
+def _day(paths):
+    return TruncDate(paths['date']) if paths['timestamp'] else F(paths['date'])
+
+
+DIMENSIONS = {
+    'day': Dimension('date', _day),
+    'week': Dimension('date', lambda paths: TruncWeek(paths['date'])),
+    'month': Dimension('date', lambda paths: TruncMonth(paths['date'])),
+    'salesperson': Dimension(
+        'salesperson',
+        lambda paths: F(f"{paths['salesperson']}_id"),
+        {'salesperson_name': lambda paths: Concat(
+            F(f"{paths['salesperson']}__first_name"), Value(' '), F(f"{paths['salesperson']}__last_name")
+        )}
+    ),
+    'category': Dimension('product', lambda paths: F(f"{paths['product']}__category")),
+    'product': Dimension(
+        'product',
+        lambda paths: F(f"{paths['product']}_id"),
+        {
+            'product_name': lambda paths: F(f"{paths['product']}__name"),
+            'product_sku': lambda paths: F(f"{paths['product']}__sku"),
+        }
+    ),
+    'payment_method': Dimension('sale', lambda paths: F(f"{paths['sale']}payment_method")),
+    'payment_status': Dimension('sale', lambda paths: F(f"{paths['sale']}payment_status")),
+}
+
+TIME_DIMENSIONS = ('day', 'week', 'month')
+
+# Measure -> aggregate per source; sources missing from the dict cannot provide it
+MEASURES = {
+    'count': {'sales': Count('id'), 'sale_items': Count('sale_id', distinct=True)},
+    'revenue': {'rollup': Sum('revenue'), 'sales': Sum('total_amount'), 'sale_items': Sum('subtotal')},
+    'paid': {'sales': Sum('amount_paid')},
+    'balance': {'sales': Sum('balance')},
+    'quantity': {'rollup': Sum('quantity'), 'sale_items': Sum('quantity')},
+}
+
+# Filter parameter -> (relation it needs, lookup under that relation)
+FILTERS = {
+    'salesperson': ('salesperson', '_id'),
+    'payment_status': ('sale', 'payment_status'),
+    'payment_method': ('sale', 'payment_method'),
+    'category': ('product', '__category__iexact'),
+    'product': ('product', '_id'),
+}
+
+DEFAULT_MEASURES = ('count', 'revenue')
+
+
+def _split(value):
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+def parse_pivot(user, params):
+    """Validate pivot query parameters into a spec dict, raising ValueError for bad input."""
+    dimensions = _split(params.get('dimensions'))
+    measures = _split(params.get('measures')) or list(DEFAULT_MEASURES)
+
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown dimension(s): {', '.join(unknown)}. Use: {', '.join(DIMENSIONS)}")
+    unknown = [name for name in measures if name not in MEASURES]
+    if unknown:
+        raise ValueError(f"Unknown measure(s): {', '.join(unknown)}. Use: {', '.join(MEASURES)}")
+    if len(set(dimensions)) != len(dimensions) or len(set(measures)) != len(measures):
+        raise ValueError('Dimensions and measures may only be listed once')
+    if len([name for name in dimensions if name in TIME_DIMENSIONS]) > 1:
+        raise ValueError('Use at most one of day, week and month')
+
+    filters = {name: params.get(name) for name in FILTERS if params.get(name)}
+    for name in ('salesperson', 'product'):
+        if name in filters:
+            try:
+                filters[name] = int(filters[name])
+            except ValueError:
+                raise ValueError(f'Invalid {name} ID')
+    # Role-based scoping
+    if user.role == 'Salesperson':
+        filters['salesperson'] = user.id
+
+    today = timezone.now().date()
+    date_from = parse_date(params.get('date_from')) or today - timedelta(days=30)
+    date_to = parse_date(params.get('date_to')) or today
+    time_dimension = next((name for name in dimensions if name in TIME_DIMENSIONS), 'total')
+    check_range(date_from, date_to, time_dimension)
+
+    order = params.get('order') or ''
+    if order and order.lstrip('-') not in dimensions + measures:
+        raise ValueError('order must be one of the requested dimensions or measures')
+
+    try:
+        limit = int(params.get('limit', settings.PIVOT_MAX_ROWS))
+    except ValueError:
+        limit = settings.PIVOT_MAX_ROWS
+
+    return {
+        'dimensions': dimensions,
+        'measures': measures,
+        'filters': filters,
+        'date_from': date_from.strftime('%Y-%m-%d'),
+        'date_to': date_to.strftime('%Y-%m-%d'),
+        'order': order,
+        'limit': min(max(1, limit), settings.PIVOT_MAX_ROWS),
+    }
+
+
+def choose_source(spec):
+    """The first source (cheapest first) that has every dimension, measure and filter"""
+    for source, paths in SOURCES.items():
+        needed = [DIMENSIONS[name].requires for name in spec['dimensions']]
+        needed += [FILTERS[name][0] for name in spec['filters']]
+        if all(paths.get(relation) is not None for relation in needed) and all(
+            source in MEASURES[name] for name in spec['measures']
+        ):
+            return source
+    raise ValueError(
+        'paid and balance are totals of whole sales and cannot be split by product or category'
+    )
+
+
+def compile_pivot(spec, source):
+    """
+    Build the grouped queryset for a spec and run the totals aggregate.
+    Returns (rows queryset or None without dimensions, totals dict).
+    """
+    paths = SOURCES[source]
+    queryset = paths['model'].objects.all()
+    if source == 'rollup':
+        # Counters of fully deleted sales stay behind at zero
+        queryset = queryset.exclude(quantity=0)
+
+    date = paths['date'] + ('__date' if paths['timestamp'] else '')
+    queryset = queryset.filter(**{f'{date}__gte': spec['date_from'], f'{date}__lte': spec['date_to']})
+    for name, value in spec['filters'].items():
+        relation, lookup = FILTERS[name]
+        queryset = queryset.filter(**{f'{paths[relation]}{lookup}': value})
+
+    # Aliases are prefixed so they cannot clash with model fields such as `product`
+    groups = {}
+    for name in spec['dimensions']:
+        dimension = DIMENSIONS[name]
+        groups[f'd_{name}'] = dimension.value(paths)
+        for label, expression in dimension.labels.items():
+            groups[f'l_{label}'] = expression(paths)
+    aggregates = {f'm_{name}': MEASURES[name][source] for name in spec['measures']}
+
+    totals = queryset.aggregate(**aggregates)
+    if not groups:
+        return None, totals
+
+    ordering = [f'd_{name}' for name in spec['dimensions']]
+    if spec['order']:
+        field = spec['order'].lstrip('-')
+        prefix = 'm_' if field in spec['measures'] else 'd_'
+        descending = '-' if spec['order'].startswith('-') else ''
+        ordering.insert(0, f'{descending}{prefix}{field}')
+    rows = queryset.annotate(**groups).values(*groups).annotate(**aggregates).order_by(*ordering)
+    return rows, totals
+
+
+def _output_value(value):
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def run_pivot(spec):
+    source = choose_source(spec)
+    rows, totals = compile_pivot(spec, source)
+    # One row more than the limit tells us whether the result was cut short
+    fetched = list(rows[:spec['limit'] + 1]) if rows is not None else []
+    truncated = len(fetched) > spec['limit']
+
+    return {
+        'source': source,
+        'rows': [
+            {key[2:]: _output_value(value) for key, value in row.items()}
+            for row in fetched[:spec['limit']]
+        ],
+        'totals': {key[2:]: value for key, value in totals.items()},
+        'truncated': truncated,
+    }
+
+
+def build_pivot(user, params):
+    """Pivot of sales by the requested dimensions and measures, cached until sales change"""
+    spec = parse_pivot(user, params)
+    digest = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+    cache_key = sales_cache_key('pivot', digest)
+    result = cache.get(cache_key)
+    if result is None:
+        result = run_pivot(spec)
+        cache.set(cache_key, result, timeout=sales_cache_timeout(settings.PIVOT_CACHE_SECONDS))
+
+    return {
+        'dimensions': spec['dimensions'],
+        'measures': spec['measures'],
+        **result,
+        'filters_applied': spec['filters'],
+        'period': {'from': spec['date_from'], 'to': spec['date_to']},
+    }
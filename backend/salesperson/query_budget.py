@@ -0,0 +1,221 @@
+"""
+Query budgets for report endpoints
+
+A report request has to stay within its budget or it is refused, so one
+expensive report cannot tie up a web worker and the database while sales
+are being entered:
+
+- Date range: each granularity has a maximum range
+  (settings.REPORT_MAX_RANGE_DAYS). Requests over it get a 400 before
+  any query runs.
+- Time: queries are cut off after settings.REPORT_STATEMENT_TIMEOUT_MS.
+  PostgreSQL enforces this per statement (SET LOCAL statement_timeout).
+  SQLite enforces it for the whole report, through a progress handler
+  that interrupts the running statement. An interrupted report returns
+  503 with Retry-After.
+- Embedded lists (top debtors, unpaid sales, ...) take ?limit=, capped at
+  settings.REPORT_MAX_LIST_ROWS.
+
+Both errors point at the equivalent background job where there is one.
+Jobs call the report builders directly and have no budget.
+
+Coalesced reports (see singleflight.py) apply the timeout only around the
+computation, with budgeted(), so a request that is just waiting for another
+request's result does not sit in an open transaction.
+"""
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import OperationalError, connections, router, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .filters import parse_date
+from .models import Sale
+
+logger = logging.getLogger(__name__)
+
+# SQLite calls the progress handler every this many virtual machine instructions
+SQLITE_PROGRESS_STEPS = 10000
+
+# SQLSTATE for query_canceled, raised when statement_timeout fires
+POSTGRES_QUERY_CANCELED = '57014'
+
+
+class QueryBudgetExceeded(Exception):
+    """A report query ran past its statement timeout."""
+
+
+class ReportRangeTooLarge(ValueError):
+    """The requested date range is longer than the granularity allows."""
+
+    def __init__(self, message, max_days):
+        super().__init__(message)
+        self.max_days = max_days
+
+
+def embedded_list_limit(params, default=10):
+    """Rows for lists embedded in a report (?limit=), capped at REPORT_MAX_LIST_ROWS"""
+    try:
+        limit = int(params.get('limit', default))
+    except (TypeError, ValueError):
+        limit = default
+    return min(max(1, limit), settings.REPORT_MAX_LIST_ROWS)
+
+
+def check_date_range(params, granularities, default_days=30):
+    """
+    Validate ?granularity= against `granularities` (the first is the
+    default) and the requested date range against its maximum.
+
+    Missing dates default the same way the report builders do: date_to to
+    today and date_from to `default_days` before it. With default_days=None
+    a missing date_from means an open range and is not limited here.
+    """
+    granularity = params.get('granularity') or granularities[0]
+    if granularity not in granularities:
+        raise ValueError(f"Invalid granularity. Use one of: {', '.join(granularities)}")
+
+    today = timezone.now().date()
+    date_to = parse_date(params.get('date_to')) or today
+    date_from = parse_date(params.get('date_from'))
+    if date_from is None:
+        if default_days is None:
+            return
+        date_from = today - timedelta(days=default_days)
+
+    check_range(date_from, date_to, granularity)
+
+
+def check_range(date_from, date_to, granularity):
+    """Raise ReportRangeTooLarge if date_from..date_to is too long for `granularity`"""
+    max_days = settings.REPORT_MAX_RANGE_DAYS[granularity]
+    if (date_to - date_from).days + 1 > max_days:
+        raise ReportRangeTooLarge(
+            f"Date range too large for granularity '{granularity}' (maximum {max_days} days)",
+            max_days
+        )
+
+
+def _is_statement_timeout(error):
+    cause = error.__cause__
+    return POSTGRES_QUERY_CANCELED in (getattr(cause, 'pgcode', None), getattr(cause, 'sqlstate', None))
+
+
+@contextmanager
+def statement_timeout(milliseconds, using=None):
+    """
+    Abort queries on `using` (by default the connection reports read from)
+    that run past `milliseconds`, raising QueryBudgetExceeded.
+    """
+    using = using or router.db_for_read(Sale)
+    connection = connections[using]
+
+    if connection.vendor == 'postgresql':
+        try:
+            # SET LOCAL only lasts until the end of this transaction
+            with transaction.atomic(using=using):
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL statement_timeout = %s', [int(milliseconds)])
+                yield
+        except OperationalError as e:
+            if _is_statement_timeout(e):
+                raise QueryBudgetExceeded(str(e)) from e
+            raise
+
+    elif connection.vendor == 'sqlite':
+        connection.ensure_connection()
+        deadline = time.monotonic() + milliseconds / 1000
+        expired = []
+
+        def check_deadline():
+            # A non-zero return interrupts the running statement
+            if time.monotonic() > deadline:
+                expired.append(True)
+                return 1
+            return 0
+
+        connection.connection.set_progress_handler(check_deadline, SQLITE_PROGRESS_STEPS)
+        try:
+            yield
+        except OperationalError as e:
+            if expired:
+                raise QueryBudgetExceeded(str(e)) from e
+            raise
+        finally:
+            connection.connection.set_progress_handler(None, 0)
+
+    else:
+        yield
+
+
+def budgeted(compute, timeout_ms=None):
+    """
+    compute, wrapped to run under the report statement timeout. For views
+    decorated with @query_budget(timeout=False).
+    """
+    def run():
+        with statement_timeout(timeout_ms or settings.REPORT_STATEMENT_TIMEOUT_MS):
+            return compute()
+    return run
+
+
+def _job_hint(request, job_type):
+    if not job_type:
+        return None
+    return {
+        'endpoint': reverse('api_job_list'),
+        'job_type': job_type,
+        'params': {key: value for key, value in request.GET.items() if key != 'format'},
+    }
+
+
+def query_budget(granularities=None, default_days=30, job_type=None, timeout_ms=None, timeout=True):
+    """
+    Enforce a report's query budget on a function-based API view. Apply it
+    below @api_view (and below @replica_reads, so the timeout is set on the
+    connection the report reads from).
+
+    granularities: allowed ?granularity= values, the first being the default;
+    None skips the date range check.
+    job_type: the Job type that runs the same report in the background.
+    timeout_ms: override of settings.REPORT_STATEMENT_TIMEOUT_MS.
+    timeout: False when the view sets the statement timeout itself with
+    budgeted(); timeouts it raises are still answered with a 503.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if granularities:
+                try:
+                    check_date_range(request.GET, granularities, default_days)
+                except ReportRangeTooLarge as e:
+                    data = {'error': str(e), 'max_days': e.max_days}
+                    hint = _job_hint(request, job_type)
+                    if hint:
+                        data['job'] = hint
+                    return Response(data, status=status.HTTP_400_BAD_REQUEST)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            budget = (
+                statement_timeout(timeout_ms or settings.REPORT_STATEMENT_TIMEOUT_MS) if timeout else nullcontext()
+            )
+            try:
+                with budget:
+                    return view(request, *args, **kwargs)
+            except QueryBudgetExceeded:
+                logger.warning(f"{view.__name__} exceeded its query budget for {request.user.email}")
+                data = {'error': 'This report took too long to run. Narrow the date range or run it as a background job.'}
+                hint = _job_hint(request, job_type)
+                if hint:
+                    data['job'] = hint
+                response = Response(data, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                response['Retry-After'] = str(settings.REPORT_RETRY_AFTER_SECONDS)
+                return response
+        return wrapper
+    return decorator
@@ -0,0 +1,155 @@
+"""
+Receipt rendering benchmark
+
+Renders receipts for in-memory sales (nothing is read from or written
+to the database) and compares the overlay renderer, render_receipt(),
+with the flowable layout it replaced, render_flowable_receipt(). For
+each it measures the best wall time, the peak memory allocated by one
+render (tracemalloc) and the size of the PDF. Run it with
+`python manage.py benchmark_receipts`.
+
+The results can be saved as JSON (report()) and compared with an
+earlier run (regressions()), which is how CI catches a change that
+makes receipts slower, hungrier or larger.
+"""
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+import reportlab
+from django.utils import timezone
+from .models import Sale, SaleItem, User
+from .receipts import TEMPLATE_VERSION, render_flowable_receipt, render_receipt
+
+RENDERERS = {
+    'flowable': render_flowable_receipt,
+    'overlay': render_receipt,
+}
+
+DEFAULT_ITEM_COUNTS = (1, 10, 15, 100, 500)
+
+# How much worse than the baseline each measurement may get, as a fraction
+# of the baseline, before it counts as a regression. Timings are noisier
+# than memory, and the output size should only change with the layout.
+METRICS = ('ms', 'peak_kb', 'bytes')
+DEFAULT_TOLERANCES = {
+    'ms': 0.5,
+    'peak_kb': 0.2,
+    'bytes': 0.1,
+}
+
+
+def sample_sale(item_count, sale_id=1):
+    """An unsaved, partly paid sale with `item_count` items, ready to render"""
+    salesperson = User(email='bench@example.com', username='bench', first_name='Bench', last_name='Mark')
+    items = [
+        SaleItem(
+            product_name=f'Sample product {number}',
+            quantity=number % 5 + 1,
+            price_at_sale=Decimal('19.99'),
+        )
+        for number in range(1, item_count + 1)
+    ]
+    for item in items:
+        item.subtotal = item.quantity * item.price_at_sale
+    total = sum((item.subtotal for item in items), Decimal('0.00'))
+    sale = Sale(
+        id=sale_id,
+        salesperson=salesperson,
+        customer_name='Benchmark Customer',
+        total_amount=total,
+        amount_paid=(total / 2).quantize(Decimal('0.01')),
+        payment_method=Sale.PAYMENT_METHOD_CASH,
+        created_at=timezone.make_aware(datetime(2025, 1, 15, 10, 30)),
+    )
+    sale.update_payment_status()
+    sale.receipt_items = items
+    return sale
+
+
+def time_render(render, sale, runs):
+    """Best wall time, in seconds, of `runs` renders, and the size of the output"""
+    render(sale)  # warm up, e.g. record the static page
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        pdf = render(sale)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(pdf)
+
+
+def peak_memory(render, sale):
+    """Peak memory, in bytes, allocated while rendering `sale` once"""
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        render(sale)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return peak - baseline
+
+
+def compare(item_counts=DEFAULT_ITEM_COUNTS, runs=20):
+    """
+    One result per item count with each renderer's best time (ms), peak
+    memory (KiB) and output size (bytes)
+    """
+    results = []
+    for item_count in item_counts:
+        sale = sample_sale(item_count)
+        result = {'items': item_count}
+        for name, render in RENDERERS.items():
+            # Timed first: tracemalloc slows down every allocation
+            seconds, size = time_render(render, sale, runs)
+            result[f'{name}_ms'] = round(seconds * 1000, 3)
+            result[f'{name}_peak_kb'] = round(peak_memory(render, sale) / 1024, 1)
+            result[f'{name}_bytes'] = size
+        result['speedup'] = round(result['flowable_ms'] / result['overlay_ms'], 2)
+        results.append(result)
+    return results
+
+
+def report(results, runs):
+    """The results with what they were measured on, ready to be saved as JSON"""
+    return {
+        'runs': runs,
+        'template_version': TEMPLATE_VERSION,
+        'python': platform.python_version(),
+        'reportlab': reportlab.Version,
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def regressions(results, baseline, tolerances=None):
+    """
+    Messages for every measurement in `results` that is worse than the same
+    one in `baseline` (a report()) by more than its tolerance. Item counts
+    missing from the baseline are not compared.
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    baseline_results = {result['items']: result for result in baseline.get('results', [])}
+    problems = []
+    for result in results:
+        previous = baseline_results.get(result['items'])
+        if previous is None:
+            continue
+        for name in RENDERERS:
+            for metric in METRICS:
+                key = f'{name}_{metric}'
+                if key not in previous:
+                    continue
+                limit = previous[key] * (1 + tolerances[metric])
+                if result[key] > limit:
+                    problems.append(
+                        f"{result['items']} items: {key} {result[key]} exceeds "
+                        f"{previous[key]} by more than {tolerances[metric]:.0%}"
+                    )
+    return problems
@@ -0,0 +1,179 @@
+"""
+On-disk cache of rendered receipt PDFs
+
+A receipt is fully determined by the sale (its ``updated_at`` changes
+whenever a payment or edit touches it) and by the template that lays it
+out. Rendered PDFs are stored under settings.RECEIPT_CACHE_ROOT, named
+after a hash of (sale id, updated_at, template, template version):
+
+    receipt_cache/<sale id>/<hash>.pdf
+
+Repeat views, including public token downloads, are served straight
+from the file with a strong ETag. Formats that are cheaper to render than
+to store (see receipt_formats.py) skip the file but get the same ETag. A client that already has the file gets
+304 Not Modified. When a sale changes its key changes: the next view
+renders a new file and drops the sale's stale ones. Bumping a template's
+version re-renders every receipt made with that template.
+
+The cache is limited to settings.RECEIPT_CACHE_MAX_BYTES. Every hit
+touches the file's modification time, and when a new file pushes the
+total over the limit, the least recently used files are removed first.
+"""
+import hashlib
+import io
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header, quote_etag
+
+logger = logging.getLogger(__name__)
+
+# After an eviction the cache is trimmed to this fraction of the limit, so
+# the directory is not rescanned on every following write
+EVICT_TO_FRACTION = 0.9
+
+
+def cache_root():
+    return Path(settings.RECEIPT_CACHE_ROOT)
+
+
+def receipt_key(sale, template, version):
+    """Content address of a receipt: changes whenever the sale or the template does."""
+    source = f'{sale.pk}|{sale.updated_at.isoformat()}|{template}|{version}'
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def _path(sale_id, key):
+    return cache_root() / str(sale_id) / f'{key}.pdf'
+
+
+def _write(path, pdf_data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f'{path.stem}.{uuid.uuid4().hex}.tmp')
+    with open(temporary, 'wb') as output:
+        output.write(pdf_data)
+    os.replace(temporary, path)
+
+
+def _drop_stale(path):
+    """Remove older renders of the same sale once a newer one exists."""
+    for sibling in path.parent.glob('*.pdf'):
+        if sibling != path:
+            sibling.unlink(missing_ok=True)
+
+
+def evict(max_bytes=None):
+    """Delete least recently used receipts until the cache is under its size limit."""
+    max_bytes = settings.RECEIPT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    files = []
+    total = 0
+    for path in cache_root().glob('*/*.pdf'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    target = max_bytes * EVICT_TO_FRACTION
+    for _, size, path in sorted(files, key=lambda entry: entry[0]):
+        if total <= target:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    logger.info(f"Receipt cache evicted {removed} file(s)")
+    return removed
+
+
+def clear():
+    """Remove every cached receipt."""
+    shutil.rmtree(cache_root(), ignore_errors=True)
+
+
+def _store(path, pdf_data):
+    _write(path, pdf_data)
+    _drop_stale(path)
+    evict()
+
+
+def get_or_render(sale, template, version, render):
+    """
+    Path of the cached receipt for `sale`, calling render() (which returns
+    PDF bytes) only when it is not cached yet. Returns (path, key, hit).
+    The file may be evicted at any time; use open_or_render() to serve it.
+    """
+    key = receipt_key(sale, template, version)
+    path = _path(sale.pk, key)
+    try:
+        # Touch on read so eviction removes the least recently used receipts
+        os.utime(path)
+        return path, key, True
+    except FileNotFoundError:
+        pass
+
+    _store(path, render())
+    return path, key, False
+
+
+def open_or_render(sale, template, version, render):
+    """
+    The cached receipt for `sale` as an open binary file, rendering and
+    storing it on a miss. Returns (file, hit). The cached file is opened
+    before anything else, so a concurrent eviction or stale-render cleanup
+    that removes it afterwards cannot break the response.
+    """
+    path = _path(sale.pk, receipt_key(sale, template, version))
+    try:
+        receipt = open(path, 'rb')
+    except FileNotFoundError:
+        pdf_data = render()
+        _store(path, pdf_data)
+        return io.BytesIO(pdf_data), False
+
+    try:
+        # Touch on read so eviction removes the least recently used receipts
+        os.utime(path)
+    except FileNotFoundError:
+        # Removed since it was opened; the open file still reads in full
+        pass
+    return receipt, True
+
+
+def receipt_response(request, sale, template, version, render, filename, as_attachment=False,
+                     content_type='application/pdf', store=True):
+    """
+    Serve a sale's receipt from the cache (rendering it on a miss), with a
+    strong ETag; answers 304 when the client's copy is current. With
+    store=False the receipt is rendered for the response and not cached.
+    """
+    key = receipt_key(sale, template, version)
+    etag = quote_etag(key)
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        response = HttpResponseNotModified()
+    elif store:
+        receipt, hit = open_or_render(sale, template, version, render)
+        response = FileResponse(
+            receipt,
+            content_type=content_type,
+            as_attachment=as_attachment,
+            filename=filename
+        )
+        response['X-Receipt-Cache'] = 'hit' if hit else 'miss'
+    else:
+        response = HttpResponse(render(), content_type=content_type)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+
+    response['ETag'] = etag
+    # Receipts are personal data and change when payments are made: let the
+    # browser keep them but revalidate every time (a cheap 304 when unchanged)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,166 @@
+"""
+Compact receipt formats for thermal printers and previews
+
+Besides the PDF, a sale's receipt can be produced as:
+
+- ``txt``: fixed-width plain text, sized for a 58mm or 80mm roll
+- ``escpos``: the same text with ESC/POS printer commands (bold and
+  double-height header, centred lines, paper cut) in code page 437
+- ``html``: a small self-contained page for previews on phones
+
+They are built from the same sale data as the PDF (see receipts.py:
+load_sale(), info_rows(), item_rows(), summary_rows()) with plain string
+formatting, at a small fraction of the cost of a PDF layout, so they are
+rendered on every request rather than stored in the receipt cache. The
+receipt endpoints still answer with an ETag and 304 Not Modified.
+"""
+import textwrap
+from django.utils.html import escape
+from .receipts import (
+    COMPANY_NAME, ITEMS_HEADER, RECEIPT_TITLE, THANK_YOU, info_rows, item_rows, summary_rows
+)
+
+# Part of the ETag of the compact formats; bump it whenever a layout below changes
+TEMPLATE_VERSION = 1
+
+# Characters per line in the printers' default font
+PAPER_COLUMNS = {
+    '58': 32,
+    '80': 48,
+}
+DEFAULT_PAPER = '80'
+
+# Line styles
+TITLE, HEADING, TEXT, STRONG = 'title', 'heading', 'text', 'strong'
+
+# ESC/POS commands
+ESC_INIT = b'\x1b@'
+ESC_ALIGN = {False: b'\x1ba\x00', True: b'\x1ba\x01'}
+ESC_BOLD = {False: b'\x1bE\x00', True: b'\x1bE\x01'}
+ESC_DOUBLE_HEIGHT = {False: b'\x1d!\x00', True: b'\x1d!\x01'}
+ESC_FEED_AND_CUT = b'\x1dVB\x03'
+
+
+def paper_columns(paper=None):
+    """Line width for a paper size ('58' or '80', in mm). Raises ValueError for others."""
+    paper = (paper or DEFAULT_PAPER).removesuffix('mm')
+    if paper not in PAPER_COLUMNS:
+        raise ValueError(f"paper must be one of: {', '.join(PAPER_COLUMNS)}")
+    return PAPER_COLUMNS[paper]
+
+
+def _pair(label, value, width):
+    """`label` left and `value` right on one line, or on two if they do not fit"""
+    gap = width - len(label) - len(value)
+    if gap > 0:
+        return [label + ' ' * gap + value]
+    return [label[:width], value[-width:].rjust(width)]
+
+
+def receipt_lines(sale, width):
+    """The receipt as (style, centred, text) lines of at most `width` characters"""
+    rule = (TEXT, False, '-' * width)
+    lines = [
+        (TITLE, True, COMPANY_NAME[:width]),
+        (HEADING, True, RECEIPT_TITLE),
+        rule,
+    ]
+    for label, value in info_rows(sale):
+        lines += [(TEXT, False, line) for line in _pair(label, value, width)]
+
+    lines.append(rule)
+    for name, quantity, unit_price, total in item_rows(sale):
+        lines += [(TEXT, False, line) for line in textwrap.wrap(name, width) or ['']]
+        lines += [(TEXT, False, line) for line in _pair(f'  {quantity} x {unit_price}', total, width)]
+
+    lines.append(rule)
+    rows = summary_rows(sale)
+    for index, (label, value) in enumerate(rows):
+        style = STRONG if index == len(rows) - 1 else TEXT
+        lines += [(style, False, line) for line in _pair(label, value, width)]
+
+    lines += [rule, (TEXT, True, ''), (TEXT, True, THANK_YOU[:width])]
+    return lines
+
+
+def render_text(sale, paper=None):
+    """The receipt as UTF-8 plain text"""
+    width = paper_columns(paper)
+    text = '\n'.join(
+        line.center(width).rstrip() if centred else line
+        for _, centred, line in receipt_lines(sale, width)
+    )
+    return (text + '\n').encode('utf-8')
+
+
+def render_escpos(sale, paper=None):
+    """The receipt as an ESC/POS print job, ending with a paper cut"""
+    width = paper_columns(paper)
+    job = [ESC_INIT]
+    for style, centred, line in receipt_lines(sale, width):
+        job += [
+            ESC_ALIGN[centred],
+            ESC_BOLD[style != TEXT],
+            ESC_DOUBLE_HEIGHT[style == TITLE],
+            line.encode('cp437', errors='replace'),
+            b'\n',
+        ]
+    job += [ESC_BOLD[False], ESC_DOUBLE_HEIGHT[False], ESC_ALIGN[False], ESC_FEED_AND_CUT]
+    return b''.join(job)
+
+
+HTML_STYLE = (
+    'body{font:14px/1.4 system-ui,sans-serif;margin:0;padding:12px;color:#222}'
+    'main{max-width:420px;margin:auto}'
+    'h1{font-size:18px;color:#00008b;text-align:center;margin:0}'
+    'h2{font-size:15px;color:#00008b;text-align:center;margin:4px 0 12px}'
+    'table{width:100%;border-collapse:collapse;margin-bottom:12px}'
+    'th,td{padding:4px 6px;text-align:left}'
+    '.items th{background:#00008b;color:#fff}'
+    '.items td{border-bottom:1px solid #ddd}'
+    '.items .n{text-align:right;white-space:nowrap}'
+    '.summary tr:last-child{background:#add8e6;font-weight:bold}'
+    'footer{text-align:center;color:#888;font-size:12px}'
+)
+
+
+def _cells(tag, cells, numeric_from=None):
+    return ''.join(
+        f'<{tag} class="n">{escape(cell)}</{tag}>' if numeric_from is not None and index >= numeric_from
+        else f'<{tag}>{escape(cell)}</{tag}>'
+        for index, cell in enumerate(cells)
+    )
+
+
+def render_html(sale):
+    """The receipt as a small self-contained UTF-8 HTML page"""
+    info = ''.join(f'<tr>{_cells("th", [label])}{_cells("td", [value])}</tr>' for label, value in info_rows(sale))
+    items = ''.join(f'<tr>{_cells("td", row, numeric_from=1)}</tr>' for row in item_rows(sale))
+    summary = ''.join(
+        f'<tr>{_cells("th", [label])}{_cells("td", [value])}</tr>' for label, value in summary_rows(sale)
+    )
+    page = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width,initial-scale=1">'
+        f'<title>{escape(RECEIPT_TITLE)} RCP-{sale.id:06d}</title><style>{HTML_STYLE}</style></head>'
+        f'<body><main><h1>{escape(COMPANY_NAME)}</h1><h2>{escape(RECEIPT_TITLE)}</h2>'
+        f'<table class="info">{info}</table>'
+        f'<table class="items"><thead><tr>{_cells("th", ITEMS_HEADER, numeric_from=1)}</tr></thead>'
+        f'<tbody>{items}</tbody></table>'
+        f'<table class="summary">{summary}</table>'
+        f'<footer>{escape(THANK_YOU)}</footer></main></body></html>'
+    )
+    return page.encode('utf-8')
+
+
+def compact_receipt(sale, receipt_format, paper=None):
+    """
+    (template name, render) for a compact receipt format. The template name
+    includes the paper width, so each width has its own ETag.
+    Raises ValueError for an unknown paper size.
+    """
+    if receipt_format == 'html':
+        return f'sale_receipt_{receipt_format}', lambda: render_html(sale)
+    width = paper_columns(paper)
+    render = render_escpos if receipt_format == 'escpos' else render_text
+    return f'sale_receipt_{receipt_format}_{width}', lambda: render(sale, paper)
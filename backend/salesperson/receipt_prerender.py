@@ -0,0 +1,86 @@
+"""
+Pre-rendering of receipts after sales are committed
+
+Rendering a receipt is the slowest part of the first receipt view. When
+a sale is created or its payment status changes, Sale.save() schedules
+the receipt to be rendered into the receipt cache (see receipt_cache.py)
+once the transaction commits. The receipt endpoints then serve it
+straight from disk and only render inline on a cache miss.
+
+A small in-process thread pool (settings.RECEIPT_PRERENDER_THREADS) hands
+the work to the render pool (see render_pool.py), so the request that
+saved the sale does not wait for it. With 0 threads the commit callback
+does this itself. When the render pool is busy the receipt is skipped and
+renders on its first view instead. Set RECEIPT_PRERENDER to False to turn
+pre-rendering off.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from .models import Sale
+from .receipt_cache import get_or_render
+from .receipts import TEMPLATE_NAME, TEMPLATE_VERSION, load_sale
+from . import render_pool
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+# Sales queued or being rendered, so repeated saves in one request render once
+_pending = set()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECEIPT_PRERENDER_THREADS,
+                thread_name_prefix='receipt-prerender'
+            )
+        return _executor
+
+
+def prerender_receipt(sale_id):
+    """Render a sale's receipt into the cache unless it is there. Returns True if it rendered."""
+    try:
+        sale = load_sale(sale_id)
+    except Sale.DoesNotExist:
+        # Deleted before we got to it
+        return False
+    _, _, hit = get_or_render(sale, TEMPLATE_NAME, TEMPLATE_VERSION, lambda: render_pool.render(sale))
+    return not hit
+
+
+def _run(sale_id, in_thread):
+    try:
+        prerender_receipt(sale_id)
+    except render_pool.RenderPoolUnavailable as e:
+        logger.info(f"Skipped pre-rendering the receipt for sale {sale_id}: {e}")
+    except Exception:
+        logger.exception(f"Pre-rendering the receipt for sale {sale_id} failed")
+    finally:
+        with _lock:
+            _pending.discard(sale_id)
+        if in_thread:
+            # Pool threads get their own connection; do not leave it open
+            connection.close()
+
+
+def _submit(sale_id):
+    with _lock:
+        if sale_id in _pending:
+            return
+        _pending.add(sale_id)
+    if settings.RECEIPT_PRERENDER_THREADS > 0:
+        _get_executor().submit(_run, sale_id, True)
+    else:
+        _run(sale_id, False)
+
+
+def schedule_prerender(sale_id):
+    """Render the sale's receipt once the current transaction commits."""
+    if settings.RECEIPT_PRERENDER:
+        transaction.on_commit(lambda: _submit(sale_id))
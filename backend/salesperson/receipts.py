@@ -0,0 +1,487 @@
+"""
+Sale receipt engine
+Loads a sale for its receipt and renders the receipt PDF.
+
+Every receipt endpoint renders through this module. Paragraph and table
+styles are built once at import time and shared by all renders, and
+load_sale() fetches the sale, its salesperson and its items in a single
+query, so a receipt costs one query and one layout pass.
+
+Most of a receipt (company header, labels, table header, footer) is the
+same for every sale. render_receipt() draws that static page once per
+process, keeps its drawing operators, and places them in each document
+as a form XObject. Per sale it only draws the variable text and item
+rows on a canvas, with no flowable layout at all. Sales with more items
+than fit on the page (OVERLAY_MAX_ROWS) fall back to the flowable layout
+of render_flowable_receipt(), which flows onto further pages.
+"""
+
+import io
+import os
+from datetime import datetime
+from reportlab import rl_config
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+from .models import Sale, SaleItem
+
+# Page streams are stored as binary Flate data. ASCII85 on top of that only
+# helps 7-bit transports, makes streams a quarter larger, and its encoder
+# is pure Python, a fifth of the time of a small receipt.
+rl_config.useA85 = 0
+
+# Part of the receipt cache key; bump it whenever the layout below changes
+TEMPLATE_NAME = 'sale_receipt'
+TEMPLATE_VERSION = 2
+
+
+def _build_styles():
+    """Paragraph styles used by the receipt"""
+    base = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'ReceiptTitle',
+            parent=base['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.darkblue
+        ),
+        'header': ParagraphStyle(
+            'ReceiptHeader',
+            parent=base['Heading2'],
+            fontSize=16,
+            spaceAfter=12,
+            textColor=colors.darkblue
+        ),
+        'footer': ParagraphStyle(
+            'ReceiptFooter',
+            parent=base['Normal'],
+            fontSize=9,
+            alignment=TA_CENTER,
+            textColor=colors.grey
+        ),
+    }
+
+
+# Built once per process and shared by every render (styles are never mutated)
+STYLES = _build_styles()
+
+TABLE_STYLES = {
+    'info': TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]),
+    'items': TableStyle([
+        # Header row styling
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+
+        # Data rows styling
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('ALIGN', (0, 1), (0, -1), 'LEFT'),  # Item names left-aligned
+        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),  # Numbers center-aligned
+
+        # Grid and borders
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+
+        # Alternating row colors
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+    ]),
+    'summary': TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.lightblue),  # Highlight last row
+    ]),
+}
+
+COLUMN_WIDTHS = {
+    'info': [1.5*inch, 3*inch],
+    'items': [3*inch, 0.8*inch, 1.2*inch, 1.2*inch],
+    'summary': [2*inch, 2*inch],
+}
+
+ITEMS_HEADER = ["Item", "Qty", "Unit Price", "Total"]
+
+
+def _attach_items(items):
+    """Sales by id from items selected with their sale, each with its `receipt_items`"""
+    sales = {}
+    for item in items:
+        sale = sales.get(item.sale_id)
+        if sale is None:
+            sale = sales[item.sale_id] = item.sale
+            sale.receipt_items = []
+        item.sale = sale
+        sale.receipt_items.append(item)
+    return sales
+
+
+def load_sale(sale_id, salesperson=None):
+    """
+    Fetch a sale with its salesperson and items in one query.
+    The items are stored on `sale.receipt_items`.
+
+    Args:
+        sale_id (int): ID of the sale
+        salesperson (User): Only find the sale if it belongs to this user
+
+    Raises:
+        Sale.DoesNotExist: if there is no such sale
+    """
+    filters = {'sale_id': sale_id}
+    if salesperson is not None:
+        filters['sale__salesperson'] = salesperson
+    items = SaleItem.objects.filter(**filters).select_related('sale__salesperson').order_by('id')
+
+    sale = _attach_items(items).get(sale_id)
+    if sale is None:
+        # A sale without items; fall back to fetching the sale alone
+        sale_filters = {'pk': sale_id}
+        if salesperson is not None:
+            sale_filters['salesperson'] = salesperson
+        sale = Sale.objects.select_related('salesperson').get(**sale_filters)
+        sale.receipt_items = []
+    return sale
+
+
+def load_sales(sale_ids):
+    """
+    Fetch many sales for their receipts, like load_sale(), in the order of
+    `sale_ids`. One query, plus one more if some sales have no items.
+    """
+    items = SaleItem.objects.filter(sale_id__in=sale_ids).select_related('sale__salesperson').order_by('id')
+    sales = _attach_items(items)
+
+    missing = [sale_id for sale_id in sale_ids if sale_id not in sales]
+    if missing:
+        for sale in Sale.objects.select_related('salesperson').filter(pk__in=missing):
+            sale.receipt_items = []
+            sales[sale.id] = sale
+    return [sales[sale_id] for sale_id in sale_ids if sale_id in sales]
+
+
+def _receipt_items(sale):
+    items = getattr(sale, 'receipt_items', None)
+    return items if items is not None else list(sale.items.all())
+
+
+COMPANY_NAME = "JONKECH STOCK MANAGEMENT"
+RECEIPT_TITLE = "Sales Receipt"
+THANK_YOU = "Thank you for your business!"
+
+
+def info_rows(sale):
+    """[label, value] rows identifying the receipt"""
+    salesperson = sale.salesperson
+    return [
+        ["Receipt #:", f"RCP-{sale.id:06d}"],
+        ["Sale ID:", str(sale.id)],
+        ["Date:", sale.created_at.strftime("%B %d, %Y at %I:%M %p")],
+        ["Salesperson:", salesperson.get_full_name() or salesperson.username],
+    ]
+
+
+def item_rows(sale):
+    """[item, qty, unit price, total] rows, one per line item"""
+    return [
+        [
+            item.product_name,
+            str(item.quantity),
+            f"${item.price_at_sale:.2f}",
+            f"${item.subtotal:.2f}"
+        ]
+        for item in _receipt_items(sale)
+    ]
+
+
+def summary_rows(sale):
+    """[label, value] rows of the payment summary; the last one is highlighted"""
+    rows = [
+        ["Subtotal:", f"${sale.total_amount:.2f}"],
+        ["Payment Method:", sale.payment_method],
+        ["Amount Paid:", f"${sale.amount_paid:.2f}"],
+    ]
+    if sale.balance > 0:
+        rows.append(["Balance Due:", f"${sale.balance:.2f}"])
+        rows.append(["Payment Status:", sale.payment_status])
+    else:
+        rows.append(["Payment Status:", "PAID IN FULL"])
+    return rows
+
+
+def build_story(sale):
+    """The flowables of a sale's receipt"""
+    story = [
+        # Company Header
+        Paragraph(COMPANY_NAME, STYLES['title']),
+        Paragraph(RECEIPT_TITLE, STYLES['header']),
+        Spacer(1, 20),
+    ]
+
+    # Receipt Information
+    receipt_table = Table(info_rows(sale), colWidths=COLUMN_WIDTHS['info'])
+    receipt_table.setStyle(TABLE_STYLES['info'])
+    story += [receipt_table, Spacer(1, 20)]
+
+    # Items
+    story += [Paragraph("Items Purchased", STYLES['header']), Spacer(1, 10)]
+    items_table = Table([ITEMS_HEADER] + item_rows(sale), colWidths=COLUMN_WIDTHS['items'])
+    items_table.setStyle(TABLE_STYLES['items'])
+    story += [items_table, Spacer(1, 20)]
+
+    # Payment Summary
+    summary_table = Table(summary_rows(sale), colWidths=COLUMN_WIDTHS['summary'])
+    summary_table.setStyle(TABLE_STYLES['summary'])
+    story += [summary_table, Spacer(1, 30)]
+
+    # Footer
+    story.append(Paragraph(THANK_YOU, STYLES['footer']))
+    story.append(Paragraph("Generated on " + datetime.now().strftime("%B %d, %Y at %I:%M %p"), STYLES['footer']))
+    return story
+
+
+def setup_worker_process():
+    """
+    Initializer for rendering worker processes: make Django's models
+    importable in workers that were not forked from a set-up process
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+        django.setup()
+
+
+def render_flowable_receipt(sale):
+    """
+    Render a sale's receipt by laying out the flowables of build_story()
+
+    Args:
+        sale (Sale): preferably loaded with load_sale()
+
+    Returns:
+        bytes: the PDF
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=0.75*inch,
+        leftMargin=0.75*inch,
+        topMargin=1*inch,
+        bottomMargin=1*inch
+    )
+    doc.build(build_story(sale))
+    return buffer.getvalue()
+
+
+# Overlay page geometry, in points from the bottom left corner
+PAGE_WIDTH, PAGE_HEIGHT = letter
+LEFT = 0.75*inch
+TITLE_Y = PAGE_HEIGHT - 1*inch - 24
+HEADER_Y = TITLE_Y - 36
+INFO_Y = HEADER_Y - 30
+INFO_ROW_HEIGHT = 18
+INFO_LABELS = ["Receipt #:", "Sale ID:", "Date:", "Salesperson:"]
+ITEMS_HEADING_Y = INFO_Y - INFO_ROW_HEIGHT * len(INFO_LABELS) - 18
+ITEMS_TOP = ITEMS_HEADING_Y - 16
+ITEMS_X = LEFT + (PAGE_WIDTH - 2*LEFT - sum(COLUMN_WIDTHS['items'])) / 2
+ROW_HEIGHT = 18
+SUMMARY_X = LEFT + (PAGE_WIDTH - 2*LEFT - sum(COLUMN_WIDTHS['summary'])) / 2
+SUMMARY_ROW_HEIGHT = 20
+SUMMARY_MAX_ROWS = 5
+SUMMARY_GAP = 20
+FOOTER_Y = 1*inch + 12
+CELL_PADDING = 6
+# Item rows that fit between the table header and the payment summary
+OVERLAY_MAX_ROWS = int(
+    (ITEMS_TOP - ROW_HEIGHT - SUMMARY_GAP - SUMMARY_ROW_HEIGHT * SUMMARY_MAX_ROWS - FOOTER_Y - 20) // ROW_HEIGHT
+)
+
+STATIC_FORM = 'ReceiptStatic'
+# Registered first, in this order, in every overlay document, so the
+# recorded form's font names (/F1, /F2) mean the same fonts everywhere
+OVERLAY_FONTS = ['Helvetica', 'Helvetica-Bold']
+
+# Drawing operators of the static page, recorded on first use
+_static_form_code = None
+
+
+def _new_canvas(buffer):
+    canvas = Canvas(buffer, pagesize=letter)
+    for font in OVERLAY_FONTS:
+        canvas._doc.getInternalFontName(font)
+    return canvas
+
+
+def _column_edges(x, widths):
+    edges = [x]
+    for width in widths:
+        edges.append(edges[-1] + width)
+    return edges
+
+
+def _draw_cells(canvas, rows, edges, top, height, font, size, aligns):
+    """
+    Write the text of table `rows` in one text object, each cell aligned
+    'LEFT' or 'CENTER' in its column
+    """
+    text = canvas.beginText()
+    text.setFont(font, size)
+    baseline = top - height + (height - size * 0.7) / 2
+    for cells in rows:
+        for cell, align, left, right in zip(cells, aligns, edges, edges[1:]):
+            if align == 'LEFT':
+                text.setTextOrigin(left + CELL_PADDING, baseline)
+            else:
+                text.setTextOrigin((left + right - stringWidth(cell, font, size)) / 2, baseline)
+            text.textOut(cell)
+        baseline -= height
+    canvas.drawText(text)
+
+
+def _draw_static(canvas):
+    """Draw the parts of the receipt that are the same for every sale"""
+    canvas.setFillColor(colors.darkblue)
+    canvas.setFont('Helvetica-Bold', 24)
+    canvas.drawCentredString(PAGE_WIDTH / 2, TITLE_Y, COMPANY_NAME)
+    canvas.setFont('Helvetica-Bold', 16)
+    canvas.drawString(LEFT, HEADER_Y, RECEIPT_TITLE)
+    canvas.drawString(LEFT, ITEMS_HEADING_Y, "Items Purchased")
+
+    canvas.setFillColor(colors.black)
+    _draw_cells(
+        canvas, [[label] for label in INFO_LABELS], [LEFT, LEFT + COLUMN_WIDTHS['info'][0]],
+        INFO_Y + INFO_ROW_HEIGHT / 2, INFO_ROW_HEIGHT, 'Helvetica-Bold', 10, ['LEFT']
+    )
+
+    edges = _column_edges(ITEMS_X, COLUMN_WIDTHS['items'])
+    canvas.setFillColor(colors.darkblue)
+    canvas.rect(edges[0], ITEMS_TOP - ROW_HEIGHT, edges[-1] - edges[0], ROW_HEIGHT, stroke=0, fill=1)
+    canvas.grid(edges, [ITEMS_TOP, ITEMS_TOP - ROW_HEIGHT])
+    canvas.setFillColor(colors.whitesmoke)
+    _draw_cells(canvas, [ITEMS_HEADER], edges, ITEMS_TOP, ROW_HEIGHT, 'Helvetica-Bold', 11, ['CENTER'] * 4)
+
+    canvas.setFillColor(colors.grey)
+    canvas.setFont('Helvetica', 9)
+    canvas.drawCentredString(PAGE_WIDTH / 2, FOOTER_Y, THANK_YOU)
+
+
+def _static_form():
+    """The static page's drawing operators, recorded once per process"""
+    global _static_form_code
+    if _static_form_code is None:
+        canvas = _new_canvas(io.BytesIO())
+        canvas.beginForm(STATIC_FORM)
+        _draw_static(canvas)
+        _static_form_code = list(canvas._code)
+    return _static_form_code
+
+
+def fit_text(text, font, size, width):
+    """`text`, shortened with an ellipsis to fit in `width`"""
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + '\u2026', font, size) > width:
+        text = text[:-1]
+    return text + '\u2026'
+
+
+def _draw_sale(canvas, sale, items):
+    """Draw the parts of the receipt that depend on the sale, given its item rows"""
+    info = [[value] for _, value in info_rows(sale)]
+    canvas.setFillColor(colors.black)
+    _draw_cells(
+        canvas, info, [LEFT + COLUMN_WIDTHS['info'][0], PAGE_WIDTH - LEFT],
+        INFO_Y + INFO_ROW_HEIGHT / 2, INFO_ROW_HEIGHT, 'Helvetica', 10, ['LEFT']
+    )
+
+    # Item rows: shading, then one grid, then the text
+    widths = COLUMN_WIDTHS['items']
+    edges = _column_edges(ITEMS_X, widths)
+    top = ITEMS_TOP - ROW_HEIGHT
+    bottom = top - ROW_HEIGHT * len(items)
+    if items:
+        canvas.setFillColor(colors.lightgrey)
+        for row in range(1, len(items), 2):
+            canvas.rect(edges[0], top - ROW_HEIGHT * (row + 1), edges[-1] - edges[0], ROW_HEIGHT, stroke=0, fill=1)
+        canvas.grid(edges, [top - ROW_HEIGHT * row for row in range(len(items) + 1)])
+        canvas.setFillColor(colors.black)
+        rows = [[fit_text(name, 'Helvetica', 10, widths[0] - 2 * CELL_PADDING)] + rest for name, *rest in items]
+        _draw_cells(canvas, rows, edges, top, ROW_HEIGHT, 'Helvetica', 10, ['LEFT', 'CENTER', 'CENTER', 'CENTER'])
+
+    # Payment summary, with the last row highlighted
+    rows = summary_rows(sale)
+    edges = _column_edges(SUMMARY_X, COLUMN_WIDTHS['summary'])
+    top = bottom - SUMMARY_GAP
+    bottom = top - SUMMARY_ROW_HEIGHT * len(rows)
+    canvas.setFillColor(colors.lightblue)
+    canvas.rect(edges[0], bottom, edges[-1] - edges[0], SUMMARY_ROW_HEIGHT, stroke=0, fill=1)
+    canvas.setStrokeColor(colors.grey)
+    canvas.grid(edges, [top - SUMMARY_ROW_HEIGHT * row for row in range(len(rows) + 1)])
+    canvas.setFillColor(colors.black)
+    _draw_cells(canvas, [[label] for label, _ in rows], edges, top, SUMMARY_ROW_HEIGHT, 'Helvetica-Bold', 11, ['LEFT'])
+    _draw_cells(
+        canvas, [[value] for _, value in rows], edges[1:], top, SUMMARY_ROW_HEIGHT, 'Helvetica', 11, ['LEFT']
+    )
+
+    canvas.setFillColor(colors.grey)
+    canvas.setFont('Helvetica', 9)
+    canvas.drawCentredString(
+        PAGE_WIDTH / 2, FOOTER_Y - 12, "Generated on " + datetime.now().strftime("%B %d, %Y at %I:%M %p")
+    )
+
+
+def render_overlay_receipt(sale):
+    """
+    Render a sale's receipt on a canvas over the cached static page.
+    The sale must have at most OVERLAY_MAX_ROWS items.
+
+    Returns:
+        bytes: the PDF
+    """
+    buffer = io.BytesIO()
+    canvas = _new_canvas(buffer)
+    # The form's operators are replayed rather than drawn again
+    canvas.beginForm(STATIC_FORM)
+    canvas._code.extend(_static_form())
+    canvas.endForm()
+    canvas.doForm(STATIC_FORM)
+    _draw_sale(canvas, sale, item_rows(sale))
+    canvas.showPage()
+    canvas.save()
+    return buffer.getvalue()
+
+
+def render_receipt(sale):
+    """
+    Render a sale's receipt, over the cached static page when its items
+    fit on one page and with the flowable layout otherwise
+
+    Args:
+        sale (Sale): preferably loaded with load_sale()
+
+    Returns:
+        bytes: the PDF
+    """
+    if len(_receipt_items(sale)) <= OVERLAY_MAX_ROWS:
+        return render_overlay_receipt(sale)
+    return render_flowable_receipt(sale)
@@ -0,0 +1,128 @@
+"""
+Bounded process pool for receipt rendering
+
+ReportLab layout is CPU-bound. Rendered inside a web worker it holds the
+GIL and the worker for the whole render, so a burst of receipt requests
+would starve sale entry. Receipts are instead rendered in a small pool of
+worker processes (settings.RECEIPT_RENDER_WORKERS) owned by each web
+process. Only settings.RECEIPT_RENDER_MAX_QUEUE renders may wait for a free
+worker. Beyond that, render() fails fast with RenderPoolSaturated, and the
+receipt endpoints answer 503 with a Retry-After header. A render that takes
+longer than settings.RECEIPT_RENDER_TIMEOUT_SECONDS fails with
+RenderTimeout. Its slot is only freed once the worker actually finishes,
+so the bound always holds.
+
+With RECEIPT_RENDER_WORKERS = 0 receipts are rendered in the calling
+process, as before. metrics() reports the pool's depth and counters for
+this process.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from .receipts import render_receipt, setup_worker_process
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+_in_flight = 0
+_counters = {'rendered': 0, 'rejected': 0, 'timed_out': 0, 'failed': 0}
+
+
+class RenderPoolUnavailable(Exception):
+    """The receipt could not be rendered right now; the client should retry later."""
+
+
+class RenderPoolSaturated(RenderPoolUnavailable):
+    """Every worker is busy and the queue is full."""
+
+
+class RenderTimeout(RenderPoolUnavailable):
+    """The render took longer than RECEIPT_RENDER_TIMEOUT_SECONDS."""
+
+
+def capacity():
+    """Renders that may be running or queued at once in this process"""
+    return settings.RECEIPT_RENDER_WORKERS + settings.RECEIPT_RENDER_MAX_QUEUE
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    # A pool inherited through fork (e.g. gunicorn --preload) belongs to the parent
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.RECEIPT_RENDER_WORKERS, initializer=setup_worker_process
+        )
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _release(future=None):
+    global _in_flight
+    with _lock:
+        _in_flight -= 1
+        if future is not None and not future.cancelled() and future.exception() is None:
+            _counters['rendered'] += 1
+
+
+def render(sale):
+    """
+    Render a sale's receipt in the pool and return the PDF bytes.
+    Raises a RenderPoolUnavailable subclass when the pool cannot take it.
+    """
+    global _executor, _in_flight
+    if settings.RECEIPT_RENDER_WORKERS <= 0:
+        return render_receipt(sale)
+
+    with _lock:
+        if _in_flight >= capacity():
+            _counters['rejected'] += 1
+            raise RenderPoolSaturated('Receipt rendering is busy')
+        _in_flight += 1
+        try:
+            executor = _get_executor()
+            future = executor.submit(render_receipt, sale)
+        except Exception:
+            _in_flight -= 1
+            raise
+    future.add_done_callback(_release)
+
+    try:
+        return future.result(timeout=settings.RECEIPT_RENDER_TIMEOUT_SECONDS)
+    except TimeoutError:
+        # Not started yet: drop it. Already running: its slot frees when it ends.
+        future.cancel()
+        with _lock:
+            _counters['timed_out'] += 1
+        logger.warning(f"Rendering the receipt for sale {sale.id} timed out")
+        raise RenderTimeout('Receipt rendering timed out')
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        with _lock:
+            _counters['failed'] += 1
+            # Another request may already have replaced it
+            if _executor is executor:
+                _executor = None
+        # Stop its management thread and release its queues now rather than at garbage collection
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.error(f"Receipt render pool broke while rendering sale {sale.id}")
+        raise RenderPoolUnavailable('Receipt rendering is restarting')
+
+
+def metrics():
+    """Depth and counters of this process's render pool"""
+    with _lock:
+        workers = settings.RECEIPT_RENDER_WORKERS
+        return {
+            'pid': os.getpid(),
+            'workers': workers,
+            'capacity': capacity() if workers > 0 else 0,
+            'in_flight': _in_flight,
+            'running': min(_in_flight, workers),
+            'queued': max(0, _in_flight - workers),
+            **_counters,
+        }
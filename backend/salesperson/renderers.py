@@ -0,0 +1,101 @@
+"""
+Custom renderers for the Stock Management System API
+
+These renderers exist mainly so DRF content negotiation accepts the
+non-JSON formats (``?format=csv`` or an ``Accept`` header). Views that
+produce files build the body themselves and check
+``request.accepted_renderer.format``; anything else (errors raised by
+DRF, for example) is rendered as JSON.
+"""
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class PassthroughRenderer(BaseRenderer):
+    """Return bytes/str bodies unchanged and fall back to JSON for other data."""
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, (bytes, str)):
+            return data
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            # e.g. an error: say it is JSON rather than the negotiated format
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+class CSVRenderer(PassthroughRenderer):
+    """Comma separated values"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+
+class XLSXRenderer(PassthroughRenderer):
+    """Office Open XML spreadsheet"""
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+
+
+class PDFRenderer(PassthroughRenderer):
+    """Portable Document Format"""
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class TextRenderer(PassthroughRenderer):
+    """Plain text"""
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+
+class ESCPOSRenderer(PassthroughRenderer):
+    """ESC/POS thermal printer job"""
+    media_type = 'application/vnd.escpos'
+    format = 'escpos'
+
+
+class ReceiptHTMLRenderer(PassthroughRenderer):
+    """Self-contained HTML page"""
+    media_type = 'text/html'
+    format = 'html'
+    charset = 'utf-8'
+
+
+RECEIPT_RENDERERS = [PDFRenderer, TextRenderer, ESCPOSRenderer, ReceiptHTMLRenderer]
+
+
+class ReceiptContentNegotiation(DefaultContentNegotiation):
+    """
+    Pick a receipt format from ?format=, or from the first type in the
+    Accept header, and default to the PDF (the first renderer).
+
+    Unlike the default negotiation, Accept types after the first are
+    ignored and HTML needs ?format=html. Browsers opening a receipt link
+    list text/html first and HTTP clients such as axios list text/plain
+    before */*, and both still expect the PDF.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        if format_suffix or request.query_params.get(self.settings.URL_FORMAT_OVERRIDE):
+            return super().select_renderer(request, renderers, format_suffix)
+        accepts = self.get_accept_list(request)
+        preferred = accepts[0].split(';')[0].strip().lower() if accepts else ''
+        for renderer in renderers:
+            if renderer.media_type == preferred and renderer.format != ReceiptHTMLRenderer.format:
+                return renderer, renderer.media_type
+        return renderers[0], renderers[0].media_type
+
+
+def receipt_negotiation(view):
+    """
+    Serve an @api_view receipt view in every receipt format, negotiated
+    with ReceiptContentNegotiation. Goes above @api_view.
+    """
+    view.cls.renderer_classes = RECEIPT_RENDERERS
+    view.cls.content_negotiation_class = ReceiptContentNegotiation
+    return view
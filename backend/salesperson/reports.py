@@ -0,0 +1,755 @@
+"""
+Report builders for the Stock Management System
+
+Each builder takes the requesting user and a mapping of query parameters
+and returns the report as a plain dictionary. The API views return these
+directly, and background jobs call the same builders outside a request.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db.models import (
+    Case, CharField, Count, DecimalField, ExpressionWrapper, F, FilteredRelation, FloatField,
+    Max, Min, Q, Sum, Value, When, Window
+)
+from django.db.models.functions import Coalesce, NullIf, Rank, RowNumber, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+from .models import User, Product, Sale, Payment, SaleItem, InventorySnapshot
+from .filters import parse_date
+from .query_budget import embedded_list_limit
+from . import rollups
+
+
+def build_dashboard_stats(user):
+    """Today's and this month's figures for the dashboard; salespersons see their own"""
+    today = timezone.now().date()
+    this_month_start = today.replace(day=1)
+
+    if user.role == 'Admin':
+        # Admin can see all stats
+        sales_queryset = Sale.objects.all()
+        products_queryset = Product.objects.filter(is_active=True)
+        users_queryset = User.objects.filter(role='Salesperson', is_active=True)
+
+        stats = {
+            'total_sales_today': sales_queryset.filter(created_at__date=today).count(),
+            'total_revenue_today': sales_queryset.filter(
+                created_at__date=today
+            ).aggregate(total=Sum('total_amount'))['total'] or 0,
+            'total_sales_this_month': sales_queryset.filter(
+                created_at__date__gte=this_month_start
+            ).count(),
+            'total_revenue_this_month': sales_queryset.filter(
+                created_at__date__gte=this_month_start
+            ).aggregate(total=Sum('total_amount'))['total'] or 0,
+            'total_products': products_queryset.count(),
+            'low_stock_products': products_queryset.filter(
+                stock_quantity__gt=0, stock_quantity__lte=Product.LOW_STOCK_THRESHOLD
+            ).count(),
+            'out_of_stock_products': products_queryset.filter(stock_quantity=0).count(),
+            'total_salespersons': users_queryset.count(),
+            'pending_payments': Sale.objects.filter(
+                payment_status__in=['partial', 'unpaid']
+            ).aggregate(total=Sum('balance'))['total'] or 0
+        }
+    else:
+        # Salesperson can only see their own stats
+        sales_queryset = Sale.objects.filter(salesperson=user)
+
+        stats = {
+            'my_sales_today': sales_queryset.filter(created_at__date=today).count(),
+            'my_revenue_today': sales_queryset.filter(
+                created_at__date=today
+            ).aggregate(total=Sum('total_amount'))['total'] or 0,
+            'my_sales_this_month': sales_queryset.filter(
+                created_at__date__gte=this_month_start
+            ).count(),
+            'my_revenue_this_month': sales_queryset.filter(
+                created_at__date__gte=this_month_start
+            ).aggregate(total=Sum('total_amount'))['total'] or 0,
+            'my_pending_sales': sales_queryset.filter(
+                payment_status__in=['partial', 'unpaid']
+            ).count(),
+            'my_pending_amount': sales_queryset.filter(
+                payment_status__in=['partial', 'unpaid']
+            ).aggregate(total=Sum('balance'))['total'] or 0
+        }
+
+    return stats
+
+
+# Period comparison modes: the same length just before the period, or the same dates a year earlier
+COMPARE_MODES = ('previous', 'yoy')
+
+# Comparison metric -> (aggregate, Sale field)
+COMPARISON_METRICS = {
+    'sales_count': (Count, 'id'),
+    'revenue': (Sum, 'total_amount'),
+    'collected': (Sum, 'amount_paid'),
+    'outstanding': (Sum, 'balance'),
+}
+
+
+def _year_earlier(day):
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        # 29 February
+        return day.replace(year=day.year - 1, day=28)
+
+
+def comparison_period(date_from, date_to, compare):
+    """The period to compare date_from..date_to against"""
+    if compare == 'yoy':
+        return _year_earlier(date_from), _year_earlier(date_to)
+    period_days = (date_to - date_from).days + 1
+    return date_from - timedelta(days=period_days), date_from - timedelta(days=1)
+
+
+def compare_periods(sales_queryset, date_from, date_to, compare):
+    """
+    Sales count, revenue, collections and outstanding balance for a period
+    and its comparison period, in one conditional-aggregate query, with
+    absolute and percent changes.
+    """
+    previous_from, previous_to = comparison_period(date_from, date_to, compare)
+    current = Q(created_at__date__gte=date_from, created_at__date__lte=date_to)
+    previous = Q(created_at__date__gte=previous_from, created_at__date__lte=previous_to)
+
+    aggregates = {}
+    for metric, (aggregate, field) in COMPARISON_METRICS.items():
+        aggregates[metric] = aggregate(field, filter=current)
+        aggregates[f'previous_{metric}'] = aggregate(field, filter=previous)
+    totals = sales_queryset.filter(current | previous).aggregate(**aggregates)
+
+    metrics = {}
+    for metric in COMPARISON_METRICS:
+        value = totals[metric] or 0
+        previous_value = totals[f'previous_{metric}'] or 0
+        change = value - previous_value
+        metrics[metric] = {
+            'current': value,
+            'previous': previous_value,
+            'change': change,
+            'change_percent': round(float(change * 100 / previous_value), 2) if previous_value else None
+        }
+
+    return {
+        'compare': compare,
+        'previous_period': {
+            'from': previous_from.strftime('%Y-%m-%d'),
+            'to': previous_to.strftime('%Y-%m-%d')
+        },
+        'metrics': metrics
+    }
+
+
+def _compare_param(params):
+    """?compare= value, or None; raises ValueError for unknown modes"""
+    compare = params.get('compare') or None
+    if compare is not None and compare not in COMPARE_MODES:
+        raise ValueError(f"Invalid compare option. Use one of: {', '.join(COMPARE_MODES)}")
+    return compare
+
+
+def build_sales_report(user, params):
+    """Sales summary, payment breakdowns and top products, optionally compared with an earlier period"""
+    # Get query parameters
+    date_from = params.get('date_from', None)
+    date_to = params.get('date_to', None)
+    salesperson_id = params.get('salesperson', None)
+    payment_status = params.get('payment_status', None)
+    compare = _compare_param(params)
+
+    # Comparisons need a closed period; default to the last 30 days like the other reports
+    if compare:
+        today = timezone.now().date()
+        date_from = (parse_date(date_from) or today - timedelta(days=30)).strftime('%Y-%m-%d')
+        date_to = (parse_date(date_to) or today).strftime('%Y-%m-%d')
+    period_from, period_to = parse_date(date_from), parse_date(date_to)
+
+    # Base queryset
+    queryset = Sale.objects.all()
+
+    # Role-based filtering
+    if user.role == 'Salesperson':
+        queryset = queryset.filter(salesperson=user)
+    elif salesperson_id and user.role == 'Admin':
+        queryset = queryset.filter(salesperson_id=salesperson_id)
+
+    # Payment status filtering
+    if payment_status:
+        queryset = queryset.filter(payment_status=payment_status)
+
+    comparison = None
+    if compare:
+        comparison = compare_periods(queryset, period_from, period_to, compare)
+
+    # Date filtering (invalid dates are ignored)
+    if period_from:
+        date_from = period_from
+        queryset = queryset.filter(created_at__date__gte=date_from)
+
+    if period_to:
+        date_to = period_to
+        queryset = queryset.filter(created_at__date__lte=date_to)
+
+    # Calculate summary statistics (the comparison query already has them)
+    if comparison:
+        metrics = comparison['metrics']
+        summary = {
+            'total_sales': metrics['sales_count']['current'],
+            'total_revenue': metrics['revenue']['current'],
+            'total_paid': metrics['collected']['current'],
+            'total_balance': metrics['outstanding']['current']
+        }
+    else:
+        summary = queryset.aggregate(
+            total_sales=Count('id'),
+            total_revenue=Sum('total_amount'),
+            total_paid=Sum('amount_paid'),
+            total_balance=Sum('balance')
+        )
+
+    # Payment method breakdown
+    payment_methods = queryset.values('payment_method').annotate(
+        count=Count('id'),
+        total=Sum('total_amount')
+    ).order_by('payment_method')
+
+    # Payment status breakdown
+    payment_status_breakdown = queryset.values('payment_status').annotate(
+        count=Count('id'),
+        total=Sum('total_amount')
+    ).order_by('payment_status')
+
+    # Top products (if Admin or specific date range)
+    top_products = []
+    if user.role == 'Admin' or (date_from and date_to):
+        if payment_status:
+            # The daily counters are not split by payment status
+            sale_items = SaleItem.objects.filter(sale__in=queryset).values(
+                'product__name', 'product__sku'
+            ).annotate(
+                total_quantity=Sum('quantity'),
+                total_revenue=Sum('subtotal')
+            ).order_by('-total_quantity')[:10]
+            top_products = list(sale_items)
+        else:
+            if user.role == 'Salesperson':
+                salesperson = user
+            else:
+                salesperson = salesperson_id or None
+            top_products = rollups.top_products(
+                date_from=period_from,
+                date_to=period_to,
+                salesperson=salesperson
+            )
+
+    report = {
+        'summary': summary,
+        'payment_methods': list(payment_methods),
+        'payment_status': list(payment_status_breakdown),
+        'top_products': top_products,
+        'period': {
+            'from': date_from,
+            'to': date_to
+        }
+    }
+    if comparison:
+        report['comparison'] = comparison
+    return report
+
+
+def _page_params(params, default_size=20, max_size=100):
+    """Read 1-based page and page_size query parameters, clamped to sane bounds"""
+    try:
+        page = max(1, int(params.get('page', 1)))
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        page_size = min(max_size, max(1, int(params.get('page_size', default_size))))
+    except (TypeError, ValueError):
+        page_size = default_size
+    return page, page_size
+
+
+def build_inventory_report(params):
+    """Inventory summary, category breakdown and stock alerts (Admin only)"""
+    # Get query parameters
+    category = params.get('category', None)
+    stock_status = params.get('stock_status', None)
+    active_only = params.get('active_only', 'true').lower() == 'true'
+    page, page_size = _page_params(params)
+
+    # Base queryset
+    queryset = Product.objects.all()
+
+    # Apply filters
+    if active_only:
+        queryset = queryset.filter(is_active=True)
+
+    if category:
+        queryset = queryset.filter(category__icontains=category)
+
+    if stock_status == 'out_of_stock':
+        queryset = queryset.filter(stock_quantity=0)
+    elif stock_status == 'low_stock':
+        queryset = queryset.filter(stock_quantity__gt=0, stock_quantity__lte=Product.LOW_STOCK_THRESHOLD)
+    elif stock_status == 'in_stock':
+        queryset = queryset.filter(stock_quantity__gt=Product.LOW_STOCK_THRESHOLD)
+
+    stock_value = Sum(
+        F('stock_quantity') * F('price'),
+        output_field=DecimalField(max_digits=20, decimal_places=2)
+    )
+
+    # Calculate summary statistics
+    summary = queryset.aggregate(
+        total_products=Count('id'),
+        total_stock_value=Coalesce(stock_value, Value(Decimal('0.00'))),
+        out_of_stock=Count('id', filter=Q(stock_quantity=0)),
+        low_stock=Count('id', filter=Q(stock_quantity__gt=0, stock_quantity__lte=Product.LOW_STOCK_THRESHOLD)),
+        in_stock=Count('id', filter=Q(stock_quantity__gt=Product.LOW_STOCK_THRESHOLD))
+    )
+
+    # Category breakdown, valued in the same grouped query
+    categories = queryset.values('category').annotate(
+        count=Count('id'),
+        total_stock=Sum('stock_quantity'),
+        total_value=stock_value
+    ).order_by('category')
+
+    # Low and out of stock items come from one scan: each row is tagged with
+    # its bucket and numbered within it, so one page of both lists is read
+    # together instead of dumping every matching product
+    offset = (page - 1) * page_size
+    alerts = queryset.filter(stock_quantity__gte=0, stock_quantity__lte=Product.LOW_STOCK_THRESHOLD).annotate(
+        bucket=Case(
+            When(stock_quantity=0, then=Value('out_of_stock')),
+            default=Value('low_stock'),
+            output_field=CharField()
+        )
+    ).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('bucket')],
+            order_by=[F('name').asc(), F('id').asc()]
+        )
+    ).filter(
+        position__gt=offset,
+        position__lte=offset + page_size
+    ).order_by('bucket', 'position').values('id', 'name', 'sku', 'stock_quantity', 'price', 'bucket')
+
+    low_stock_items = []
+    out_of_stock_items = []
+    for item in alerts:
+        if item.pop('bucket') == 'out_of_stock':
+            item.pop('stock_quantity')
+            out_of_stock_items.append(item)
+        else:
+            low_stock_items.append(item)
+
+    alert_count = max(summary['low_stock'], summary['out_of_stock'])
+
+    return {
+        'summary': summary,
+        'categories': list(categories),
+        'low_stock_items': low_stock_items,
+        'out_of_stock_items': out_of_stock_items,
+        'items_pagination': {
+            'page': page,
+            'page_size': page_size,
+            'total_pages': max(1, -(-alert_count // page_size))
+        },
+        'filters_applied': {
+            'category': category,
+            'stock_status': stock_status,
+            'active_only': active_only
+        }
+    }
+
+
+def build_inventory_trends(params):
+    """Daily stock level and value from inventory snapshots (Admin only)"""
+    today = timezone.now().date()
+
+    # Default to last 30 days if no dates provided or they are invalid
+    date_from = parse_date(params.get('date_from', None)) or today - timedelta(days=30)
+    date_to = parse_date(params.get('date_to', None)) or today
+    product_id = params.get('product', None)
+    category = params.get('category', None)
+
+    # Range read on the (date) index
+    queryset = InventorySnapshot.objects.filter(date__gte=date_from, date__lte=date_to)
+
+    if product_id:
+        queryset = queryset.filter(product_id=product_id)
+
+    if category:
+        queryset = queryset.filter(product__category__icontains=category)
+
+    daily = queryset.values('date').annotate(
+        products=Count('id'),
+        total_stock=Sum('stock_quantity'),
+        total_value=Sum('stock_value'),
+        out_of_stock=Count('id', filter=Q(stock_quantity=0)),
+        low_stock=Count('id', filter=Q(stock_quantity__gt=0, stock_quantity__lte=Product.LOW_STOCK_THRESHOLD))
+    ).order_by('date')
+
+    return {
+        'series': [
+            {**row, 'date': row['date'].strftime('%Y-%m-%d')} for row in daily
+        ],
+        'filters_applied': {
+            'product': product_id,
+            'category': category
+        },
+        'period': {
+            'from': date_from.strftime('%Y-%m-%d'),
+            'to': date_to.strftime('%Y-%m-%d')
+        }
+    }
+
+
+# Leaderboard metric -> (annotation, rank best-first descending)
+LEADERBOARD_METRICS = {
+    'revenue': ('revenue', True),
+    'sales': ('sales_count', True),
+    'collection_rate': ('collection_rate', True),
+    'outstanding': ('outstanding', False),
+}
+
+
+def build_salesperson_leaderboard(params):
+    """Salespeople ranked for a period, with changes against the previous period (Admin only)"""
+    today = timezone.now().date()
+
+    # Default to last 30 days if no dates provided or they are invalid
+    date_from = parse_date(params.get('date_from', None)) or today - timedelta(days=30)
+    date_to = parse_date(params.get('date_to', None)) or today
+    rank_by = params.get('rank_by', 'revenue')
+    if rank_by not in LEADERBOARD_METRICS:
+        rank_by = 'revenue'
+
+    # The previous period has the same length and ends the day before date_from
+    previous_from, previous_to = comparison_period(date_from, date_to, 'previous')
+
+    # Join only the sales of both periods, then split them with conditional aggregates
+    current = Q(period_sales__created_at__date__gte=date_from)
+    previous = Q(period_sales__created_at__date__lte=previous_to)
+    zero = Value(Decimal('0.00'))
+    money = DecimalField(max_digits=15, decimal_places=2)
+
+    queryset = User.objects.filter(role=User.ROLE_SALESPERSON).annotate(
+        period_sales=FilteredRelation(
+            'sales_made',
+            condition=Q(
+                sales_made__created_at__date__gte=previous_from,
+                sales_made__created_at__date__lte=date_to
+            )
+        )
+    ).annotate(
+        sales_count=Count('period_sales', filter=current),
+        revenue=Coalesce(Sum('period_sales__total_amount', filter=current), zero, output_field=money),
+        collected=Coalesce(Sum('period_sales__amount_paid', filter=current), zero, output_field=money),
+        outstanding=Coalesce(Sum('period_sales__balance', filter=current), zero, output_field=money),
+        previous_sales_count=Count('period_sales', filter=previous),
+        previous_revenue=Coalesce(Sum('period_sales__total_amount', filter=previous), zero, output_field=money),
+        previous_collected=Coalesce(Sum('period_sales__amount_paid', filter=previous), zero, output_field=money),
+        previous_outstanding=Coalesce(Sum('period_sales__balance', filter=previous), zero, output_field=money),
+    ).annotate(
+        collection_rate=ExpressionWrapper(
+            F('collected') * 100.0 / NullIf(F('revenue'), 0), output_field=FloatField()
+        ),
+        previous_collection_rate=ExpressionWrapper(
+            F('previous_collected') * 100.0 / NullIf(F('previous_revenue'), 0), output_field=FloatField()
+        ),
+    )
+
+    # Rank every metric in the same query
+    ranks = {}
+    for metric, (field, descending) in LEADERBOARD_METRICS.items():
+        order = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+        ranks[f'{metric}_rank'] = Window(Rank(), order_by=order)
+    queryset = queryset.annotate(**ranks)
+
+    field, descending = LEADERBOARD_METRICS[rank_by]
+    order = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+    rows = queryset.order_by(order, 'first_name', 'last_name').values(
+        'id', 'email', 'first_name', 'last_name', 'sales_count', 'revenue', 'collected',
+        'outstanding', 'collection_rate', 'previous_sales_count', 'previous_revenue',
+        'previous_outstanding', 'previous_collection_rate', *ranks
+    )
+
+    leaderboard = []
+    for row in rows:
+        rate = row['collection_rate']
+        previous_rate = row['previous_collection_rate']
+        leaderboard.append({
+            'rank': row[f'{rank_by}_rank'],
+            'salesperson': {
+                'id': row['id'],
+                'name': f"{row['first_name']} {row['last_name']}".strip() or row['email'],
+                'email': row['email']
+            },
+            'sales_count': row['sales_count'],
+            'revenue': row['revenue'],
+            'collected': row['collected'],
+            'outstanding': row['outstanding'],
+            'collection_rate': round(rate, 2) if rate is not None else None,
+            'ranks': {metric: row[f'{metric}_rank'] for metric in LEADERBOARD_METRICS},
+            'change': {
+                'sales_count': row['sales_count'] - row['previous_sales_count'],
+                'revenue': row['revenue'] - row['previous_revenue'],
+                'revenue_percent': (
+                    round(float((row['revenue'] - row['previous_revenue']) * 100 / row['previous_revenue']), 2)
+                    if row['previous_revenue'] else None
+                ),
+                'outstanding': row['outstanding'] - row['previous_outstanding'],
+                'collection_rate': (
+                    round(rate - previous_rate, 2)
+                    if rate is not None and previous_rate is not None else None
+                )
+            }
+        })
+
+    return {
+        'rank_by': rank_by,
+        'leaderboard': leaderboard,
+        'period': {
+            'from': date_from.strftime('%Y-%m-%d'),
+            'to': date_to.strftime('%Y-%m-%d')
+        },
+        'previous_period': {
+            'from': previous_from.strftime('%Y-%m-%d'),
+            'to': previous_to.strftime('%Y-%m-%d')
+        }
+    }
+
+
+# Aging bucket -> (minimum age, maximum age) in days; None means open-ended
+RECEIVABLES_AGING_BUCKETS = {
+    'days_0_30': (0, 30),
+    'days_31_60': (31, 60),
+    'days_61_90': (61, 90),
+    'days_over_90': (91, None),
+}
+
+RECEIVABLES_GROUP_FIELDS = {
+    'customer': ['customer_name', 'customer_phone'],
+    'salesperson': ['salesperson_id'],
+}
+
+
+def _local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def build_receivables_aging(user, params):
+    """
+    Outstanding sale balances aged by sale date, grouped by customer or salesperson.
+
+    Returns the grouped queryset (ordered by largest balance first, ready to
+    paginate or stream) alongside totals for every bucket. All bucketing is
+    done with conditional aggregates in the database.
+    """
+    group_by = params.get('group_by', 'customer')
+    if group_by not in RECEIVABLES_GROUP_FIELDS:
+        group_by = 'customer'
+    salesperson_id = params.get('salesperson', None)
+    today = timezone.localdate()
+
+    # Open credit: any sale with a balance still to collect
+    queryset = Sale.objects.filter(balance__gt=0)
+
+    # Role-based filtering
+    if user.role == 'Salesperson':
+        queryset = queryset.filter(salesperson=user)
+    elif salesperson_id:
+        queryset = queryset.filter(salesperson_id=salesperson_id)
+
+    # Bucket boundaries as datetimes so the range checks can use the created_at index
+    money = DecimalField(max_digits=15, decimal_places=2)
+    zero = Value(Decimal('0.00'))
+    buckets = {}
+    for name, (min_age, max_age) in RECEIVABLES_AGING_BUCKETS.items():
+        condition = Q(created_at__lt=_local_midnight(today - timedelta(days=min_age - 1)))
+        if max_age is not None:
+            condition &= Q(created_at__gte=_local_midnight(today - timedelta(days=max_age)))
+        buckets[name] = Coalesce(Sum('balance', filter=condition), zero, output_field=money)
+
+    totals = queryset.aggregate(
+        open_sales=Count('id'),
+        total_outstanding=Coalesce(Sum('balance'), zero, output_field=money),
+        **buckets
+    )
+
+    group_fields = RECEIVABLES_GROUP_FIELDS[group_by]
+    rows = queryset.values(*group_fields).annotate(
+        open_sales=Count('id'),
+        total_outstanding=Sum('balance'),
+        oldest_sale=Min('created_at'),
+        **buckets
+    )
+    if group_by == 'salesperson':
+        rows = rows.annotate(salesperson_name=Max('salesperson_name'))
+    rows = rows.order_by('-total_outstanding', *group_fields)
+
+    return {
+        'group_by': group_by,
+        'as_of': today.strftime('%Y-%m-%d'),
+        'totals': totals,
+        'rows': rows
+    }
+
+
+# Comprehensive report chart granularity -> (truncation, first bucket, next bucket)
+CHART_GRANULARITIES = {
+    'day': (TruncDate, lambda day: day, lambda day: day + timedelta(days=1)),
+    'week': (TruncWeek, lambda day: day - timedelta(days=day.weekday()), lambda day: day + timedelta(days=7)),
+    'month': (
+        TruncMonth,
+        lambda day: day.replace(day=1),
+        lambda day: (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    ),
+}
+
+
+def _chart_series(sales_queryset, date_from, date_to, granularity):
+    """Sales amount and count per bucket from date_from to date_to, empty buckets included"""
+    trunc, first_bucket, next_bucket = CHART_GRANULARITIES[granularity]
+    totals = {}
+    for row in sales_queryset.annotate(bucket=trunc('created_at')).values('bucket').annotate(
+        total_amount=Sum('total_amount'),
+        count=Count('id')
+    ).order_by():
+        bucket = row['bucket']
+        totals[bucket.date() if isinstance(bucket, datetime) else bucket] = row
+
+    chart_data = []
+    bucket = first_bucket(date_from)
+    while bucket <= date_to:
+        row = totals.get(bucket, {})
+        chart_data.append({
+            'date': bucket.strftime('%Y-%m-%d'),
+            'sales_amount': float(row.get('total_amount') or 0),
+            'sales_count': row.get('count', 0)
+        })
+        bucket = next_bucket(bucket)
+    return chart_data
+
+
+def build_comprehensive_report(user, params):
+    """Comprehensive report with chart data, summaries and recent activity"""
+    today = timezone.now().date()
+    limit = embedded_list_limit(params)
+
+    # Default to last 30 days if no dates provided or they are invalid
+    date_from = parse_date(params.get('date_from', None)) or today - timedelta(days=30)
+    date_to = parse_date(params.get('date_to', None)) or today
+
+    # Base querysets
+    sales_queryset = Sale.objects.filter(created_at__date__gte=date_from, created_at__date__lte=date_to)
+    products_queryset = Product.objects.filter(is_active=True)
+    payments_queryset = Payment.objects.filter(created_at__date__gte=date_from, created_at__date__lte=date_to)
+
+    # Role-based filtering
+    if user.role == 'Salesperson':
+        sales_queryset = sales_queryset.filter(salesperson=user)
+        payments_queryset = payments_queryset.filter(sale__salesperson=user)
+
+    # Chart Data - sales per day, week or month in one grouped query
+    granularity = params.get('granularity', 'day')
+    if granularity not in CHART_GRANULARITIES:
+        granularity = 'day'
+    chart_data = _chart_series(sales_queryset, date_from, date_to, granularity)
+
+    # Sales Summary
+    sales_summary = sales_queryset.aggregate(
+        total_sales=Count('id'),
+        total_revenue=Sum('total_amount'),
+        total_paid=Sum('amount_paid'),
+        total_balance=Sum('balance')
+    )
+
+    # Payment Status Breakdown
+    payment_status_breakdown = sales_queryset.values('payment_status').annotate(
+        count=Count('id'),
+        total=Sum('total_amount')
+    ).order_by('payment_status')
+
+    # Top Products, from the per-product daily sales counters
+    top_products = rollups.top_products(
+        date_from=date_from,
+        date_to=date_to,
+        salesperson=user if user.role == 'Salesperson' else None,
+        fields=('product__name', 'product__sku', 'product__price')
+    )
+
+    # Inventory Status (Admin only)
+    inventory_status = {}
+    if user.role == 'Admin':
+        inventory_status = {
+            'total_products': products_queryset.count(),
+            'out_of_stock': products_queryset.filter(stock_quantity=0).count(),
+            'low_stock': products_queryset.filter(stock_quantity__gt=0, stock_quantity__lte=Product.LOW_STOCK_THRESHOLD).count(),
+            'in_stock': products_queryset.filter(stock_quantity__gt=Product.LOW_STOCK_THRESHOLD).count(),
+            'low_stock_items': list(products_queryset.filter(
+                stock_quantity__gt=0, stock_quantity__lte=Product.LOW_STOCK_THRESHOLD
+            ).values('id', 'name', 'sku', 'stock_quantity', 'price')[:limit]),
+            'out_of_stock_items': list(products_queryset.filter(
+                stock_quantity=0
+            ).values('id', 'name', 'sku', 'price')[:limit])
+        }
+
+    # Credit/Debt Summary
+    credit_summary = {
+        'total_unpaid_sales': sales_queryset.filter(payment_status='unpaid').count(),
+        'total_partial_sales': sales_queryset.filter(payment_status='partial').count(),
+        'total_outstanding_balance': sales_queryset.filter(
+            payment_status__in=['unpaid', 'partial']
+        ).aggregate(total=Sum('balance'))['total'] or 0,
+        'unpaid_sales': list(sales_queryset.filter(
+            payment_status='unpaid'
+        ).values(
+            'id', 'customer_name', 'customer_phone', 'total_amount', 'balance', 'created_at'
+        )[:limit]),
+        'partial_sales': list(sales_queryset.filter(
+            payment_status='partial'
+        ).values(
+            'id', 'customer_name', 'customer_phone', 'total_amount', 'amount_paid', 'balance', 'created_at'
+        )[:limit])
+    }
+
+    # Payment Summary
+    payment_summary = payments_queryset.aggregate(
+        total_payments=Count('id'),
+        total_amount=Sum('amount')
+    )
+
+    # Recent Activity
+    recent_sales = list(sales_queryset.order_by('-created_at')[:5].values(
+        'id', 'customer_name', 'total_amount', 'payment_status', 'created_at'
+    ))
+
+    recent_payments = list(payments_queryset.order_by('-created_at')[:5].values(
+        'id', 'sale__customer_name', 'amount', 'payment_method', 'created_at'
+    ))
+
+    return {
+        'chart_data': chart_data,
+        'sales_summary': sales_summary,
+        'payment_status_breakdown': list(payment_status_breakdown),
+        'top_products': top_products,
+        'inventory_status': inventory_status,
+        'credit_summary': credit_summary,
+        'payment_summary': payment_summary,
+        'recent_activity': {
+            'sales': recent_sales,
+            'payments': recent_payments
+        },
+        'period': {
+            'from': date_from.strftime('%Y-%m-%d'),
+            'to': date_to.strftime('%Y-%m-%d')
+        }
+    }
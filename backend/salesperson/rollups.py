@@ -0,0 +1,146 @@
+"""
+Pre-aggregated sales counters
+
+ProductSalesDaily holds units sold and revenue per product, salesperson and
+local day. The counters are adjusted with F() expressions in the same
+transaction that creates or deletes a sale, so concurrent sales never
+overwrite each other's totals. Ranking products for a period is then a
+grouped read over a few rows per product per day.
+"""
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .db_router import reading_from_replica
+from .models import ProductSalesDaily, SaleItem
+
+
+def _sale_date(sale):
+    """Local calendar date of a sale, matching created_at__date filters."""
+    return timezone.localtime(sale.created_at).date() if timezone.is_aware(sale.created_at) else sale.created_at.date()
+
+
+# Cache key counting committed changes to sales and the sales counters.
+# Anything derived from sales history caches under the current version, so a
+# new, edited (e.g. paid) or deleted sale invalidates it without tracking
+# individual keys.
+SALES_VERSION_KEY = 'sales:version'
+
+
+def _initial_sales_version():
+    # Start from the clock so a version created after the key was evicted
+    # cannot collide with one that cached results were stored under
+    return int(timezone.now().timestamp() * 1000)
+
+
+def sales_version():
+    """Current sales data version, for building cache keys."""
+    return cache.get_or_set(SALES_VERSION_KEY, _initial_sales_version, timeout=None)
+
+
+def sales_cache_key(prefix, digest):
+    """
+    Cache key for a result computed from sales. Results read from the replica
+    may predate the current version, so they get a key of their own; cache them
+    for sales_cache_timeout() only.
+    """
+    if reading_from_replica():
+        return f'{prefix}:replica:{digest}'
+    return f'{prefix}:{sales_version()}:{digest}'
+
+
+def sales_cache_timeout(timeout):
+    """`timeout`, capped at REPLICA_RESULT_SECONDS for results read from the replica."""
+    if reading_from_replica():
+        return min(timeout, settings.REPLICA_RESULT_SECONDS)
+    return timeout
+
+
+def bump_sales_version():
+    """Invalidate caches built from sales history."""
+    try:
+        cache.incr(SALES_VERSION_KEY)
+    except ValueError:
+        cache.set(SALES_VERSION_KEY, _initial_sales_version(), timeout=None)
+
+
+def record_sale_items(sale, items, sign=1):
+    """
+    Add a sale's items to the daily counters, or remove them with sign=-1.
+    Must be called inside the transaction that creates or deletes the sale.
+    """
+    day = _sale_date(sale)
+    for item in items:
+        counter, _ = ProductSalesDaily.objects.get_or_create(
+            product_id=item.product_id,
+            salesperson_id=sale.salesperson_id,
+            date=day
+        )
+        ProductSalesDaily.objects.filter(pk=counter.pk).update(
+            quantity=F('quantity') + sign * item.quantity,
+            revenue=F('revenue') + sign * item.subtotal
+        )
+    transaction.on_commit(bump_sales_version)
+
+
+def top_products(date_from=None, date_to=None, salesperson=None, limit=10, fields=('product__name', 'product__sku')):
+    """
+    Best selling products by units sold for an optional date range.
+
+    The database returns only the top `limit` groups (ORDER BY ... LIMIT,
+    which it evaluates as a bounded top-N sort), so the cost depends on
+    products x days in range rather than on the number of sale items.
+    """
+    queryset = ProductSalesDaily.objects.all()
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    if salesperson is not None:
+        queryset = queryset.filter(salesperson=salesperson)
+
+    rows = queryset.values(*fields).annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum('revenue')
+    ).filter(total_quantity__gt=0).order_by('-total_quantity', 'product__name')[:limit]
+    return list(rows)
+
+
+@transaction.atomic
+def rebuild_product_sales_daily():
+    """Recompute every counter from sale items. Returns the number of rows written."""
+    ProductSalesDaily.objects.all().delete()
+    grouped = SaleItem.objects.annotate(
+        day=TruncDate('sale__created_at')
+    ).values('product_id', 'sale__salesperson_id', 'day').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum('subtotal')
+    ).order_by()
+
+    counters = (
+        ProductSalesDaily(
+            product_id=row['product_id'],
+            salesperson_id=row['sale__salesperson_id'],
+            date=row['day'],
+            quantity=row['total_quantity'],
+            revenue=row['total_revenue'] or Decimal('0.00')
+        )
+        for row in grouped.iterator()
+    )
+
+    written = 0
+    batch = []
+    for counter in counters:
+        batch.append(counter)
+        if len(batch) >= 1000:
+            ProductSalesDaily.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        ProductSalesDaily.objects.bulk_create(batch)
+        written += len(batch)
+    transaction.on_commit(bump_sales_version)
+    return written
@@ -6,7 +6,8 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from .models import User, Product, Sale, Payment, SaleItem
+from .models import User, Product, Sale, Payment, SaleItem, Job
+from .rollups import record_sale_items
 
 logger = logging.getLogger(__name__)
 
@@ -104,7 +105,7 @@ class ProductSerializer(serializers.ModelSerializer):
         """Get stock status based on quantity"""
         if obj.stock_quantity <= 0:
             return 'out_of_stock'
-        elif obj.stock_quantity <= 10:  # Low stock threshold
+        elif obj.stock_quantity <= Product.LOW_STOCK_THRESHOLD:
             return 'low_stock'
         else:
             return 'in_stock'
@@ -198,6 +199,9 @@ class SaleSerializer(serializers.ModelSerializer):
         sale.total_amount = total_amount
         sale.save()
         
+        # Update the per-product daily sales counters
+        record_sale_items(sale, sale_items)
+        
         return sale
 
 
@@ -261,6 +265,43 @@ class PaymentSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background report/export jobs"""
+    created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'job_type', 'params', 'status', 'progress', 'error',
+            'created_by', 'created_by_name', 'created_at', 'started_at',
+            'finished_at', 'expires_at', 'download_url'
+        ]
+        read_only_fields = [
+            'status', 'progress', 'error', 'created_by', 'created_at',
+            'started_at', 'finished_at', 'expires_at'
+        ]
+    
+    def get_download_url(self, obj):
+        """Get the result download URL once the job has completed"""
+        if obj.status == Job.STATUS_COMPLETED and obj.result_file and not obj.is_expired:
+            return f'/api/jobs/{obj.id}/download/'
+        return None
+    
+    def validate_params(self, value):
+        """Validate params are a flat object of query parameters"""
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Params must be an object of query parameters.")
+        # Report builders and filters expect query-string values
+        return {str(key): str(item).lower() if isinstance(item, bool) else str(item) for key, item in value.items()}
+    
+    def create(self, validated_data):
+        """Create job with created_by set to current user"""
+        request = self.context.get('request')
+        validated_data['created_by'] = request.user
+        return super().create(validated_data)
+
+
 class SalesReportSerializer(serializers.Serializer):
     """Serializer for sales report data"""
     date_from = serializers.DateField(required=False)
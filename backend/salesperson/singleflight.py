@@ -0,0 +1,95 @@
+"""
+Single-flight coalescing of identical report requests
+
+When many users open their dashboards at once, the same report would be
+computed once per request. With coalesce(), the first request for a key
+takes a short cache lock and computes the result. Concurrent requests for
+the same key wait for that result instead of running the same queries.
+
+The lock and the result live in the default cache. Coalescing therefore
+spans every worker process only when that cache is shared (REDIS_URL);
+with the local-memory cache it works within one process.
+
+Waiting is bounded. A follower that has no result after
+SINGLEFLIGHT_WAIT_SECONDS, or sees the lock released without a result
+(the leader failed), computes the report itself. The lock expires after
+SINGLEFLIGHT_LOCK_SECONDS in case the leader's process died.
+"""
+import hashlib
+import json
+import logging
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from .rollups import sales_cache_key, sales_cache_timeout
+
+logger = logging.getLogger(__name__)
+
+# Seconds between cache polls while waiting, doubling up to the maximum
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+
+
+def request_key(endpoint, user, params):
+    """
+    Coalescing key for a report request: endpoint, data scope and filters.
+    Admins see the same data, so they share a scope; salespersons get their own.
+    """
+    scope = 'all' if user.role == 'Admin' else f'user:{user.id}'
+    filters = sorted((key, value) for key, value in params.items() if key != 'format')
+    digest = hashlib.sha1(json.dumps([scope, filters]).encode()).hexdigest()
+    # Sales changes move to a new key, so nobody waits on a result computed before them
+    # (results read from a lagging replica are keyed apart, see sales_cache_key())
+    return sales_cache_key(endpoint, digest)
+
+
+def _release(lock_key, token):
+    # Only delete the lock if it is still ours (it may have expired and been retaken)
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def coalesce(key, compute):
+    """
+    Return compute(), sharing one computation among concurrent callers with
+    the same key. Results are kept for SINGLEFLIGHT_RESULT_SECONDS.
+    """
+    result_key = f'singleflight:result:{key}'
+    lock_key = f'singleflight:lock:{key}'
+
+    cached = cache.get(result_key)
+    if cached is not None:
+        return cached['value']
+
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=settings.SINGLEFLIGHT_LOCK_SECONDS):
+        try:
+            value = compute()
+            # Wrapped so that a None result is still distinguishable from a miss
+            cache.set(
+                result_key, {'value': value},
+                timeout=sales_cache_timeout(settings.SINGLEFLIGHT_RESULT_SECONDS)
+            )
+            return value
+        finally:
+            _release(lock_key, token)
+
+    deadline = time.monotonic() + settings.SINGLEFLIGHT_WAIT_SECONDS
+    interval = POLL_INTERVAL
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+        cached = cache.get(result_key)
+        if cached is not None:
+            return cached['value']
+        if cache.get(lock_key) is None:
+            # The leader may have stored its result just before releasing the lock
+            cached = cache.get(result_key)
+            if cached is not None:
+                return cached['value']
+            # Otherwise it failed; do not keep waiting
+            break
+
+    logger.warning(f"Single-flight wait for {key} ended without a result; computing it here")
+    return compute()
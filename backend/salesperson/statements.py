@@ -0,0 +1,368 @@
+"""
+Customer statements
+Every sale, payment and the running balance of one customer over a period.
+
+Customers are not a model of their own: a customer's sales are the ones
+recorded with their phone number (or, without one, their name). The
+statement is built by a single ordered SQL query. It lists each sale as
+a charge, the amount paid when the sale was made and every later
+completed Payment, and computes the running balance with a window
+function (SUM() OVER). Everything before the period is folded into an
+opening balance row by the same query.
+
+The PDF is rendered one page at a time, each page as a small ReportLab
+document, and the pages are joined as they stream out (see
+pdf_stream.py). Only the statement rows are held in memory, never a
+layout of the whole document, so a customer with thousands of
+transactions streams as easily as one with ten.
+"""
+import io
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+from .filters import parse_date
+from .models import Payment, Sale
+from .pdf_stream import concatenate_pdfs
+from .receipts import COMPANY_NAME, fit_text
+
+CENT = Decimal('0.01')
+
+# Default period when date_from is missing, counted back from date_to
+DEFAULT_PERIOD_DAYS = 30
+
+# Page geometry, in points from the bottom left corner
+PAGE_WIDTH, PAGE_HEIGHT = letter
+LEFT = 0.75*inch
+RIGHT = PAGE_WIDTH - 0.75*inch
+TOP = PAGE_HEIGHT - 0.75*inch
+BOTTOM = 0.75*inch
+ROW_HEIGHT = 16
+COLUMNS = [
+    # (title, width, align)
+    ("Date", 80, 'LEFT'),
+    ("Description", 224, 'LEFT'),
+    ("Charges", 66, 'RIGHT'),
+    ("Payments", 66, 'RIGHT'),
+    ("Balance", 68, 'RIGHT'),
+]
+CELL_PADDING = 4
+# Where the table starts on the first page (below the summary) and on the others
+FIRST_TABLE_TOP = TOP - 190
+TABLE_TOP = TOP - 90
+FIRST_PAGE_ROWS = int((FIRST_TABLE_TOP - ROW_HEIGHT - BOTTOM - 20) // ROW_HEIGHT)
+PAGE_ROWS = int((TABLE_TOP - ROW_HEIGHT - BOTTOM - 20) // ROW_HEIGHT)
+
+
+def statement_customer(params):
+    """
+    ('customer_phone' or 'customer_name', value) from the request parameters.
+    Raises ValueError when neither is given.
+    """
+    for field in ('customer_phone', 'customer_name'):
+        value = (params.get(field) or '').strip()
+        if value:
+            return field, value
+    raise ValueError('customer_phone or customer_name is required')
+
+
+def statement_period(params):
+    """
+    (date_from, date_to) from the request parameters; date_to defaults to
+    today and date_from to DEFAULT_PERIOD_DAYS before it.
+    Raises ValueError for an invalid or reversed range.
+    """
+    for field in ('date_from', 'date_to'):
+        if params.get(field) and parse_date(params[field]) is None:
+            raise ValueError(f'{field} must be a date (YYYY-MM-DD)')
+    date_to = parse_date(params.get('date_to')) or timezone.localdate()
+    date_from = parse_date(params.get('date_from')) or date_to - timedelta(days=DEFAULT_PERIOD_DAYS)
+    if date_from > date_to:
+        raise ValueError('date_from must not be after date_to')
+    return date_from, date_to
+
+
+def _ledger_sql(connection, customer_field, scoped):
+    """The statement query, and the order of its parameters"""
+    quote = connection.ops.quote_name
+    sales = quote(Sale._meta.db_table)
+    payments = quote(Payment._meta.db_table)
+    if customer_field == 'customer_name':
+        customer = 'LOWER(s.customer_name) = LOWER(%s)'
+    else:
+        customer = 's.customer_phone = %s'
+    sale_filter = f"{customer}{' AND s.salesperson_id = %s' if scoped else ''} AND s.created_at < %s"
+    sql = f"""
+        -- Branches spell out their NULL types: PostgreSQL types a UNION pair by pair
+        WITH entries AS (
+            SELECT s.created_at AS posted_at, 1 AS seq, 'sale' AS kind, s.id AS sale_id,
+                   CAST(NULL AS INTEGER) AS payment_id, s.payment_method AS method, NULL AS reference,
+                   s.total_amount AS charge, 0 AS payment
+            FROM {sales} s
+            WHERE {sale_filter}
+            UNION ALL
+            -- Paid when the sale was made: whatever later payments do not account for
+            SELECT s.created_at, 2, 'deposit', s.id, CAST(NULL AS INTEGER), s.payment_method, NULL, 0,
+                   s.amount_paid - COALESCE((
+                       SELECT SUM(p.amount) FROM {payments} p WHERE p.sale_id = s.id AND p.status = %s
+                   ), 0)
+            FROM {sales} s
+            WHERE {sale_filter}
+            UNION ALL
+            SELECT p.created_at, 3, 'payment', p.sale_id, p.id, p.payment_method, p.reference_number, 0, p.amount
+            FROM {payments} p
+            JOIN {sales} s ON s.id = p.sale_id
+            WHERE {sale_filter} AND p.status = %s AND p.created_at < %s
+        ),
+        ledger AS (
+            SELECT * FROM entries WHERE kind <> 'deposit' OR payment > 0
+        ),
+        statement AS (
+            SELECT %s AS posted_at, 0 AS seq, 'opening' AS kind, NULL AS sale_id, NULL AS payment_id,
+                   NULL AS method, NULL AS reference, COALESCE(SUM(charge - payment), 0) AS charge, 0 AS payment
+            FROM ledger
+            WHERE posted_at < %s
+            UNION ALL
+            SELECT * FROM ledger WHERE posted_at >= %s
+        )
+        SELECT kind, posted_at, sale_id, payment_id, method, reference, charge, payment,
+               SUM(charge - payment) OVER (
+                   ORDER BY posted_at, seq, sale_id, payment_id
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+               ) AS balance
+        FROM statement
+        ORDER BY posted_at, seq, sale_id, payment_id
+    """
+    sale_params = ['customer', 'salesperson', 'end'] if scoped else ['customer', 'end']
+    order = (
+        sale_params + ['completed'] + sale_params + sale_params + ['completed', 'end']
+        + ['start', 'start', 'start']
+    )
+    return sql, order
+
+
+def _money(value):
+    # SQLite hands back floats; PostgreSQL hands back Decimals
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def build_statement(customer, date_from, date_to, salesperson=None):
+    """
+    A customer's statement for date_from..date_to (inclusive).
+
+    Args:
+        customer: (field, value) from statement_customer()
+        salesperson (User): only include this salesperson's sales
+
+    Returns:
+        dict with the customer, period, opening/closing balances, totals
+        and `entries`: one dict per sale, deposit or payment, oldest first,
+        each with its running `balance`
+    """
+    customer_field, customer_value = customer
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    connection = connections[router.db_for_read(Sale)]
+    values = {
+        'customer': customer_value,
+        'salesperson': salesperson.pk if salesperson is not None else None,
+        'start': connection.ops.adapt_datetimefield_value(start),
+        'end': connection.ops.adapt_datetimefield_value(end),
+        'completed': Payment.PAYMENT_STATUS_COMPLETED,
+    }
+    sql, order = _ledger_sql(connection, customer_field, salesperson is not None)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [values[name] for name in order])
+        rows = cursor.fetchall()
+
+    opening, *rows = rows
+    entries = [
+        {
+            'kind': kind,
+            'posted_at': _as_datetime(posted_at),
+            'sale_id': sale_id,
+            'payment_id': payment_id,
+            'method': method,
+            'reference': reference,
+            'charge': _money(charge),
+            'payment': _money(payment),
+            'balance': _money(balance),
+        }
+        for kind, posted_at, sale_id, payment_id, method, reference, charge, payment, balance in rows
+    ]
+    opening_balance = _money(opening[-1])
+    return {
+        'customer': {customer_field: customer_value},
+        'date_from': date_from,
+        'date_to': date_to,
+        'opening_balance': opening_balance,
+        'total_charges': sum((entry['charge'] for entry in entries), Decimal('0.00')),
+        'total_payments': sum((entry['payment'] for entry in entries), Decimal('0.00')),
+        'closing_balance': entries[-1]['balance'] if entries else opening_balance,
+        'entries': entries,
+    }
+
+
+def _amount(value, blank_zero=True):
+    if blank_zero and not value:
+        return ''
+    return f"-${-value:,.2f}" if value < 0 else f"${value:,.2f}"
+
+
+def _description(entry):
+    receipt = f"RCP-{entry['sale_id']:06d}"
+    if entry['kind'] == 'sale':
+        return f"Sale {receipt}"
+    if entry['kind'] == 'deposit':
+        return f"Paid at sale {receipt} ({entry['method']})"
+    description = f"Payment for {receipt} ({entry['method']})"
+    if entry['reference']:
+        description += f" ref {entry['reference']}"
+    return description
+
+
+def _table_rows(statement):
+    """Text cells of every table row, including the opening and closing rows"""
+    rows = [[
+        statement['date_from'].strftime('%b %d, %Y'), "Opening balance", '', '',
+        _amount(statement['opening_balance'], blank_zero=False),
+    ]]
+    for entry in statement['entries']:
+        rows.append([
+            timezone.localtime(entry['posted_at']).strftime('%b %d, %Y'),
+            _description(entry),
+            _amount(entry['charge']),
+            _amount(entry['payment']),
+            _amount(entry['balance'], blank_zero=False),
+        ])
+    rows.append([
+        statement['date_to'].strftime('%b %d, %Y'), "Closing balance", '', '',
+        _amount(statement['closing_balance'], blank_zero=False),
+    ])
+    return rows
+
+
+def _pages(rows):
+    """Split the table rows into pages"""
+    pages = [rows[:FIRST_PAGE_ROWS]]
+    for start in range(FIRST_PAGE_ROWS, len(rows), PAGE_ROWS):
+        pages.append(rows[start:start + PAGE_ROWS])
+    return pages
+
+
+def _draw_header(canvas, statement, number, count):
+    customer = statement['customer']
+    canvas.setFillColor(colors.darkblue)
+    canvas.setFont('Helvetica-Bold', 16)
+    canvas.drawString(LEFT, TOP - 16, COMPANY_NAME)
+    canvas.setFont('Helvetica-Bold', 13)
+    canvas.drawString(LEFT, TOP - 36, "Customer Statement")
+    canvas.setFillColor(colors.black)
+    canvas.setFont('Helvetica', 9)
+    canvas.drawRightString(RIGHT, TOP - 16, f"Page {number} of {count}")
+    who = customer.get('customer_name') or ''
+    if customer.get('customer_phone'):
+        who = f"Phone {customer['customer_phone']}"
+    canvas.drawString(LEFT, TOP - 56, fit_text(f"Customer: {who}", 'Helvetica', 9, RIGHT - LEFT))
+    canvas.drawString(LEFT, TOP - 70, (
+        f"Period: {statement['date_from']:%B %d, %Y} to {statement['date_to']:%B %d, %Y}"
+    ))
+
+
+def _draw_summary(canvas, statement):
+    rows = [
+        ("Opening balance", statement['opening_balance']),
+        ("Charges", statement['total_charges']),
+        ("Payments", statement['total_payments']),
+        ("Balance due", statement['closing_balance']),
+    ]
+    top = TOP - 90
+    width = 220
+    canvas.setStrokeColor(colors.grey)
+    canvas.setFillColor(colors.lightblue)
+    canvas.rect(LEFT, top - 4 * 20, width, 20, stroke=0, fill=1)
+    canvas.grid([LEFT, LEFT + 120, LEFT + width], [top - 20 * row for row in range(5)])
+    canvas.setFillColor(colors.black)
+    for row, (label, value) in enumerate(rows):
+        baseline = top - 20 * (row + 1) + 6
+        canvas.setFont('Helvetica-Bold', 10)
+        canvas.drawString(LEFT + CELL_PADDING, baseline, label)
+        canvas.setFont('Helvetica', 10)
+        canvas.drawRightString(LEFT + width - CELL_PADDING, baseline, _amount(value, blank_zero=False))
+
+
+def _draw_table(canvas, rows, top, closing):
+    """The column header and `rows`; the last row is highlighted when `closing`"""
+    edges = [LEFT]
+    for _, width, _ in COLUMNS:
+        edges.append(edges[-1] + width)
+    bottom = top - ROW_HEIGHT * (len(rows) + 1)
+
+    canvas.setFillColor(colors.darkblue)
+    canvas.rect(LEFT, top - ROW_HEIGHT, edges[-1] - LEFT, ROW_HEIGHT, stroke=0, fill=1)
+    canvas.setFillColor(colors.lightgrey)
+    for row in range(1, len(rows), 2):
+        canvas.rect(LEFT, top - ROW_HEIGHT * (row + 2), edges[-1] - LEFT, ROW_HEIGHT, stroke=0, fill=1)
+    if closing:
+        canvas.setFillColor(colors.lightblue)
+        canvas.rect(LEFT, bottom, edges[-1] - LEFT, ROW_HEIGHT, stroke=0, fill=1)
+    canvas.setStrokeColor(colors.black)
+    canvas.setLineWidth(0.5)
+    canvas.grid(edges, [top - ROW_HEIGHT * row for row in range(len(rows) + 2)])
+
+    text = canvas.beginText()
+    header = [[title for title, _, _ in COLUMNS]]
+    for index, cells in enumerate(header + rows):
+        font = 'Helvetica-Bold' if index == 0 or (closing and index == len(rows)) else 'Helvetica'
+        text.setFont(font, 9)
+        text.setFillColor(colors.whitesmoke if index == 0 else colors.black)
+        baseline = top - ROW_HEIGHT * (index + 1) + 5
+        for cell, (_, width, align), left in zip(cells, COLUMNS, edges):
+            cell = fit_text(cell, font, 9, width - 2 * CELL_PADDING)
+            if align == 'RIGHT':
+                text.setTextOrigin(left + width - CELL_PADDING - stringWidth(cell, font, 9), baseline)
+            else:
+                text.setTextOrigin(left + CELL_PADDING, baseline)
+            text.textOut(cell)
+    canvas.drawText(text)
+
+
+def render_page(statement, rows, number, count):
+    """One page of the statement as a single-page PDF"""
+    buffer = io.BytesIO()
+    canvas = Canvas(buffer, pagesize=letter)
+    _draw_header(canvas, statement, number, count)
+    if number == 1:
+        _draw_summary(canvas, statement)
+    _draw_table(canvas, rows, FIRST_TABLE_TOP if number == 1 else TABLE_TOP, closing=number == count)
+    canvas.setFillColor(colors.grey)
+    canvas.setFont('Helvetica', 8)
+    canvas.drawCentredString(
+        PAGE_WIDTH / 2, BOTTOM - 12, "Generated on " + datetime.now().strftime("%B %d, %Y at %I:%M %p")
+    )
+    canvas.showPage()
+    canvas.save()
+    return buffer.getvalue()
+
+
+def stream_statement(statement):
+    """Yield the bytes of the statement PDF, rendering each page as it is needed"""
+    pages = _pages(_table_rows(statement))
+    return concatenate_pdfs(
+        render_page(statement, rows, number, len(pages))
+        for number, rows in enumerate(pages, start=1)
+    )
@@ -1,9 +1,10 @@
 """
 Comprehensive API tests for the Stock Management System
 """
+import io
 import json
 from decimal import Decimal
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
@@ -254,6 +255,237 @@ class SaleAPITestCase(APITestCase):
         self.assertEqual(len(response.data['results']), 1)
         self.assertEqual(response.data['results'][0]['customer_name'], 'Salesperson Sale')
 
+    def test_top_products_follow_sale_create_and_delete(self):
+        """Test the daily product counters behind top products track sales"""
+        from salesperson.models import ProductSalesDaily
+
+        self.client.force_authenticate(user=self.salesperson_user)
+        url = reverse('api_sale_list')
+        for quantity in (2, 3):
+            response = self.client.post(url, {
+                'payment_method': 'Cash',
+                'amount_paid': '0.00',
+                'products_sold_data': [
+                    {'product_id': self.product1.id, 'quantity': quantity},
+                    {'product_id': self.product2.id, 'quantity': 1}
+                ]
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        sale_id = response.data['id']
+
+        counter = ProductSalesDaily.objects.get(product=self.product1)
+        self.assertEqual(counter.quantity, 5)
+        self.assertEqual(counter.revenue, Decimal('250.00'))
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api_sales_report'))
+        top = response.data['top_products']
+        self.assertEqual([row['product__sku'] for row in top], ['PROD-001', 'PROD-002'])
+        self.assertEqual(top[0]['total_quantity'], 5)
+        self.assertEqual(top[1]['total_revenue'], Decimal('150.00'))
+
+        # Deleting a sale takes its items back out of the counters
+        response = self.client.delete(reverse('api_sale_detail', kwargs={'pk': sale_id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(reverse('api_comprehensive_reports'))
+        top = {row['product__sku']: row['total_quantity'] for row in response.data['top_products']}
+        self.assertEqual(top, {'PROD-001': 2, 'PROD-002': 1})
+
+    def test_sale_receipt(self):
+        """Test the receipt loads in one query and is only available to the sale's owner"""
+        import tempfile
+        from django.test import override_settings
+        from salesperson.receipts import load_sale, render_receipt
+
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.post(reverse('api_sale_list'), {
+            'customer_name': 'Receipt Customer',
+            'payment_method': 'Cash',
+            'amount_paid': '100.00',
+            'products_sold_data': [
+                {'product_id': self.product1.id, 'quantity': 1},
+                {'product_id': self.product2.id, 'quantity': 2}
+            ]
+        }, format='json')
+        sale_id = response.data['id']
+
+        with self.assertNumQueries(1):
+            sale = load_sale(sale_id)
+            self.assertEqual(sale.salesperson, self.salesperson_user)
+            self.assertEqual([item.product_name for item in sale.receipt_items], ['Product 1', 'Product 2'])
+            self.assertTrue(render_receipt(sale).startswith(b'%PDF'))
+
+        other = User.objects.create_user(email='other@test.com', password='testpass123', role='Salesperson')
+        with self.assertRaises(Sale.DoesNotExist):
+            load_sale(sale_id, salesperson=other)
+
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(RECEIPT_CACHE_ROOT=cache_dir):
+            response = self.client.get(reverse('api_sale_receipt', kwargs={'pk': sale_id}))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('attachment', response['Content-Disposition'])
+            response.close()
+
+            self.client.force_authenticate(user=other)
+            response = self.client.get(reverse('api_sale_pdf', args=[sale_id]))
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_overlay_receipt(self):
+        """Test short receipts are drawn over the cached static page and long ones use the flowable layout"""
+        from salesperson import receipts
+        from salesperson.receipt_benchmark import compare, sample_sale
+
+        pdf = receipts.render_receipt(sample_sale(receipts.OVERLAY_MAX_ROWS))
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertIn(b'/Subtype /Form', pdf)
+        # The static page is recorded once and reused
+        static_form = receipts._static_form()
+        receipts.render_receipt(sample_sale(1))
+        self.assertIs(receipts._static_form(), static_form)
+
+        pdf = receipts.render_receipt(sample_sale(receipts.OVERLAY_MAX_ROWS + 1))
+        self.assertNotIn(b'/Subtype /Form', pdf)
+
+        result, = compare([1], runs=1)
+        self.assertEqual(result['items'], 1)
+        self.assertGreater(result['overlay_bytes'], 0)
+        self.assertGreater(result['flowable_ms'], 0)
+
+    def test_receipt_benchmark_regressions(self):
+        """Test the receipt benchmark reports memory and flags regressions against a baseline"""
+        import tempfile
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from salesperson.receipt_benchmark import compare, regressions, report
+
+        results = compare([1], runs=1)
+        self.assertGreater(results[0]['overlay_peak_kb'], 0)
+        baseline = json.loads(json.dumps(report(results, runs=1)))
+        self.assertEqual(regressions(results, baseline), [])
+
+        baseline['results'][0]['overlay_bytes'] = results[0]['overlay_bytes'] // 2
+        problems = regressions(results, baseline)
+        self.assertEqual(len(problems), 1)
+        self.assertIn('overlay_bytes', problems[0])
+        self.assertEqual(regressions(results, baseline, {'bytes': 1.5}), [])
+        # Item counts the baseline does not have are not compared
+        self.assertEqual(regressions(compare([2], runs=1), baseline), [])
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+            json.dump(baseline, f)
+            f.flush()
+            stderr = io.StringIO()
+            with self.assertRaises(CommandError):
+                call_command(
+                    'benchmark_receipts', items=[1], runs=1, baseline=f.name, stdout=io.StringIO(), stderr=stderr
+                )
+            self.assertIn('1 items: overlay_bytes', stderr.getvalue())
+
+    def test_compact_receipt_formats(self):
+        """Test text, ESC/POS and HTML receipts are negotiated, sized to the paper and cacheable"""
+        import tempfile
+
+        sale = Sale.objects.create(
+            salesperson=self.salesperson_user, customer_name='Thermal Customer',
+            total_amount=Decimal('150.00'), amount_paid=Decimal('100.00')
+        )
+        SaleItem.objects.create(sale=sale, product=self.product1, quantity=3, price_at_sale=Decimal('50.00'))
+        SaleItem.objects.filter(sale=sale).update(product_name='Cable <USB-C> with a rather long product name')
+        url = reverse('api_sale_pdf', args=[sale.id])
+        self.client.force_authenticate(user=self.salesperson_user)
+
+        response = self.client.get(url, {'format': 'txt'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn('Accept', response['Vary'])
+        text = response.content.decode()
+        self.assertIn(f'RCP-{sale.id:06d}', text)
+        self.assertIn('$50.00', text)
+        self.assertTrue(all(len(line) <= 48 for line in text.splitlines()))
+
+        # 304 while the sale is unchanged
+        response = self.client.get(url, {'format': 'txt'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, {'format': 'txt', 'paper': '58'})
+        self.assertTrue(all(len(line) <= 32 for line in response.content.decode().splitlines()))
+        response = self.client.get(url, {'format': 'txt', 'paper': '99'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        response = self.client.get(url, HTTP_ACCEPT='application/vnd.escpos')
+        self.assertEqual(response['Content-Type'], 'application/vnd.escpos')
+        self.assertTrue(response.content.startswith(b'\x1b@'))
+        self.assertTrue(response.content.endswith(b'\x1dVB\x03'))
+
+        response = self.client.get(url, {'format': 'html'})
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        self.assertIn(b'Cable &lt;USB-C&gt;', response.content)
+
+        # Browsers and HTTP clients that merely accept text still get the PDF
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(RECEIPT_CACHE_ROOT=cache_dir):
+            for accept in ('text/html,application/xhtml+xml,*/*;q=0.8', 'application/json, text/plain, */*'):
+                response = self.client.get(url, HTTP_ACCEPT=accept)
+                self.assertEqual(response['Content-Type'], 'application/pdf')
+                response.close()
+
+    def test_receipt_render_pool(self):
+        """Test receipts render in the process pool and a full pool answers 503"""
+        import os
+        import tempfile
+        from unittest import mock
+        from salesperson import render_pool
+
+        sale = Sale.objects.create(
+            salesperson=self.salesperson_user, customer_name='Pool Customer',
+            total_amount=Decimal('50.00'), amount_paid=Decimal('50.00')
+        )
+        SaleItem.objects.create(sale=sale, product=self.product1, quantity=1, price_at_sale=Decimal('50.00'))
+        url = reverse('api_sale_pdf', args=[sale.id])
+        self.client.force_authenticate(user=self.salesperson_user)
+
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(
+            RECEIPT_CACHE_ROOT=cache_dir, RECEIPT_RENDER_WORKERS=1, RECEIPT_RENDER_MAX_QUEUE=1
+        ):
+            rendered = render_pool.metrics()['rendered']
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+            self.assertEqual(render_pool.metrics()['rendered'], rendered + 1)
+
+            # A full pool rejects new renders, but cached receipts are still served
+            with mock.patch.object(render_pool, '_in_flight', render_pool.capacity()):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                response.close()
+
+                sale.amount_paid = Decimal('40.00')
+                sale.save()
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+                self.assertIn('Retry-After', response)
+
+                self.client.force_authenticate(user=self.admin_user)
+                metrics = self.client.get(reverse('api_render_pool_metrics')).data
+                self.assertEqual(metrics['queued'], 1)
+                self.assertGreaterEqual(metrics['rejected'], 1)
+
+            # A broken pool is shut down and replaced on the next render
+            from concurrent.futures import Future
+            from concurrent.futures.process import BrokenProcessPool
+            broken_future = Future()
+            broken_future.set_exception(BrokenProcessPool('worker died'))
+            broken = mock.Mock(submit=mock.Mock(return_value=broken_future))
+            with mock.patch.object(render_pool, '_executor', broken), \
+                    mock.patch.object(render_pool, '_executor_pid', os.getpid()):
+                with self.assertRaises(render_pool.RenderPoolUnavailable):
+                    render_pool.render(sale)
+                self.assertIsNone(render_pool._executor)
+            broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.get(reverse('api_render_pool_metrics'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
 
 class PaymentAPITestCase(APITestCase):
     """Test payment management endpoints"""
@@ -324,6 +556,126 @@ class PaymentAPITestCase(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_receipt_cache(self):
+        """Test receipts are served from disk until a payment changes the sale"""
+        import tempfile
+        from django.test import override_settings
+
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api_sale_pdf', args=[self.sale.id])
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(RECEIPT_CACHE_ROOT=cache_dir):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['X-Receipt-Cache'], 'miss')
+            pdf = b''.join(response.streaming_content)
+            self.assertTrue(pdf.startswith(b'%PDF'))
+            etag = response['ETag']
+
+            response = self.client.get(url)
+            self.assertEqual(response['X-Receipt-Cache'], 'hit')
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(b''.join(response.streaming_content), pdf)
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            # A payment updates the sale, so the receipt is rendered again
+            with override_settings(RECEIPT_PRERENDER=False):
+                self.client.post(reverse('api_payment_list'), {
+                    'sale': self.sale.id, 'amount': '50.00', 'payment_method': 'Cash'
+                }, format='json')
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['X-Receipt-Cache'], 'miss')
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+            response.close()
+
+            # ...ahead of time when pre-rendering is on
+            with override_settings(RECEIPT_PRERENDER_THREADS=0), self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('api_payment_list'), {
+                    'sale': self.sale.id, 'amount': '50.00', 'payment_method': 'Cash'
+                }, format='json')
+            response = self.client.get(url)
+            self.assertEqual(response['X-Receipt-Cache'], 'hit')
+            self.assertNotEqual(response['ETag'], etag)
+            response.close()
+
+            # The stale render was dropped
+            import os
+            self.assertEqual(len(os.listdir(f'{cache_dir}/{self.sale.id}')), 1)
+
+            # A hit whose file is evicted while the response is prepared still serves it
+            from unittest import mock
+            from salesperson import receipt_cache
+            pdf = b''.join(self.client.get(url).streaming_content)
+
+            def evict_all(path):
+                os.unlink(path)
+                raise FileNotFoundError(path)
+
+            with mock.patch.object(receipt_cache.os, 'utime', side_effect=evict_all):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Receipt-Cache'], 'hit')
+            self.assertEqual(b''.join(response.streaming_content), pdf)
+
+    def test_signed_pdf_tokens(self):
+        """Test signed PDF tokens open only their sale until expired or revoked"""
+        import tempfile
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from django.utils import timezone
+        from salesperson.models import PDFAccessToken
+        from salesperson.pdf_tokens import create_token
+
+        cache.clear()
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.post(reverse('api_create_pdf_token', args=[self.sale.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        token = response.data['token']
+        self.assertEqual(PDFAccessToken.objects.count(), 0)
+
+        self.client.force_authenticate(user=None)
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(RECEIPT_CACHE_ROOT=cache_dir):
+            # Validating the token needs no query; loading a sale without items takes two
+            with self.assertNumQueries(2):
+                response = self.client.get(response.data['download_url'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response.close()
+
+            other_sale = Sale.objects.create(
+                salesperson=self.salesperson_user, customer_name='Other', total_amount=Decimal('10.00'),
+                payment_method='cash'
+            )
+            url = reverse('api_download_pdf_token', args=[other_sale.id, token])
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+            url = reverse('api_download_pdf_token', args=[self.sale.id, token[:-2] + 'xx'])
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+            expired, _ = create_token(self.sale.id, lifetime=timedelta(seconds=-1))
+            url = reverse('api_download_pdf_token', args=[self.sale.id, expired])
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+            self.client.force_authenticate(user=self.salesperson_user)
+            url = reverse('api_create_pdf_token', args=[self.sale.id])
+            response = self.client.delete(url, {'token': token}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+            url = reverse('api_download_pdf_token', args=[self.sale.id, token])
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+            # Tokens issued before signing keep working until they expire
+            legacy = PDFAccessToken.objects.create(sale=self.sale)
+            url = reverse('api_download_pdf_token', args=[self.sale.id, legacy.token])
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response.close()
+
+        PDFAccessToken.objects.create(sale=self.sale, expires_at=timezone.now() - timedelta(hours=1))
+        call_command('purge_pdf_tokens', stdout=io.StringIO())
+        self.assertEqual(list(PDFAccessToken.objects.all()), [legacy])
+        cache.clear()
+
 
 class UserManagementAPITestCase(APITestCase):
     """Test user management endpoints"""
@@ -374,6 +726,8 @@ class UserManagementAPITestCase(APITestCase):
         self.assertEqual(User.objects.count(), 3)
 
 
+# Commit callbacks run in these tests; keep them from rendering receipts in the background
+@override_settings(RECEIPT_PRERENDER=False)
 class ReportsAPITestCase(APITestCase):
     """Test reporting endpoints"""
     
@@ -446,6 +800,576 @@ class ReportsAPITestCase(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_inventory_report_valuation_and_pagination(self):
+        """Test inventory value is quantity x price and stock alerts are paginated"""
+        Product.objects.all().delete()
+        Product.objects.create(name='Cable', sku='CAB001', price=Decimal('5.00'), stock_quantity=4, category='Parts')
+        Product.objects.create(name='Fan', sku='FAN001', price=Decimal('20.00'), stock_quantity=2, category='Parts')
+        Product.objects.create(name='Lamp', sku='LMP001', price=Decimal('50.00'), stock_quantity=0, category='Home')
+        Product.objects.create(name='Desk', sku='DSK001', price=Decimal('100.00'), stock_quantity=30, category='Home')
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api_inventory_report'), {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['total_stock_value'], Decimal('3060.00'))
+
+        categories = {row['category']: row['total_value'] for row in response.data['categories']}
+        self.assertEqual(categories, {'Home': Decimal('3000.00'), 'Parts': Decimal('60.00')})
+
+        self.assertEqual([item['sku'] for item in response.data['low_stock_items']], ['CAB001'])
+        self.assertEqual([item['sku'] for item in response.data['out_of_stock_items']], ['LMP001'])
+        self.assertEqual(response.data['items_pagination']['total_pages'], 2)
+
+        response = self.client.get(reverse('api_inventory_report'), {'page_size': 1, 'page': 2})
+        self.assertEqual([item['sku'] for item in response.data['low_stock_items']], ['FAN001'])
+        self.assertEqual(response.data['out_of_stock_items'], [])
+
+    def test_inventory_snapshot_and_trends(self):
+        """Test daily snapshots are upserted and read back as a trend series"""
+        from django.core.management import call_command
+        from salesperson.models import InventorySnapshot
+
+        Product.objects.all().delete()
+        cable = Product.objects.create(name='Cable', sku='CAB001', price=Decimal('5.00'), stock_quantity=4)
+        Product.objects.create(name='Desk', sku='DSK001', price=Decimal('100.00'), stock_quantity=3)
+
+        # Friday, taken twice: the second run replaces the first
+        call_command('snapshot_inventory', date='2026-10-16', stdout=io.StringIO())
+        cable.stock_quantity = 0
+        cable.save()
+        call_command('snapshot_inventory', date='2026-10-16', stdout=io.StringIO())
+        # Saturday is skipped unless asked for
+        call_command('snapshot_inventory', date='2026-10-17', stdout=io.StringIO())
+        cable.stock_quantity = 10
+        cable.save()
+        call_command('snapshot_inventory', date='2026-10-19', stdout=io.StringIO())
+
+        self.assertEqual(InventorySnapshot.objects.count(), 4)
+
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api_inventory_trends')
+        response = self.client.get(url, {'date_from': '2026-10-01', 'date_to': '2026-10-31'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        series = response.data['series']
+        self.assertEqual([row['date'] for row in series], ['2026-10-16', '2026-10-19'])
+        self.assertEqual(series[0]['total_stock'], 3)
+        self.assertEqual(series[0]['total_value'], Decimal('300.00'))
+        self.assertEqual(series[0]['out_of_stock'], 1)
+        self.assertEqual(series[1]['total_value'], Decimal('350.00'))
+
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_salesperson_leaderboard(self):
+        """Test salespeople are ranked with deltas against the previous period"""
+        from datetime import timedelta
+        from django.utils import timezone
+
+        second_user = User.objects.create_user(
+            email='second@test.com',
+            password='testpass123',
+            role='Salesperson'
+        )
+        credit_sale = Sale.objects.create(
+            salesperson=second_user,
+            total_amount=Decimal('500.00'),
+            payment_method='Credit',
+            amount_paid=Decimal('100.00')
+        )
+        old_sale = Sale.objects.create(
+            salesperson=self.salesperson_user,
+            total_amount=Decimal('50.00'),
+            payment_method='Cash',
+            amount_paid=Decimal('50.00')
+        )
+        # Move one sale into the previous 7 day period
+        Sale.objects.filter(pk=old_sale.pk).update(created_at=timezone.now() - timedelta(days=10))
+
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api_salesperson_leaderboard')
+        today = timezone.now().date()
+        params = {'date_from': (today - timedelta(days=6)).isoformat(), 'date_to': today.isoformat()}
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        leaderboard = response.data['leaderboard']
+        self.assertEqual([row['salesperson']['id'] for row in leaderboard], [second_user.id, self.salesperson_user.id])
+        self.assertEqual(leaderboard[0]['rank'], 1)
+        self.assertEqual(leaderboard[0]['outstanding'], credit_sale.balance)
+        self.assertEqual(leaderboard[0]['collection_rate'], 20.0)
+        self.assertEqual(leaderboard[1]['change']['revenue'], Decimal('150.00'))
+        self.assertEqual(leaderboard[1]['change']['revenue_percent'], 300.0)
+
+        response = self.client.get(url, dict(params, rank_by='collection_rate'))
+        self.assertEqual(response.data['leaderboard'][0]['salesperson']['id'], self.salesperson_user.id)
+
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_receivables_aging(self):
+        """Test open balances are bucketed by age, paginated and exportable"""
+        from datetime import timedelta
+        from django.utils import timezone
+
+        for customer, amount, age in [('Ada', '100.00', 5), ('Ada', '40.00', 45), ('Ben', '300.00', 120)]:
+            sale = Sale.objects.create(
+                salesperson=self.salesperson_user,
+                customer_name=customer,
+                total_amount=Decimal(amount),
+                payment_method='Credit',
+                amount_paid=Decimal('0.00')
+            )
+            Sale.objects.filter(pk=sale.pk).update(created_at=timezone.now() - timedelta(days=age))
+
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api_receivables_aging')
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['totals']['total_outstanding'], Decimal('440.00'))
+        self.assertEqual(response.data['totals']['days_over_90'], Decimal('300.00'))
+        self.assertEqual(response.data['results'][0]['customer_name'], 'Ben')
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(url, {'page': 2, 'page_size': 1})
+        ada = response.data['results'][0]
+        self.assertEqual(ada['days_0_30'], Decimal('100.00'))
+        self.assertEqual(ada['days_31_60'], Decimal('40.00'))
+        self.assertEqual(ada['days_61_90'], Decimal('0.00'))
+
+        response = self.client.get(url, {'group_by': 'salesperson', 'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['salesperson_id', 'salesperson_name'])
+        self.assertEqual(len(lines), 2)
+
+    def test_customer_statement(self):
+        """Test statements carry an opening balance and running balances, scoped and streamed as PDF"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from salesperson.statements import build_statement, stream_statement
+
+        now = timezone.now()
+        other = User.objects.create_user(email='other@test.com', password='testpass123', role='Salesperson')
+
+        def sale(total, paid, age, salesperson=None, phone='0800111'):
+            sale = Sale.objects.create(
+                salesperson=salesperson or self.salesperson_user, customer_name='Credit Customer',
+                customer_phone=phone, total_amount=Decimal(total), payment_method='Credit',
+                amount_paid=Decimal(paid)
+            )
+            Sale.objects.filter(pk=sale.pk).update(created_at=now - timedelta(days=age))
+            # Payments save the sale again; keep them from restoring created_at
+            sale.refresh_from_db()
+            return sale
+
+        def pay(sale, amount, age):
+            payment = Payment.objects.create(
+                sale=sale, recorded_by=self.admin_user, amount=Decimal(amount), payment_method='Cash'
+            )
+            Payment.objects.filter(pk=payment.pk).update(created_at=now - timedelta(days=age))
+
+        pay(sale('100.00', '20.00', 60), '30.00', 40)
+        recent = sale('200.00', '0.00', 10)
+        pay(recent, '50.00', 5)
+        sale('70.00', '0.00', 3, phone='0800999')
+        sale('500.00', '0.00', 2, salesperson=other)
+
+        date_from = (now - timedelta(days=30)).date()
+        with self.assertNumQueries(1):
+            statement = build_statement(
+                ('customer_phone', '0800111'), date_from, now.date(), salesperson=self.salesperson_user
+            )
+        self.assertEqual(statement['opening_balance'], Decimal('50.00'))
+        self.assertEqual(
+            [(entry['kind'], entry['balance']) for entry in statement['entries']],
+            [('sale', Decimal('250.00')), ('payment', Decimal('200.00'))]
+        )
+        self.assertEqual(statement['closing_balance'], Decimal('200.00'))
+
+        # Admins see every salesperson's sales to the customer
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api_customer_statement')
+        response = self.client.get(url, {'customer_phone': '0800111', 'date_from': date_from.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        pdf = b''.join(response.streaming_content)
+        self.assertTrue(pdf.startswith(b'%PDF') and pdf.endswith(b'%%EOF\n'))
+        self.assertIn(b'/Count 1 ', pdf)
+
+        response = self.client.get(url, {'date_from': date_from.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Long statements run over several pages
+        statement['entries'] = statement['entries'] * 60
+        pdf = b''.join(stream_statement(statement))
+        self.assertIn(b'/Count 4 ', pdf)
+
+    def test_reorder_suggestions(self):
+        """Test reorder suggestions use sales velocity and refresh after a sale"""
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.utils import timezone
+        from salesperson.models import ProductSalesDaily
+        from salesperson.rollups import record_sale_items
+
+        cache.clear()
+        self.product.stock_quantity = 40
+        self.product.save()
+        slow_product = Product.objects.create(name='Slow Product', sku='SLOW-001', price=Decimal('10.00'), stock_quantity=40)
+        today = timezone.localdate()
+        for days_ago in range(1, 15):
+            ProductSalesDaily.objects.create(
+                product=self.product,
+                salesperson=self.salesperson_user,
+                date=today - timedelta(days=days_ago),
+                quantity=8,
+                revenue=Decimal('800.00')
+            )
+
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api_reorder_suggestions')
+        response = self.client.get(url, {'history_days': 14, 'alpha': 0.5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        suggestions = response.data['suggestions']
+        self.assertEqual([row['sku'] for row in suggestions], ['TEST-001'])
+        self.assertEqual(suggestions[0]['forecast_daily_sales'], 8.0)
+        self.assertEqual(suggestions[0]['days_of_cover'], 5.0)
+        self.assertEqual(suggestions[0]['suggested_order_quantity'], 8 * (7 + 30) - 40)
+
+        response = self.client.get(url, {'history_days': 14, 'all': 'true'})
+        self.assertEqual(response.data['suggestions'][-1]['sku'], slow_product.sku)
+        self.assertIsNone(response.data['suggestions'][-1]['days_of_cover'])
+
+        # Recording a sale invalidates the cached forecasts
+        sale_item = SaleItem.objects.create(
+            sale=self.sale, product=slow_product, quantity=30, price_at_sale=Decimal('10.00')
+        )
+        ProductSalesDaily.objects.filter(product=slow_product).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            record_sale_items(self.sale, [sale_item])
+        ProductSalesDaily.objects.filter(product=slow_product).update(date=today - timedelta(days=1))
+        response = self.client.get(url, {'history_days': 14})
+        self.assertIn(slow_product.sku, [row['sku'] for row in response.data['suggestions']])
+
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_sales_analytics_cube(self):
+        """Test the in-memory sales cube matches SQL and picks up new sales"""
+        from django.test import override_settings
+        from salesperson.cube import sales_cube
+
+        sales_cube.reset()
+        SaleItem.objects.create(sale=self.sale, product=self.product, quantity=2, price_at_sale=Decimal('100.00'))
+        Sale.objects.create(
+            salesperson=self.admin_user,
+            total_amount=Decimal('80.00'),
+            payment_method='Credit',
+            amount_paid=Decimal('20.00')
+        )
+
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api_sales_analytics')
+        response = self.client.get(url, {'verify': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['consistency']['consistent'])
+        self.assertEqual(response.data['summary']['total_sales'], 2)
+        self.assertEqual(response.data['summary']['total_balance'], 60.0)
+        self.assertEqual(response.data['top_products'][0]['product__sku'], 'TEST-001')
+        self.assertEqual(response.data['top_products'][0]['total_quantity'], 2)
+
+        # Salespersons only see their own sales
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.get(url, {'verify': 'true'})
+        self.assertEqual(response.data['summary']['total_sales'], 1)
+        self.assertNotIn('consistency', response.data)
+
+        # New sales are appended on the next refresh
+        Sale.objects.create(
+            salesperson=self.salesperson_user,
+            total_amount=Decimal('30.00'),
+            payment_method='Cash',
+            amount_paid=Decimal('30.00')
+        )
+        with override_settings(SALES_CUBE_REFRESH_SECONDS=0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['summary']['total_sales'], 2)
+        self.assertEqual(response.data['summary']['total_revenue'], 230.0)
+        sales_cube.reset()
+
+    def test_sales_cube_sale_committed_between_reads(self):
+        """Test a sale committed between the cube's sales and items reads is loaded once, on the next refresh"""
+        from unittest import mock
+        from salesperson import cube
+
+        read_items = cube._item_arrays
+
+        def commit_sale_first(queryset, sale_ids):
+            # Another request commits a sale after the sales were read
+            late_sale = Sale.objects.create(
+                salesperson=self.admin_user,
+                total_amount=Decimal('100.00'),
+                payment_method='Cash',
+                amount_paid=Decimal('100.00')
+            )
+            SaleItem.objects.create(sale=late_sale, product=self.product, quantity=1, price_at_sale=Decimal('100.00'))
+            return read_items(queryset, sale_ids)
+
+        SaleItem.objects.create(sale=self.sale, product=self.product, quantity=2, price_at_sale=Decimal('100.00'))
+        sales_cube = cube.SalesCube()
+        with mock.patch.object(cube, '_item_arrays', side_effect=commit_sale_first):
+            result = sales_cube.query()
+        self.assertEqual(result['summary']['total_sales'], 1)
+        self.assertEqual(result['top_products'][0]['total_quantity'], 2)
+
+        # Refreshing again must not load its items a second time
+        sales_cube.snapshot(force_refresh=True)
+        sales_cube.snapshot(force_refresh=True)
+        result = sales_cube.query()
+        self.assertEqual(result['summary']['total_sales'], 2)
+        self.assertEqual(result['top_products'][0]['total_quantity'], 3)
+
+    def test_replica_routing_and_sticky_reads(self):
+        """Test reads go to the replica only inside use_replica and not right after a write"""
+        from unittest import mock
+        from django.conf import settings
+        from django.core.cache import cache
+        from salesperson.db_router import ReplicaRouter, is_sticky, use_replica
+        from salesperson.rollups import sales_cache_key, sales_cache_timeout, sales_version
+        from salesperson.singleflight import request_key
+        
+        router = ReplicaRouter(replica_alias='replica')
+        self.assertEqual(router.db_for_read(Product), 'default')
+        with use_replica():
+            self.assertEqual(router.db_for_read(Product), 'replica')
+            self.assertEqual(router.db_for_write(Product), 'default')
+        self.assertEqual(router.db_for_read(Product), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'salesperson'))
+        self.assertTrue(router.allow_migrate('default', 'salesperson'))
+        
+        # Without a replica configured every read stays on the primary
+        with use_replica():
+            self.assertEqual(ReplicaRouter().db_for_read(Product), 'default')
+        
+        # A successful write keeps that user's reads on the primary
+        cache.clear()
+        self.client.force_authenticate(user=self.admin_user)
+        with mock.patch('salesperson.db_router.replica_configured', return_value=True):
+            response = self.client.patch(
+                reverse('api_product_detail', args=[self.product.id]), {'price': '120.00'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(is_sticky(self.admin_user))
+        self.assertFalse(is_sticky(self.salesperson_user))
+        cache.clear()
+
+        # Results read from the replica are never cached under the sales version
+        version_key = sales_cache_key('pivot', 'digest')
+        self.assertIn(str(sales_version()), version_key)
+        self.assertEqual(sales_cache_timeout(600), 600)
+        with mock.patch('salesperson.db_router.replica_configured', return_value=True), use_replica():
+            self.assertEqual(sales_cache_key('pivot', 'digest'), 'pivot:replica:digest')
+            self.assertEqual(sales_cache_timeout(600), settings.REPLICA_RESULT_SECONDS)
+            replica_key = request_key('dashboard', self.admin_user, {})
+        self.assertNotEqual(replica_key, request_key('dashboard', self.admin_user, {}))
+        cache.clear()
+
+    def test_report_query_budgets(self):
+        """Test range limits, granularity buckets and statement timeouts on reports"""
+        from unittest import mock
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test import override_settings
+        from salesperson.query_budget import QueryBudgetExceeded, statement_timeout
+        
+        cache.clear()
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('api_comprehensive_reports')
+        
+        # Two years of daily buckets is over budget; the error points at the jobs API
+        response = self.client.get(url, {'date_from': '2023-01-01', 'date_to': '2024-12-31'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['max_days'], 366)
+        self.assertEqual(response.data['job']['job_type'], 'comprehensive_report')
+        
+        # The same range by month is allowed
+        response = self.client.get(url, {'date_from': '2023-01-01', 'date_to': '2024-12-31', 'granularity': 'month'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['chart_data']), 24)
+        self.assertEqual(response.data['chart_data'][0]['date'], '2023-01-01')
+        
+        response = self.client.get(url, {'granularity': 'hour'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        # Daily buckets still cover every day of the default 30 day range
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['chart_data']), 31)
+        self.assertEqual(sum(day['sales_count'] for day in response.data['chart_data']), 1)
+        
+        # Long-running statements are interrupted
+        with self.assertRaises(QueryBudgetExceeded):
+            with statement_timeout(50):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) '
+                        'SELECT COUNT(*) FROM n'
+                    )
+        
+        # ... and the report answers 503 with Retry-After (once no coalesced result is cached)
+        cache.clear()
+        with override_settings(REPORT_STATEMENT_TIMEOUT_MS=0), \
+                mock.patch('salesperson.query_budget.SQLITE_PROGRESS_STEPS', 1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(response.data['job']['endpoint'], reverse('api_job_list'))
+
+        # Requests answered from a coalesced result never open a budgeted transaction
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        with mock.patch('salesperson.query_budget.statement_timeout') as budget:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        budget.assert_not_called()
+        cache.clear()
+
+    def test_sales_pivot(self):
+        """Test the pivot endpoint picks a source, scopes by role and caches until sales change"""
+        from django.core.cache import cache
+        from django.utils import timezone
+        from salesperson.rollups import rebuild_product_sales_daily
+        
+        cache.clear()
+        SaleItem.objects.create(sale=self.sale, product=self.product, quantity=2, price_at_sale=Decimal('100.00'))
+        admin_sale = Sale.objects.create(
+            salesperson=self.admin_user,
+            total_amount=Decimal('50.00'),
+            payment_method='Credit',
+            amount_paid=Decimal('0.00')
+        )
+        rebuild_product_sales_daily()
+        url = reverse('api_sales_pivot')
+        self.client.force_authenticate(user=self.admin_user)
+        
+        # Revenue and quantity by category come from the daily counters
+        response = self.client.get(url, {'dimensions': 'day,category', 'measures': 'revenue,quantity'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['source'], 'rollup')
+        self.assertEqual(response.data['rows'][0]['quantity'], 2)
+        self.assertEqual(response.data['rows'][0]['day'], timezone.localdate().strftime('%Y-%m-%d'))
+        
+        # Balances need whole sales
+        response = self.client.get(url, {'dimensions': 'salesperson,payment_status', 'measures': 'count,balance'})
+        self.assertEqual(response.data['source'], 'sales')
+        self.assertEqual(response.data['totals'], {'count': 2, 'balance': Decimal('50.00')})
+        self.assertEqual(len(response.data['rows']), 2)
+        self.assertIn('salesperson_name', response.data['rows'][0])
+        
+        response = self.client.get(url, {'dimensions': 'product', 'measures': 'balance'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'dimensions': 'hour'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'dimensions': 'day', 'date_from': '2020-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        # Cached results are dropped once a sale changes
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_sale.amount_paid = Decimal('50.00')
+            admin_sale.save()
+        response = self.client.get(url, {'measures': 'paid,balance'})
+        self.assertEqual(response.data['totals']['balance'], Decimal('0.00'))
+        
+        # Salespersons only see their own sales
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.get(url, {'dimensions': 'salesperson', 'salesperson': self.admin_user.id})
+        self.assertEqual([row['salesperson'] for row in response.data['rows']], [self.salesperson_user.id])
+        cache.clear()
+
+    def test_period_comparison(self):
+        """Test compare=previous|yoy returns both periods and their changes"""
+        from datetime import timedelta
+        from django.utils import timezone
+        
+        today = timezone.localdate()
+        older = Sale.objects.create(
+            salesperson=self.salesperson_user,
+            total_amount=Decimal('100.00'),
+            payment_method='Credit',
+            amount_paid=Decimal('40.00')
+        )
+        Sale.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(days=10))
+        
+        self.client.force_authenticate(user=self.admin_user)
+        params = {
+            'date_from': (today - timedelta(days=6)).strftime('%Y-%m-%d'),
+            'date_to': today.strftime('%Y-%m-%d'),
+            'compare': 'previous'
+        }
+        response = self.client.get(reverse('api_sales_report'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        comparison = response.data['comparison']
+        self.assertEqual(comparison['previous_period']['to'], (today - timedelta(days=7)).strftime('%Y-%m-%d'))
+        self.assertEqual(comparison['metrics']['revenue']['current'], Decimal('200.00'))
+        self.assertEqual(comparison['metrics']['revenue']['previous'], Decimal('100.00'))
+        self.assertEqual(comparison['metrics']['revenue']['change_percent'], 100.0)
+        self.assertEqual(comparison['metrics']['outstanding']['change'], Decimal('-60.00'))
+        self.assertEqual(response.data['summary']['total_sales'], 1)
+        
+        response = self.client.get(reverse('api_payment_summary'), {**params, 'compare': 'yoy'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comparison']['metrics']['sales_count']['previous'], 0)
+        self.assertIsNone(response.data['comparison']['metrics']['sales_count']['change_percent'])
+        
+        response = self.client.get(reverse('api_sales_report'), {'compare': 'quarter'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_single_flight_coalescing(self):
+        """Test concurrent identical computations run once and share the result"""
+        import threading
+        import time
+        from django.core.cache import cache
+        from django.test import override_settings
+        from salesperson.singleflight import coalesce, request_key
+        
+        cache.clear()
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.3)
+            return {'total': 42}
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(coalesce('report:key', compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'total': 42}] * 5)
+        
+        # A lock whose holder never answers only delays the follower up to the wait limit
+        cache.clear()
+        cache.add('singleflight:lock:stuck', 'someone-else', timeout=60)
+        with override_settings(SINGLEFLIGHT_WAIT_SECONDS=0.2):
+            self.assertEqual(coalesce('stuck', lambda: 'computed here'), 'computed here')
+        
+        # Admins share a key; salespersons are scoped to themselves
+        other_admin = User.objects.create_user(email='admin2@test.com', password='testpass123', role='Admin')
+        self.assertEqual(
+            request_key('dashboard', self.admin_user, {}), request_key('dashboard', other_admin, {})
+        )
+        self.assertNotEqual(
+            request_key('dashboard', self.admin_user, {}), request_key('dashboard', self.salesperson_user, {})
+        )
+        cache.clear()
+
 
 class ModelTestCase(TestCase):
     """Test model methods and properties"""
@@ -534,3 +1458,319 @@ class ModelTestCase(TestCase):
             price_at_sale=Decimal('50.00')
         )
         self.assertEqual(sale_item.subtotal, Decimal('100.00'))
+
+
+class ExportAPITestCase(APITestCase):
+    """Test streaming CSV/XLSX export endpoints"""
+    
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            role='Admin'
+        )
+        self.salesperson_user = User.objects.create_user(
+            email='sales@test.com',
+            password='testpass123',
+            role='Salesperson'
+        )
+        self.product1 = Product.objects.create(
+            name='Product 1',
+            sku='PROD-001',
+            price=Decimal('50.00'),
+            stock_quantity=100
+        )
+        self.product2 = Product.objects.create(
+            name='Product 2',
+            sku='PROD-002',
+            price=Decimal('75.00'),
+            stock_quantity=50
+        )
+        self.sale = Sale.objects.create(
+            salesperson=self.salesperson_user,
+            customer_name='Export Customer',
+            total_amount=Decimal('125.00'),
+            payment_method='Cash',
+            amount_paid=Decimal('125.00')
+        )
+        SaleItem.objects.create(sale=self.sale, product=self.product1, quantity=1, price_at_sale=Decimal('50.00'))
+        SaleItem.objects.create(sale=self.sale, product=self.product2, quantity=1, price_at_sale=Decimal('75.00'))
+        Sale.objects.create(
+            salesperson=self.admin_user,
+            customer_name='Admin Customer',
+            total_amount=Decimal('80.00'),
+            payment_method='Cash',
+            amount_paid=Decimal('80.00')
+        )
+    
+    def _content(self, response):
+        return b''.join(response.streaming_content)
+    
+    def test_sales_csv_export_has_one_row_per_item(self):
+        """Test sales CSV export writes a row per line item"""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api_export_sales'), {'format': 'csv'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        lines = self._content(response).decode('utf-8').strip().splitlines()
+        # Header, two items for the first sale and one row for the sale without items
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('sale_id,created_at'))
+    
+    def test_sales_export_role_based(self):
+        """Test salespersons only export their own sales"""
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.get(reverse('api_export_sales'))
+        
+        content = self._content(response).decode('utf-8')
+        self.assertIn('Export Customer', content)
+        self.assertNotIn('Admin Customer', content)
+    
+    def test_inventory_xlsx_export(self):
+        """Test inventory XLSX export produces a readable workbook"""
+        import io
+        import zipfile
+        
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('api_export_inventory'), {'format': 'xlsx'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        archive = zipfile.ZipFile(io.BytesIO(self._content(response)))
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn('PROD-001', sheet)
+        self.assertEqual(sheet.count('<row>'), 3)
+    
+    def test_inventory_export_admin_only(self):
+        """Test inventory export is admin only"""
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.get(reverse('api_export_inventory'))
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_receipts_export(self):
+        """Test bulk receipts stream as a ZIP or one combined PDF and run as a job"""
+        import io
+        import re
+        import tempfile
+        import zipfile
+        from django.core.management import call_command
+        from django.test import override_settings
+        from django.utils import timezone
+        from salesperson.models import Job
+
+        url = reverse('api_export_receipts')
+        today = timezone.localdate().strftime('%Y-%m-%d')
+        params = {'date_from': today, 'date_to': today}
+
+        self.client.force_authenticate(user=self.salesperson_user)
+        self.assertEqual(self.client.get(url, params).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        self.assertEqual(self.client.get(url, {'date_from': today}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        with override_settings(BULK_RECEIPT_WORKERS=1):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Receipt-Count'], '2')
+        archive = zipfile.ZipFile(io.BytesIO(self._content(response)))
+        self.assertEqual(len(archive.namelist()), 2)
+        self.assertTrue(archive.read(f'receipt_{self.sale.id}.pdf').startswith(b'%PDF'))
+
+        # Rendered in worker processes and combined into a single document
+        with override_settings(BULK_RECEIPT_WORKERS=2):
+            response = self.client.get(url, {**params, 'output': 'pdf', 'salesperson': self.salesperson_user.id})
+        pdf = self._content(response)
+        self.assertTrue(pdf.startswith(b'%PDF') and pdf.endswith(b'%%EOF\n'))
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', pdf)), 1)
+        self.assertIn(b'/Count 1 ', pdf)
+
+        with tempfile.TemporaryDirectory() as results_dir, override_settings(
+            JOB_RESULTS_ROOT=results_dir, BULK_RECEIPT_WORKERS=1
+        ):
+            response = self.client.post(url, {**params, 'output': 'zip'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            call_command('run_workers', once=True, stdout=io.StringIO())
+            job = Job.objects.get(pk=response.data['id'])
+            self.assertEqual(job.status, Job.STATUS_COMPLETED)
+            self.assertEqual(job.result_content_type, 'application/zip')
+
+            output = io.StringIO()
+            path = f'{results_dir}/receipts.pdf'
+            call_command(
+                'export_receipts', date_from=today, date_to=today, output='pdf', file=path, stdout=output
+            )
+            self.assertIn('Rendered 2/2 receipts', output.getvalue())
+            with open(path, 'rb') as combined:
+                self.assertEqual(len(re.findall(rb'/Type /Page\b', combined.read())), 2)
+
+
+class JobAPITestCase(APITestCase):
+    """Test background job submission, processing and download"""
+    
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        
+        self.results_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(JOB_RESULTS_ROOT=self.results_dir.name)
+        self.settings_override.enable()
+        
+        self.admin_user = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            role='Admin'
+        )
+        self.salesperson_user = User.objects.create_user(
+            email='sales@test.com',
+            password='testpass123',
+            role='Salesperson'
+        )
+        Sale.objects.create(
+            salesperson=self.salesperson_user,
+            customer_name='Job Customer',
+            total_amount=Decimal('100.00'),
+            payment_method='Cash',
+            amount_paid=Decimal('100.00')
+        )
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        self.results_dir.cleanup()
+    
+    def test_submit_run_and_download_export_job(self):
+        """Test a queued export job is processed by run_workers and downloadable"""
+        from django.core.management import call_command
+        from salesperson.models import Job
+        
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.post(reverse('api_job_list'), {
+            'job_type': 'sales_export',
+            'params': {'format': 'csv'}
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'Pending')
+        job_id = response.data['id']
+        
+        call_command('run_workers', once=True, stdout=io.StringIO())
+        
+        response = self.client.get(reverse('api_job_detail', args=[job_id]))
+        self.assertEqual(response.data['status'], Job.STATUS_COMPLETED)
+        self.assertEqual(response.data['progress'], 100)
+        self.assertIsNotNone(response.data['download_url'])
+        
+        response = self.client.get(reverse('api_job_download', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'Job Customer', b''.join(response.streaming_content))
+    
+    def test_download_before_completion_conflicts(self):
+        """Test downloading a pending job's result returns 409"""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(reverse('api_job_list'), {
+            'job_type': 'sales_report',
+            'params': {}
+        }, format='json')
+        
+        response = self.client.get(reverse('api_job_download', args=[response.data['id']]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+    
+    def test_requeue_only_jobs_without_heartbeat(self):
+        """Test long jobs with a recent heartbeat keep running and silent ones are requeued"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from salesperson.jobs import requeue_stale_jobs, set_progress
+        from salesperson.models import Job
+
+        long_ago = timezone.now() - timedelta(hours=3)
+        running = {'status': Job.STATUS_RUNNING, 'worker': 'host:1-1', 'started_at': long_ago}
+        alive = Job.objects.create(
+            job_type=Job.TYPE_SALES_EXPORT, created_by=self.admin_user, heartbeat_at=timezone.now(), **running
+        )
+        dead = Job.objects.create(
+            job_type=Job.TYPE_SALES_EXPORT, created_by=self.admin_user, heartbeat_at=long_ago, **running
+        )
+        # Claimed before heartbeats existed
+        legacy = Job.objects.create(job_type=Job.TYPE_SALES_EXPORT, created_by=self.admin_user, **running)
+
+        self.assertEqual(requeue_stale_jobs(), 2)
+        for job, expected in ((alive, Job.STATUS_RUNNING), (dead, Job.STATUS_PENDING), (legacy, Job.STATUS_PENDING)):
+            job.refresh_from_db()
+            self.assertEqual(job.status, expected)
+        self.assertIsNone(dead.heartbeat_at)
+
+        # Progress updates also count as heartbeats
+        Job.objects.filter(pk=alive.pk).update(heartbeat_at=long_ago)
+        set_progress(alive, 50)
+        alive.refresh_from_db()
+        self.assertGreater(alive.heartbeat_at, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+    def test_requeued_job_belongs_to_its_new_worker(self):
+        """Test a worker that lost its job to a requeue cannot update or finish it"""
+        import os
+        from datetime import timedelta
+        from django.utils import timezone
+        from salesperson.jobs import claim_next_job, requeue_stale_jobs, run_job, set_progress
+        from salesperson.models import Job
+
+        job = Job.objects.create(job_type=Job.TYPE_SALES_EXPORT, created_by=self.admin_user, params={})
+        stalled = claim_next_job('host:1-1')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        current = claim_next_job('host:2-1')
+
+        set_progress(stalled, 40)
+        self.assertFalse(run_job(stalled))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.progress), (Job.STATUS_RUNNING, 'host:2-1', 0))
+        self.assertEqual(os.listdir(self.results_dir.name), [])
+
+        self.assertTrue(run_job(current))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_COMPLETED)
+        self.assertEqual(os.listdir(self.results_dir.name), [job.result_file])
+
+    def test_inventory_job_admin_only(self):
+        """Test salespersons cannot queue inventory jobs"""
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.post(reverse('api_job_list'), {
+            'job_type': 'inventory_export',
+            'params': {}
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_parquet_export_job(self):
+        """Test the admin Parquet export writes month partitions and a manifest"""
+        import unittest
+        from django.core.management import call_command
+        from django.test import override_settings
+        from salesperson.parquet_export import parquet_available
+        
+        if not parquet_available():
+            raise unittest.SkipTest('pyarrow is not installed')
+        
+        url = reverse('api_export_parquet')
+        self.client.force_authenticate(user=self.salesperson_user)
+        response = self.client.post(url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+        self.client.force_authenticate(user=self.admin_user)
+        with override_settings(PARQUET_EXPORT_ROOT=self.results_dir.name):
+            response = self.client.post(url, {'tables': ['sales', 'bogus']}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            
+            response = self.client.post(url, {'tables': ['sales', 'products']}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            call_command('run_workers', once=True, stdout=io.StringIO())
+            
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            months = response.data['tables']['sales']
+            self.assertEqual(sum(month['rows'] for month in months.values()), 1)
+            
+            import pyarrow.parquet as pq
+            month = next(iter(months))
+            table = pq.read_table(f'{self.results_dir.name}/sales/month={month}/data.parquet')
+            self.assertEqual(table.column('customer_name').to_pylist(), ['Job Customer'])
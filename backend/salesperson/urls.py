@@ -30,7 +30,9 @@ api_urlpatterns = [
     path('sales/<int:pk>/payment-status/', api_views.update_sale_payment_status, name='api_update_sale_payment_status'),
     path('sales/<int:sale_id>/pdf/', api_views.generate_receipt_pdf, name='api_sale_pdf'),
     path('sales/<int:sale_id>/pdf-token/', api_views.create_pdf_token, name='api_create_pdf_token'),
-    path('sales/<int:sale_id>/pdf/<uuid:token>/', api_views.download_pdf_with_token, name='api_download_pdf_token'),
+    path('sales/<int:sale_id>/pdf/<str:token>/', api_views.download_pdf_with_token, name='api_download_pdf_token'),
+    path('receipts/render-pool/', api_views.render_pool_metrics, name='api_render_pool_metrics'),
+    path('customers/statement/', api_views.customer_statement, name='api_customer_statement'),
     
     # Payment management endpoints
     path('payments/', api_views.PaymentListCreateView.as_view(), name='api_payment_list'),
@@ -41,7 +43,25 @@ api_urlpatterns = [
     path('dashboard/', api_views.dashboard_stats, name='api_dashboard'),
     path('reports/sales/', api_views.sales_report, name='api_sales_report'),
     path('reports/inventory/', api_views.inventory_report, name='api_inventory_report'),
+    path('reports/inventory/trends/', api_views.inventory_trends, name='api_inventory_trends'),
+    path('reports/leaderboard/', api_views.salesperson_leaderboard, name='api_salesperson_leaderboard'),
+    path('reports/receivables-aging/', api_views.receivables_aging, name='api_receivables_aging'),
+    path('reports/reorder-suggestions/', api_views.reorder_suggestions, name='api_reorder_suggestions'),
+    path('reports/analytics/', api_views.sales_analytics, name='api_sales_analytics'),
+    path('reports/pivot/', api_views.sales_pivot, name='api_sales_pivot'),
     path('reports/comprehensive/', api_views.comprehensive_reports, name='api_comprehensive_reports'),
+    
+    # Data export endpoints (CSV/XLSX)
+    path('exports/sales/', api_views.export_sales, name='api_export_sales'),
+    path('exports/payments/', api_views.export_payments, name='api_export_payments'),
+    path('exports/inventory/', api_views.export_inventory, name='api_export_inventory'),
+    path('exports/parquet/', api_views.parquet_export, name='api_export_parquet'),
+    path('exports/receipts/', api_views.bulk_receipts, name='api_export_receipts'),
+    
+    # Background job endpoints (long-running reports and exports)
+    path('jobs/', api_views.JobListCreateView.as_view(), name='api_job_list'),
+    path('jobs/<int:pk>/', api_views.JobDetailView.as_view(), name='api_job_detail'),
+    path('jobs/<int:pk>/download/', api_views.download_job_result, name='api_job_download'),
 ]
 
 urlpatterns = [